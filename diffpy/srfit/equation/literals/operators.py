@@ -196,29 +196,92 @@ class NegationOperator(Operator):
         return
 
 
-def _conv(v1, v2):
+# The FFT is used when the direct convolution takes this many times more
+# operations than the transforms, which is where it becomes faster.
+_fftratio = 12
+
+def _conv(v1, v2, transform = None):
+    v1 = numpy.asarray(v1)
+    v2 = numpy.asarray(v2)
+    n = len(v1)
+    m = len(v2)
     # Get the full convolution
-    c = numpy.convolve(v1, v2, mode="full")
-    # Find the centroid of the first signal
-    s1 = sum(v1)
-    x1 = numpy.arange(len(v1), dtype=float)
-    c1idx = numpy.sum(v1 * x1)/s1
-    # Find the centroid of the convolution
-    xc = numpy.arange(len(c), dtype=float)
-    ccidx = numpy.sum(c * xc)/sum(c)
+    lognfft = int(numpy.ceil(numpy.log2(max(n + m - 1, 1))))
+    nfft = 2**lognfft
+    if (n * m > _fftratio * nfft * lognfft and v1.ndim == v2.ndim == 1 and
+            numpy.isrealobj(v1) and numpy.isrealobj(v2)):
+        f1 = numpy.fft.rfft(v1, nfft)
+        if transform is None:
+            f2 = numpy.fft.rfft(v2, nfft)
+        else:
+            f2 = transform(v2, nfft)
+        c = numpy.fft.irfft(f1 * f2, nfft)[:n + m - 1]
+    else:
+        c = numpy.convolve(v1, v2, mode="full")
+    # The centroid of the convolution is the sum of the centroids of the
+    # signals, so the shift that keeps the centroid of the first signal is
+    # the centroid of the second signal.
+    s1 = v1.sum()
+    shift = numpy.dot(v2, _getIndices(m))/v2.sum()
     # Interpolate the convolution such that the centroids line up. This
     # uses linear interpolation.
-    shift = ccidx - c1idx
-    x1 += shift
-    c = numpy.interp(x1, xc, c)
+    k = numpy.floor(shift)
+    if 0 <= k and k + n < len(c):
+        k = int(k)
+        f = shift - k
+        c = (1 - f) * c[k:k + n] + f * c[k + 1:k + n + 1]
+    else:
+        c = numpy.interp(_getIndices(n) + shift,
+                _getIndices(len(c)), c)
 
     # Normalize
-    sc = sum(c)
+    sc = c.sum()
     if sc > 0:
         c *= s1/sc
 
     return c
 
+class _Convolution(object):
+    """The operation of a ConvolutionOperator.
+
+    This keeps the FFT of the last second signal, which is reused while the
+    signal has the same values.
+
+    Attributes
+    _kernel --  A (v2, nfft, f2) tuple of a copy of the last second signal,
+                the FFT size and the transform, or None.
+
+    """
+
+    def __init__(self):
+        """Initialize the attributes."""
+        self._kernel = None
+        return
+
+    def __call__(self, v1, v2):
+        return _conv(v1, v2, self._transform)
+
+    def _transform(self, v2, nfft):
+        """Get the transform of the second signal."""
+        kernel = self._kernel
+        if (kernel is None or kernel[1] != nfft or
+                not numpy.array_equal(kernel[0], v2)):
+            kernel = (v2.copy(), nfft, numpy.fft.rfft(v2, nfft))
+            self._kernel = kernel
+        return kernel[2]
+
+# End class _Convolution
+
+_indices = numpy.arange(0, dtype=float)
+
+def _getIndices(n):
+    """Get a read-only array of the indices 0, 1, ..., n - 1."""
+    global _indices
+    if len(_indices) < n:
+        _indices = numpy.arange(max(n, 2 * len(_indices)), dtype=float)
+        _indices.setflags(write = False)
+    return _indices[:n]
+
 class ConvolutionOperator(Operator):
     """Convolve two signals.
 
@@ -230,6 +293,10 @@ class ConvolutionOperator(Operator):
     Note that this is only possible when the signals are computed over the same
     range.
 
+    Long signals are convolved with the FFT. The transform of the second
+    signal is kept while the values of that signal do not change, so it
+    should be the one that varies less often, such as the broadening kernel.
+
     """
 
     def __init__(self):
@@ -237,7 +304,7 @@ class ConvolutionOperator(Operator):
         Operator.__init__(self)
         self.name = "convolve"
         self.symbol = "convolve"
-        self.operation = _conv
+        self.operation = _Convolution()
         return
 
 class SumOperator(Operator):
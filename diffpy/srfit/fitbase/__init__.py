@@ -30,8 +30,9 @@ http://www.reflectometry.org/danse/park.html
 """
 
 __all__ = ['Calculator', 'FitContribution', 'FitHook', 'FitRecipe',
-'FitResults', 'initializeRecipe', 'PlotFitHook', 'Profile', 'ProfileGenerator',
-'SimpleRecipe']
+'FitResults', 'initializeRecipe', 'MultiResolutionOptimizer', 'PlotFitHook',
+'Profile', 'ProfileGenerator', 'ProfileStream', 'ResultsStore',
+'SequentialRefinement', 'SimpleRecipe']
 
 from diffpy.srfit.fitbase.calculator import Calculator
 from diffpy.srfit.fitbase.fitcontribution import FitContribution
@@ -41,5 +42,9 @@ from diffpy.srfit.fitbase.simplerecipe import SimpleRecipe
 from diffpy.srfit.fitbase.fitresults import FitResults, initializeRecipe
 from diffpy.srfit.fitbase.profile import Profile
 from diffpy.srfit.fitbase.profilegenerator import ProfileGenerator
+from diffpy.srfit.fitbase.profilestream import ProfileStream
+from diffpy.srfit.fitbase.resultsstore import ResultsStore
+from diffpy.srfit.fitbase.sequentialrefinement import SequentialRefinement
+from diffpy.srfit.fitbase.multiresolution import MultiResolutionOptimizer
 
 # End of file
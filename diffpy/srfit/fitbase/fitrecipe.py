@@ -38,6 +38,7 @@ from numpy import array, concatenate, sqrt, dot
 
 from diffpy.srfit.interface import _fitrecipe_interface
 from diffpy.srfit.util.ordereddict import OrderedDict
+from diffpy.srfit.util.observable import batchNotifications
 from diffpy.srfit.util.tagmanager import TagManager
 from diffpy.srfit.fitbase.parameter import ParameterProxy
 from diffpy.srfit.fitbase.recipeorganizer import RecipeOrganizer
@@ -751,6 +752,51 @@ class FitRecipe(_fitrecipe_interface, RecipeOrganizer):
         """Get the names of the variables in a list."""
         return [v.name for v in self._parameters.values() if self.isFree(v)]
 
+    def getSnapshot(self):
+        """Get the names and values of all variables, free and fixed.
+
+        The returned pair can be stored and passed back to setValues, or to
+        initializeRecipe, to restore the variables of an equally configured
+        recipe.
+
+        Returns a (names, values) pair of a list and an array.
+
+        """
+        pars = self._parameters.values()
+        return [v.name for v in pars], array([v.value for v in pars])
+
+    def setValues(self, names, values):
+        """Assign values to variables by name.
+
+        The variables are looked up directly in the name index of the recipe
+        variables rather than with 'get', and all values are converted in one
+        step before they are assigned. The notifications are sent after all
+        values are assigned, such that every changed variable and every
+        object that depends on them is notified once (see
+        diffpy.srfit.util.observable.batchNotifications). Variables whose
+        value does not change are not notified.
+
+        names   --  Iterable of variable names. Names of free and fixed
+                    variables are accepted.
+        values  --  Iterable of variable values, ordered as names.
+
+        Raises ValueError if a name is not a variable of this recipe or if
+        names and values differ in length.
+
+        """
+        pars = self._parameters
+        names = list(names)
+        values = array(values, dtype=float).tolist()
+        if len(names) != len(values):
+            raise ValueError("names and values differ in length")
+        for name in names:
+            if name not in pars:
+                raise ValueError("No variable named '%s'" % name)
+        with batchNotifications():
+            for name, val in zip(names, values):
+                pars[name].setValue(val)
+        return
+
     def getBounds(self):
         """Get the bounds on variables in a list.
 
@@ -631,21 +631,25 @@ def initializeRecipe(recipe, results):
     recipe  --  A configured recipe with variables
     results --  An open file-like object, name of a file that contains
                 results from FitResults or a string containing fit results.
+                This can also be a structured snapshot, either a dictionary
+                of values indexed by variable name or a (names, values) pair
+                as returned by FitRecipe.getSnapshot or ResultsStore.getRow.
+                A snapshot is used without parsing any text.
 
     """
 
-    mpairs = resultsDictionary(results)
+    if isinstance(results, dict):
+        mpairs = results
+    elif isinstance(results, tuple):
+        mpairs = dict(zip(*results[:2]))
+    else:
+        mpairs = resultsDictionary(results)
     if not mpairs:
         raise AttributeError("Cannot find results")
 
     # Get variable names
-    names = recipe._parameters.keys()
-    for vname in names:
-        value = mpairs.get(vname)
-        if value is not None:
-            var = recipe.get(vname)
-            var.value = float(value)
-
+    names = [vname for vname in recipe._parameters if vname in mpairs]
+    recipe.setValues(names, [mpairs[vname] for vname in names])
     return
 
 
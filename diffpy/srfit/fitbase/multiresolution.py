@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+########################################################################
+#
+# diffpy.srfit      by DANSE Diffraction group
+#                   Simon J. L. Billinge
+#                   (c) 2010 The Trustees of Columbia University
+#                   in the City of New York.  All rights reserved.
+#
+# See AUTHORS.txt for a list of people who contributed.
+# See LICENSE_DANSE.txt for license information.
+#
+########################################################################
+"""The MultiResolutionOptimizer class for coarse-to-fine refinements.
+
+Most of the iterations of a refinement that starts far from the minimum are
+spent getting close to it, and for these the full calculation grid is not
+needed. A MultiResolutionOptimizer first refines a FitRecipe with the
+calculation points of every Profile decimated by a large stride, using
+setCalculationPoints, and then refines on progressively finer grids, each
+stage starting from the result of the previous one. The last stage is always
+done on the original grid, so the final answer is that of a full refinement.
+
+> optimize = MultiResolutionOptimizer(strides = (8, 4, 2, 1))
+> converged = optimize(recipe)
+
+A MultiResolutionOptimizer can be used as the optimizer of a
+SequentialRefinement.
+
+"""
+__all__ = ["MultiResolutionOptimizer"]
+
+import numpy
+
+from diffpy.srfit.fitbase.sequentialrefinement import leastsqOptimizer
+
+
+class MultiResolutionOptimizer(object):
+    """Optimizer that refines a recipe on successively finer grids.
+
+    Attributes
+    strides     --  Decreasing sequence of decimation strides of the stages.
+                    The calculation points of each stage are every stride-th
+                    point of the original calculation points. A final stage
+                    with stride 1 is always run (default (8, 4, 2, 1)).
+    optimizer   --  Callable that refines the recipe in each stage. The
+                    callable takes the recipe as its only argument and returns
+                    True if the refinement converged (default
+                    leastsqOptimizer).
+    tol         --  Relative change of the variables between two consecutive
+                    stages below which the remaining intermediate stages are
+                    skipped and the refinement moves on to the original grid
+                    (default 1e-4).
+    stages      --  List of (stride, npoints, cost) tuples of the stages run
+                    in the last call. npoints is the total number of
+                    calculation points and cost is the scalar residual per
+                    calculation point at the end of the stage.
+
+    """
+
+    def __init__(self, strides = (8, 4, 2, 1), optimizer = leastsqOptimizer,
+            tol = 1e-4):
+        """Initialize the attributes.
+
+        strides     --  Decreasing sequence of decimation strides (default
+                        (8, 4, 2, 1)).
+        optimizer   --  Callable that refines the recipe in each stage
+                        (default leastsqOptimizer).
+        tol         --  Relative variable change for skipping to the original
+                        grid (default 1e-4).
+
+        Raises ValueError if a stride is less than 1.
+
+        """
+        strides = [int(s) for s in strides]
+        if [s for s in strides if s < 1]:
+            raise ValueError("strides must be positive")
+        strides = sorted(set(strides), reverse = True)
+        if strides[-1] != 1:
+            strides.append(1)
+        self.strides = strides
+        self.optimizer = optimizer
+        self.tol = tol
+        self.stages = []
+        return
+
+    def __call__(self, recipe):
+        """Refine the recipe from the coarsest to the original grid.
+
+        Stages whose decimated grid has fewer points than the recipe has
+        variables are skipped. The calculation points of the Profiles are
+        restored when the refinement is done.
+
+        Returns True if the refinement on the original grid converged.
+
+        """
+        profiles = [con.profile for con in recipe._contributions.values()]
+        saved = [(p.x, p.y, p.dy) for p in profiles]
+        nvars = len(recipe.getValues())
+        self.stages = []
+        last = None
+        try:
+            for stride in self.strides[:-1]:
+                if min(len(x[::stride]) for x, y, dy in saved) <= nvars:
+                    continue
+                for p, (x, y, dy) in zip(profiles, saved):
+                    p.setCalculationPoints(x[::stride])
+                self._runStage(recipe, stride)
+                vals = numpy.array(recipe.getValues(), dtype=float)
+                if last is not None and self._isSettled(last, vals):
+                    break
+                last = vals
+        finally:
+            for p, (x, y, dy) in zip(profiles, saved):
+                p.x = x
+                p.y = y
+                p.dy = dy
+        return self._runStage(recipe, 1)
+
+    def _runStage(self, recipe, stride):
+        """Run the optimizer and record the stage.
+
+        Returns the return value of the optimizer.
+
+        """
+        converged = self.optimizer(recipe)
+        npoints = sum(len(con.profile.x) for con in
+                recipe._contributions.values())
+        cost = recipe.scalarResidual() / npoints
+        self.stages.append((stride, npoints, cost))
+        return converged
+
+    def _isSettled(self, last, vals):
+        """Check if the variables changed less than tol between stages."""
+        scale = numpy.maximum(numpy.abs(last), numpy.abs(vals))
+        scale[scale == 0] = 1
+        return (numpy.abs(vals - last) / scale).max() < self.tol
+
+# End class MultiResolutionOptimizer
+
+# End of file
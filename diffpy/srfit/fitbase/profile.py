@@ -318,7 +318,8 @@ class Profile(Observable, Validatable):
         Raises AttributeError if validation fails.
 
         """
-        if None in [self.x, self.y, self.dy, self.xobs, self.yobs, self.dyobs]:
+        datarrays = (self.x, self.y, self.dy, self.xobs, self.yobs, self.dyobs)
+        if any(a is None for a in datarrays):
             raise AttributeError("Missing data")
         if len(self.x) != len(self.y) or len(self.x) != len(self.dy):
             raise AttributeError("Data are different lengths")
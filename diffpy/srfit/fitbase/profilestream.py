@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+########################################################################
+#
+# diffpy.srfit      by DANSE Diffraction group
+#                   Simon J. L. Billinge
+#                   (c) 2010 The Trustees of Columbia University
+#                   in the City of New York.  All rights reserved.
+#
+# See AUTHORS.txt for a list of people who contributed.
+# See LICENSE_DANSE.txt for license information.
+#
+########################################################################
+"""The ProfileStream class for feeding a series of datasets to a Profile.
+
+Sequential refinements fit the same FitRecipe to a long, ordered series of
+datasets, such as a temperature or time series of PDFs. A ProfileStream parses
+the upcoming datasets in background workers while the current refinement runs,
+and loads each parsed dataset into a Profile with setObservedProfile once the
+previous one is finished.
+
+> stream = ProfileStream(contribution.profile, filenames, PDFParser)
+> for source in stream:
+>     optimize(recipe)
+>     results.append(FitResults(recipe))
+
+"""
+__all__ = ["ProfileStream"]
+
+from collections import deque
+
+
+def _parseSource(parserclass, source):
+    """Parse one dataset and return its (x, y, dy, meta) tuple.
+
+    This is a module-level function so that it can be pickled and run in a
+    worker process.
+
+    """
+    parser = parserclass()
+    parser.parseFile(source)
+    x, y, junk, dy = parser.getData()
+    meta = dict(parser.getMetaData())
+    return x, y, dy, meta
+
+class ProfileStream(object):
+    """Prefetching source of observed profiles for sequential refinements.
+
+    Iterating over a ProfileStream loads the datasets, one after another, into
+    the target Profile and yields the source each one came from. At most
+    'prefetch' datasets are parsed ahead of the one held by the Profile. A
+    dataset is released by the stream as soon as it has been loaded, so the
+    memory in use stays bounded however long the series is.
+
+    Attributes
+    profile     --  The Profile that receives the parsed datasets.
+    sources     --  The sequence of data sources, usually file names.
+    parserclass --  The ProfileParser class (or any callable returning a
+                    ProfileParser) used to parse each source.
+    prefetch    --  Maximum number of datasets parsed ahead (default 2).
+    processes   --  Flag indicating if the parsing is done in worker processes
+                    rather than in threads (default False). The parser class
+                    must be picklable when this is True.
+    _pool       --  The worker pool, created when the iteration starts.
+    _pending    --  Deque of (source, AsyncResult) pairs being parsed.
+
+    """
+
+    def __init__(self, profile, sources, parserclass, prefetch = 2,
+            processes = False):
+        """Initialize the attributes.
+
+        profile     --  The Profile to load the datasets into.
+        sources     --  An iterable of data sources, e.g. file names.
+        parserclass --  The ProfileParser class used to parse each source.
+        prefetch    --  Maximum number of datasets parsed ahead (default 2).
+        processes   --  Parse in worker processes rather than in threads
+                        (default False).
+
+        Raises ValueError if prefetch is less than 1.
+
+        """
+        if prefetch < 1:
+            raise ValueError("prefetch must be at least 1")
+        self.profile = profile
+        self.sources = sources
+        self.parserclass = parserclass
+        self.prefetch = int(prefetch)
+        self.processes = bool(processes)
+        self._pool = None
+        self._pending = deque()
+        return
+
+    def __iter__(self):
+        """Load each dataset into the profile and yield its source.
+
+        A ParseError or IOError raised while parsing a source is re-raised
+        when that source is reached.
+
+        """
+        self._startPool()
+        try:
+            srciter = iter(self.sources)
+            for source in srciter:
+                self._submit(source)
+                if len(self._pending) > self.prefetch:
+                    yield self._loadNext()
+            while self._pending:
+                yield self._loadNext()
+        finally:
+            self.close()
+        return
+
+    def close(self):
+        """Discard the pending datasets and shut down the worker pool."""
+        self._pending.clear()
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def _startPool(self):
+        """Create the worker pool used for parsing."""
+        self.close()
+        if self.processes:
+            from multiprocessing import Pool
+            self._pool = Pool(self.prefetch)
+        else:
+            from multiprocessing.pool import ThreadPool
+            self._pool = ThreadPool(self.prefetch)
+        return
+
+    def _submit(self, source):
+        """Queue a source for parsing."""
+        args = (self.parserclass, source)
+        self._pending.append((source, self._pool.apply_async(_parseSource,
+            args)))
+        return
+
+    def _loadNext(self):
+        """Load the oldest pending dataset into the profile.
+
+        Returns the source of the loaded dataset.
+
+        """
+        source, result = self._pending.popleft()
+        x, y, dy, meta = result.get()
+        self.profile.meta = meta
+        self.profile.setObservedProfile(x, y, dy)
+        return source
+
+# End class ProfileStream
+
+# End of file
@@ -440,7 +440,8 @@ class RecipeOrganizer(_recipeorganizer_interface, RecipeContainer):
         eq = self._eqfactory.makeEquation(f.name)
         return eq
 
-    def registerFunction(self, f, name = None, argnames = None):
+    def registerFunction(self, f, name = None, argnames = None,
+            memoize = False):
         """Register a function so it can be used within equation strings.
 
         This creates a function with this class that can be used within string
@@ -455,6 +456,14 @@ class RecipeOrganizer(_recipeorganizer_interface, RecipeContainer):
         argnames    --  The names of the arguments to f (list or None).
                         If this is None (default), then the argument names will
                         be extracted from the function.
+        memoize     --  If True, the results of f are cached by its
+                        arguments (default False). This is for pure
+                        functions, like the characteristic functions in
+                        diffpy.srfit.pdf.characteristicfunctions. Array
+                        arguments are identified by the array object, so they
+                        must not be changed in place. See
+                        diffpy.srfit.util.resultcache.MemoizedFunction. This
+                        is ignored for Equations and Calculators.
 
         Note that name and argnames can be extracted from regular python
         functions (of type 'function'), bound class methods and callable
@@ -531,6 +540,9 @@ class RecipeOrganizer(_recipeorganizer_interface, RecipeContainer):
                 f.addLiteral(par)
             self._eqfactory.registerOperator(name, f)
         else:
+            if memoize:
+                from diffpy.srfit.util.resultcache import MemoizedFunction
+                f = MemoizedFunction(f)
             self._eqfactory.registerFunction(name, f, argnames)
 
         # Now we can create the Equation and return it to the user.
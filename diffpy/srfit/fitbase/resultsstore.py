@@ -0,0 +1,309 @@
+#!/usr/bin/env python
+########################################################################
+#
+# diffpy.srfit      by DANSE Diffraction group
+#                   Simon J. L. Billinge
+#                   (c) 2010 The Trustees of Columbia University
+#                   in the City of New York.  All rights reserved.
+#
+# See AUTHORS.txt for a list of people who contributed.
+# See LICENSE_DANSE.txt for license information.
+#
+########################################################################
+"""The ResultsStore class for collecting the results of many fits.
+
+A ResultsStore keeps the numeric results of a series of fits, such as a
+sequential refinement over a temperature series or a multi-start search, in
+columns so that the evolution of a variable can be retrieved without
+reformatting and reparsing FitResults output. The store keeps the covariance
+matrix of every fit and, optionally, the calculated profile of every
+FitContribution. It can be saved to and loaded from a binary numpy .npz file.
+
+"""
+__all__ = ["ResultsStore"]
+
+import numpy
+
+
+class ResultsStore(object):
+    """Columnar store of the results of a series of fits.
+
+    Each appended fit is a row of the store. Variables are columns that are
+    identified by the variable name. A variable that was not refined in some
+    fit has a NaN value and uncertainty in that row.
+
+    Attributes
+    labels      --  List of the labels of the stored fits. A label is any
+                    object identifying the fit, such as a temperature or the
+                    name of the data file.
+    varnames    --  List of the names of all variables seen so far, in order
+                    of appearance. This gives the column order.
+    converged   --  List of convergence flags of the stored fits.
+    chi2        --  List of chi2 values of the stored fits.
+    rchi2       --  List of reduced chi2 values of the stored fits.
+    rw          --  List of Rw values of the stored fits.
+    storeycalc  --  Flag indicating if the calculated profiles of the
+                    FitContributions are stored (default False).
+    _colidx     --  Dictionary of column indices indexed by variable name.
+    _vals       --  2D array of variable values, one row per fit. The array
+                    is over-allocated, only the first len(self) rows are used.
+    _unc        --  2D array of variable uncertainties, like _vals.
+    _covs       --  List of (indices, cov) for each fit. indices are the
+                    column indices of the refined variables and cov is their
+                    covariance matrix.
+    _profiles   --  List of dictionaries of (x, ycalc) arrays indexed by
+                    the FitContribution name, one per fit. The dictionaries
+                    are empty unless storeycalc is True.
+
+    """
+
+    def __init__(self, storeycalc = False):
+        """Initialize the attributes.
+
+        storeycalc  --  Store the calculated profiles of the FitContributions
+                        (default False).
+
+        """
+        self.labels = []
+        self.varnames = []
+        self.converged = []
+        self.chi2 = []
+        self.rchi2 = []
+        self.rw = []
+        self.storeycalc = bool(storeycalc)
+        self._colidx = {}
+        self._vals = numpy.empty((0, 0), dtype=float)
+        self._unc = numpy.empty((0, 0), dtype=float)
+        self._covs = []
+        self._profiles = []
+        return
+
+    def __len__(self):
+        """Get the number of stored fits."""
+        return len(self._covs)
+
+    def append(self, results, label = None, converged = True):
+        """Store the results of a fit.
+
+        results     --  A FitResults instance, updated to the final state of
+                        the fit.
+        label       --  A label identifying the fit (default None). If this is
+                        None, then the index of the fit in the store is used.
+        converged   --  Flag indicating whether the fit converged (default
+                        True).
+
+        """
+        if label is None:
+            label = len(self)
+        vals = numpy.array(results.varvals, dtype=float)
+        unc = numpy.array(results.varunc, dtype=float)
+        if len(unc) != len(vals):
+            unc = numpy.zeros_like(vals)
+        cov = results.cov
+        if cov is None:
+            cov = numpy.zeros((len(vals), len(vals)), dtype=float)
+        profiles = {}
+        if self.storeycalc:
+            for name, conres in results.conresults.items():
+                profiles[name] = (numpy.array(conres.x),
+                        numpy.array(conres.ycalc))
+        self._appendRow(results.varnames, vals, unc, cov, profiles)
+        self.labels.append(label)
+        self.converged.append(bool(converged))
+        self.chi2.append(results.chi2)
+        self.rchi2.append(results.rchi2)
+        self.rw.append(results.rw)
+        return
+
+    def getColumn(self, name):
+        """Get the values and uncertainties of a variable over all fits.
+
+        name    --  The name of the variable.
+
+        Returns a (values, uncertainties) pair of numpy arrays, with one entry
+        per stored fit.
+
+        Raises KeyError if the variable was never stored.
+
+        """
+        col = self._colidx[name]
+        n = len(self)
+        return self._vals[:n, col].copy(), self._unc[:n, col].copy()
+
+    def getRow(self, index):
+        """Get the variable names and values of one fit.
+
+        index   --  Index of the fit in the store.
+
+        Returns a (varnames, varvals, varunc) tuple for the fit.
+
+        """
+        idx = self._covs[index][0]
+        names = [self.varnames[i] for i in idx]
+        return names, self._vals[index, idx], self._unc[index, idx]
+
+    def getCovariance(self, index):
+        """Get the covariance matrix of one fit.
+
+        index   --  Index of the fit in the store.
+
+        Returns a (varnames, cov) pair, where cov is ordered as varnames.
+
+        """
+        idx, cov = self._covs[index]
+        names = [self.varnames[i] for i in idx]
+        return names, cov.copy()
+
+    def getProfile(self, index, conname):
+        """Get the calculated profile of a FitContribution in one fit.
+
+        index   --  Index of the fit in the store.
+        conname --  The name of the FitContribution.
+
+        Returns an (x, ycalc) pair of arrays.
+
+        Raises KeyError if the profile was not stored.
+
+        """
+        return self._profiles[index][conname]
+
+    def extend(self, other):
+        """Append all fits held by another ResultsStore."""
+        for k in range(len(other)):
+            names, vals, unc = other.getRow(k)
+            cov = other.getCovariance(k)[1]
+            self._appendRow(names, vals, unc, cov, other._profiles[k])
+        self.labels.extend(other.labels)
+        self.converged.extend(other.converged)
+        self.chi2.extend(other.chi2)
+        self.rchi2.extend(other.rchi2)
+        self.rw.extend(other.rw)
+        return
+
+    def save(self, filename):
+        """Save the store to a numpy .npz file.
+
+        filename    --  Name of the file or an open file-like object.
+
+        """
+        n = len(self)
+        arrays = {}
+        arrays["varnames"] = numpy.array(self.varnames, dtype=str)
+        arrays["labels"] = numpy.array(self.labels)
+        arrays["converged"] = numpy.array(self.converged, dtype=bool)
+        arrays["chi2"] = numpy.array(self.chi2, dtype=float)
+        arrays["rchi2"] = numpy.array(self.rchi2, dtype=float)
+        arrays["rw"] = numpy.array(self.rw, dtype=float)
+        arrays["varvals"] = self._vals[:n]
+        arrays["varunc"] = self._unc[:n]
+        # Ragged data are stored flattened, with the row lengths.
+        arrays["covlen"] = numpy.array([len(idx) for idx, cov in self._covs],
+                dtype=int)
+        arrays["covidx"] = _concatenate([idx for idx, cov in self._covs], int)
+        arrays["covdata"] = _concatenate([cov.ravel() for idx, cov in
+            self._covs], float)
+        connames = set()
+        for profiles in self._profiles:
+            connames.update(profiles)
+        connames = sorted(connames)
+        arrays["connames"] = numpy.array(connames, dtype=str)
+        for i, name in enumerate(connames):
+            empty = (numpy.empty(0), numpy.empty(0))
+            xy = [p.get(name, empty) for p in self._profiles]
+            arrays["prolen%i" % i] = numpy.array([len(x) for x, y in xy],
+                    dtype=int)
+            arrays["x%i" % i] = _concatenate([x for x, y in xy], float)
+            arrays["ycalc%i" % i] = _concatenate([y for x, y in xy], float)
+        numpy.savez(filename, **arrays)
+        return
+
+    @classmethod
+    def load(cls, filename):
+        """Load a store saved with the save method.
+
+        filename    --  Name of the file or an open file-like object.
+
+        Returns the new ResultsStore.
+
+        """
+        data = numpy.load(filename)
+        connames = data["connames"].tolist()
+        store = cls(storeycalc = bool(connames))
+        store.labels = data["labels"].tolist()
+        store.converged = data["converged"].tolist()
+        store.chi2 = data["chi2"].tolist()
+        store.rchi2 = data["rchi2"].tolist()
+        store.rw = data["rw"].tolist()
+        store.varnames = data["varnames"].tolist()
+        store._colidx = dict((name, i) for i, name in
+                enumerate(store.varnames))
+        store._vals = data["varvals"].copy()
+        store._unc = data["varunc"].copy()
+        covlen = data["covlen"]
+        idxsplit = numpy.cumsum(covlen)[:-1]
+        covsplit = numpy.cumsum(covlen**2)[:-1]
+        allidx = numpy.split(data["covidx"], idxsplit)
+        allcov = numpy.split(data["covdata"], covsplit)
+        for idx, cov, m in zip(allidx, allcov, covlen):
+            store._covs.append((idx, cov.reshape(m, m)))
+        store._profiles = [{} for k in range(len(covlen))]
+        for i, name in enumerate(connames):
+            prolen = data["prolen%i" % i]
+            split = numpy.cumsum(prolen)[:-1]
+            xs = numpy.split(data["x%i" % i], split)
+            ys = numpy.split(data["ycalc%i" % i], split)
+            for profiles, x, y in zip(store._profiles, xs, ys):
+                if len(x):
+                    profiles[name] = (x, y)
+        data.close()
+        return store
+
+    def _appendRow(self, names, vals, unc, cov, profiles):
+        """Append the arrays of one fit."""
+        idx = self._columnIndices(names)
+        n = len(self)
+        nrows, ncols = self._vals.shape
+        # Grow the value arrays geometrically so that appending is cheap.
+        if n >= nrows or len(self.varnames) > ncols:
+            shape = (max(2 * nrows, n + 1, 16), len(self.varnames))
+            self._vals = _resize(self._vals, shape)
+            self._unc = _resize(self._unc, shape)
+        self._vals[n, idx] = vals
+        self._unc[n, idx] = unc
+        self._covs.append((idx, numpy.array(cov, dtype=float)))
+        self._profiles.append(profiles)
+        return
+
+    def _columnIndices(self, names):
+        """Get the column indices of variable names.
+
+        Columns are created for names that have not been seen before.
+
+        Returns the indices in a numpy array.
+
+        """
+        idx = []
+        for name in names:
+            i = self._colidx.get(name)
+            if i is None:
+                i = self._colidx[name] = len(self.varnames)
+                self.varnames.append(name)
+            idx.append(i)
+        return numpy.array(idx, dtype=int)
+
+# End class ResultsStore
+
+def _resize(a, shape):
+    """Copy a 2D array into a larger NaN-filled array."""
+    b = numpy.empty(shape, dtype=float)
+    b.fill(numpy.nan)
+    b[:a.shape[0], :a.shape[1]] = a
+    return b
+
+def _concatenate(arrays, dtype):
+    """Concatenate a possibly empty list of 1D arrays."""
+    if not arrays:
+        return numpy.empty(0, dtype=dtype)
+    return numpy.concatenate(arrays).astype(dtype)
+
+# End of file
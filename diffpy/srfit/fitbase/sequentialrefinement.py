@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+########################################################################
+#
+# diffpy.srfit      by DANSE Diffraction group
+#                   Simon J. L. Billinge
+#                   (c) 2010 The Trustees of Columbia University
+#                   in the City of New York.  All rights reserved.
+#
+# See AUTHORS.txt for a list of people who contributed.
+# See LICENSE_DANSE.txt for license information.
+#
+########################################################################
+"""The SequentialRefinement class for fitting a FitRecipe to a data series.
+
+A sequential (series) refinement fits one configured FitRecipe to an ordered
+series of datasets, such as measurements over a temperature or time series.
+Each dataset is swapped into the Profiles of the recipe's FitContributions and
+the refinement is started from the converged values of the preceding fits.
+The results of every fit are recorded in a ResultsStore.
+
+> seq = SequentialRefinement(recipe, warmstart = "extrapolate")
+> seq.refine(datasets, labels = temperatures)
+> uiso, duiso = seq.store.getColumn("Uiso")
+
+"""
+__all__ = ["SequentialRefinement", "leastsqOptimizer", "loadDataset"]
+
+import numpy
+
+from diffpy.srfit.fitbase.fitresults import FitResults
+from diffpy.srfit.fitbase.profilestream import ProfileStream
+from diffpy.srfit.fitbase.resultsstore import ResultsStore
+
+
+def leastsqOptimizer(recipe):
+    """Refine a recipe with scipy.optimize.leastsq.
+
+    The recipe variables are left at the optimized values.
+
+    Returns True if leastsq reports convergence.
+
+    """
+    from scipy.optimize import leastsq
+    p, ier = leastsq(recipe.residual, recipe.getValues())
+    recipe.residual(numpy.atleast_1d(p))
+    return ier in (1, 2, 3, 4)
+
+def loadDataset(recipe, dataset):
+    """Load a dataset into the Profiles of a recipe.
+
+    dataset --  The dataset to load. This is a dictionary of data indexed by
+                the FitContribution name. For recipes with a single
+                FitContribution the data can also be passed directly. The data
+                is either an (x, y) or (x, y, dy) tuple of arrays, or a
+                ProfileParser that has already parsed the data.
+
+    Raises ValueError if the dataset is not a dictionary and the recipe has
+    more than one FitContribution.
+
+    """
+    cons = recipe._contributions
+    if not isinstance(dataset, dict):
+        if len(cons) != 1:
+            m = "Dataset must be indexed by FitContribution name"
+            raise ValueError(m)
+        dataset = {cons.keys()[0] : dataset}
+
+    for name, data in dataset.items():
+        profile = cons[name].profile
+        if hasattr(data, "getData"):
+            profile.loadParsedData(data)
+        else:
+            profile.setObservedProfile(*data)
+    return
+
+
+class SequentialRefinement(object):
+    """Engine for refining one FitRecipe over a series of datasets.
+
+    Attributes
+    recipe      --  The FitRecipe refined over the series.
+    optimizer   --  Callable that refines the recipe in place. The callable
+                    takes the recipe as its only argument and returns True if
+                    the refinement converged (default leastsqOptimizer).
+    warmstart   --  Strategy for the starting values of each refinement.
+                    "previous" starts from the converged values of the
+                    preceding dataset, "extrapolate" linearly extrapolates
+                    the two preceding converged values and "initial" restarts
+                    every fit from the values the recipe had before the series
+                    (default "previous").
+    loader      --  Callable that loads a dataset into the recipe, called as
+                    loader(recipe, dataset) (default loadDataset).
+    store       --  The ResultsStore that receives the results of each fit.
+
+    """
+
+    warmstarts = ("previous", "extrapolate", "initial")
+
+    def __init__(self, recipe, optimizer = leastsqOptimizer,
+            warmstart = "previous", loader = loadDataset, store = None):
+        """Initialize the attributes.
+
+        recipe      --  A configured FitRecipe.
+        optimizer   --  Callable that refines the recipe (default
+                        leastsqOptimizer).
+        warmstart   --  Warm-start strategy, one of "previous", "extrapolate"
+                        and "initial" (default "previous").
+        loader      --  Callable that loads a dataset into the recipe
+                        (default loadDataset).
+        store       --  A ResultsStore for the results. If this is None
+                        (default), a new ResultsStore is created.
+
+        Raises ValueError if warmstart is not a known strategy.
+
+        """
+        if warmstart not in self.warmstarts:
+            raise ValueError("Unknown warm-start strategy '%s'" % warmstart)
+        self.recipe = recipe
+        self.optimizer = optimizer
+        self.warmstart = warmstart
+        self.loader = loader
+        if store is None:
+            store = ResultsStore()
+        self.store = store
+        return
+
+    def refine(self, series, labels = None):
+        """Refine the recipe over a series of datasets.
+
+        series  --  Iterable of datasets that are passed to the loader. If
+                    this is a ProfileStream, the datasets are loaded by
+                    iterating the stream and the loader is not used.
+        labels  --  Sequence of labels for the datasets, such as the
+                    temperatures of the series (default None). Numeric labels
+                    are used to scale the "extrapolate" warm start. If this is
+                    None, the dataset index is used.
+
+        Returns the ResultsStore with the results of the series.
+
+        """
+        recipe = self.recipe
+        loaded = isinstance(series, ProfileStream)
+        initial = numpy.array(recipe.getValues(), dtype=float)
+        history = []
+
+        for k, dataset in enumerate(series):
+            label = k if labels is None else labels[k]
+            if not loaded:
+                self.loader(recipe, dataset)
+
+            p = self._startValues(initial, history, label)
+            recipe._applyValues(p)
+            converged = self.optimizer(recipe)
+
+            results = FitResults(recipe)
+            self.store.append(results, label, converged)
+            if converged:
+                vals = numpy.array(recipe.getValues(), dtype=float)
+                history.append((label, vals))
+                del history[:-2]
+
+        return self.store
+
+    def refineChunks(self, recipefactory, series, nchunks, labels = None,
+            ncpu = None):
+        """Refine contiguous chunks of a series in parallel worker processes.
+
+        Each worker creates its own recipe with recipefactory and refines its
+        chunk sequentially, with warm starts inside the chunk. The first
+        dataset of each chunk starts from the values set by recipefactory. The
+        results are appended to the store in the series order.
+
+        recipefactory   --  Picklable callable that takes no arguments and
+                            returns a configured FitRecipe.
+        series  --  Sequence of datasets. The datasets, the optimizer and the
+                    loader must be picklable.
+        nchunks --  Number of chunks the series is split into.
+        labels  --  Sequence of labels for the datasets (default None).
+        ncpu    --  Number of worker processes. If this is None (default),
+                    then nchunks processes are used.
+
+        Returns the ResultsStore with the results of the series.
+
+        """
+        series = list(series)
+        if labels is None:
+            labels = range(len(series))
+        labels = list(labels)
+        bounds = numpy.linspace(0, len(series), nchunks + 1).astype(int)
+        tasks = []
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            if lo == hi:
+                continue
+            tasks.append((recipefactory, self.optimizer, self.warmstart,
+                self.loader, series[lo:hi], labels[lo:hi]))
+
+        from multiprocessing import Pool
+        pool = Pool(ncpu or len(tasks))
+        try:
+            stores = pool.map(_refineChunk, tasks)
+        finally:
+            pool.close()
+            pool.join()
+
+        for store in stores:
+            self.store.extend(store)
+        return self.store
+
+    def _startValues(self, initial, history, label):
+        """Get the starting variable values for the next refinement."""
+        if self.warmstart == "initial" or not history:
+            return initial
+        lastlabel, last = history[-1]
+        if self.warmstart == "previous" or len(history) < 2:
+            return last
+        prevlabel, prev = history[-2]
+        # Scale the step by the label spacing when the labels are numeric.
+        try:
+            f = float(label - lastlabel) / (lastlabel - prevlabel)
+        except (TypeError, ZeroDivisionError):
+            f = 1.0
+        return last + f * (last - prev)
+
+# End class SequentialRefinement
+
+def _refineChunk(task):
+    """Refine one chunk of a series in a worker process."""
+    recipefactory, optimizer, warmstart, loader, series, labels = task
+    seq = SequentialRefinement(recipefactory(), optimizer, warmstart, loader)
+    return seq.refine(series, labels)
+
+# End of file
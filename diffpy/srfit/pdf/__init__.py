@@ -18,10 +18,12 @@
 
 """
 
-__all__ = ["PDFGenerator", "DebyePDFGenerator", "PDFContribution", "PDFParser"]
+__all__ = ["PDFGenerator", "DebyePDFGenerator", "PairPDFGenerator",
+        "PDFContribution", "PDFParser"]
 
 from diffpy.srfit.pdf.pdfgenerator import PDFGenerator
 from diffpy.srfit.pdf.debyepdfgenerator import DebyePDFGenerator
+from diffpy.srfit.pdf.pairpdfgenerator import PairPDFGenerator
 from diffpy.srfit.pdf.pdfcontribution import PDFContribution
 from diffpy.srfit.pdf.pdfparser import PDFParser
 
@@ -20,6 +20,9 @@ as a base for the PDFGenerator and DebyePDFGenerator classes.
 """
 __all__ = ["BasePDFGenerator"]
 
+from itertools import count
+from weakref import WeakKeyDictionary
+
 import numpy
 
 from diffpy.srfit.fitbase import ProfileGenerator
@@ -27,6 +30,11 @@ from diffpy.srfit.fitbase.parameter import ParameterAdapter
 from diffpy.srfit.structure import struToParameterSet
 
 
+# Tokens that identify phases in the keys of the result cache. Phases are not
+# kept alive by their tokens, and tokens are never reused.
+_phasetokens = WeakKeyDictionary()
+_newtoken = count().next
+
 # FIXME - Parameter creation will have to be smarter once deeper calculator
 # configuration is enabled.
 
@@ -44,7 +52,22 @@ class BasePDFGenerator(ProfileGenerator):
     stru    --  The structure objected adapted by _phase.
     _lastr  --  The last value of r over which the PDF was calculated. This is
                 used to configure the calculator when r changes.
-    _pool   --  A multiprocessing.Pool for managing parallel computation.
+    _pool   --  The WorkerPool used for parallel computation, or None. This
+                is the process-wide pool from
+                diffpy.srfit.util.workerpool.getWorkerPool.
+    _ybase  --  The PDF calculated over _lastr without the envelope terms
+                (see _envparnames), or None. This is kept when only the
+                envelope Parameters change, so that these are applied with a
+                multiplication rather than a new PDF calculation.
+    _envpars --  List of the envelope Parameters.
+    _cache  --  A ResultCache for the calculated PDFs or None (default). See
+                setCache.
+    _interp --  A (grid, plan) pair for mapping the calculator output onto
+                _lastr, or None. grid identifies the calculator r-grid the
+                plan was made for. See _makeInterpolation.
+    _evalpool   --  A WorkerPool that runs the calculator in a worker
+                process, or None (default). This is set by PDFContribution
+                for the concurrent evaluation of its phases.
 
     Managed Parameters:
     scale   --  Scale factor
@@ -53,6 +76,10 @@ class BasePDFGenerator(ProfileGenerator):
     qbroad  --  Resolution peak broadening term
     qdamp   --  Resolution peak dampening term
 
+    The scale and qdamp Parameters are envelope terms. They are held by the
+    generator rather than by the calculator and are applied to the calculated
+    PDF as the factor scale * exp(-0.5 * (qdamp * r)**2).
+
     Managed ParameterSets:
     The structure ParameterSet (SrRealParSet instance) used to calculate the
     profile is named by the user.
@@ -83,11 +110,20 @@ class BasePDFGenerator(ProfileGenerator):
         self._calc = None
 
         self._pool = None
+        self._ybase = None
+        self._envpars = []
+        self._cache = None
+        self._interp = None
+        self._evalpool = None
 
         return
 
     _parnames = ['delta1', 'delta2', 'qbroad', 'scale', 'qdamp']
 
+    # Parameters applied as a multiplicative envelope, with the calculator
+    # value that turns them off.
+    _envparnames = {'scale' : 1.0, 'qdamp' : 0.0}
+
     def _setCalculator(self, calc):
         """Set the SrReal calulator instance.
 
@@ -97,6 +133,11 @@ class BasePDFGenerator(ProfileGenerator):
         """
         self._calc = calc
         for pname in self.__class__._parnames:
+            if pname in self._envparnames:
+                par = self.newParameter(pname, getattr(calc, pname))
+                setattr(calc, pname, self._envparnames[pname])
+                self._envpars.append(par)
+                continue
             self.addParameter(
                 ParameterAdapter(pname, self._calc, attr = pname)
                 )
@@ -108,7 +149,10 @@ class BasePDFGenerator(ProfileGenerator):
 
         ncpu    -- Number of parallel processes.  Revert to serial mode when 1.
         mapfunc -- A mapping function to use. If this is None (default),
-                   multiprocessing.Pool.imap_unordered will be used.
+                   the imap_unordered method of the process-wide WorkerPool
+                   will be used. The worker processes are shared by all
+                   generators and their number does not exceed the number of
+                   CPUs. See diffpy.srfit.util.workerpool.
 
         No return value.
         """
@@ -121,16 +165,37 @@ class BasePDFGenerator(ProfileGenerator):
             self._calc = calc_serial
             self._pool = None
             return
-        # Why don't we let the user shoot his foot or test on single CPU?
-        # ncpu = min(ncpu, multiprocessing.cpu_count())
         if mapfunc is None:
-            import multiprocessing
-            self._pool = multiprocessing.Pool(ncpu)
+            from diffpy.srfit.util.workerpool import getWorkerPool
+            self._pool = getWorkerPool(ncpu)
             mapfunc = self._pool.imap_unordered
 
         self._calc = createParallelCalculator(calc_serial, ncpu, mapfunc)
+        self._flush(self)
+        return
+
+    def setCache(self, cache):
+        """Set a cache for the calculated PDFs.
+
+        Generators that are given the same cache reuse each other's PDFs.
+        This avoids repeated calculations when several generators share a
+        phase through setPhase, or when the optimizer revisits a point. A
+        cached PDF is found by the identity of the phase, the values of all
+        its Parameters, the periodicity and the type and configuration of the
+        calculator. Changes to the structure that bypass the Parameters of the
+        phase are not detected.
+
+        cache   --  A diffpy.srfit.util.resultcache.ResultCache instance, or
+                    None to turn off caching.
+
+        """
+        self._cache = cache
         return
 
+    def getCache(self):
+        """Get the cache of the calculated PDFs. See 'setCache'."""
+        return self._cache
+
     def processMetaData(self):
         """Process the metadata once it gets set."""
         ProfileGenerator.processMetaData(self)
@@ -167,6 +232,7 @@ class BasePDFGenerator(ProfileGenerator):
         self._calc.setScatteringFactorTableByType(stype)
         # update the meta dictionary only if there was no exception
         self.meta["stype"] = self.getScatteringType()
+        self._flush(self)
         return
 
     def getScatteringType(self):
@@ -177,6 +243,7 @@ class BasePDFGenerator(ProfileGenerator):
         """Set the qmax value."""
         self._calc.qmax = qmax
         self.meta["qmax"] = self.getQmax()
+        self._flush(self)
         return
 
     def getQmax(self):
@@ -191,6 +258,7 @@ class BasePDFGenerator(ProfileGenerator):
         """
         self._calc.qmin = qmin
         self.meta["qmin"] = self.getQmin()
+        self._flush(self)
         return
 
     def getQmin(self):
@@ -255,6 +323,7 @@ class BasePDFGenerator(ProfileGenerator):
     def _prepare(self, r):
         """Prepare the calculator when a new r-value is passed."""
         self._lastr = r
+        self._interp = None
         self._calc.rstep = r[1] - r[0]
         self._calc.rmin = r[0]
         self._calc.rmax = r[-1] + 0.5*self._calc.rstep
@@ -276,6 +345,18 @@ class BasePDFGenerator(ProfileGenerator):
         ProfileGenerator._validate(self)
         return
 
+    def _flush(self, other):
+        """Invalidate cached state.
+
+        The PDF without the envelope terms is kept if other is one of the
+        envelope Parameters.
+
+        """
+        if not [par for par in self._envpars if par is other]:
+            self._ybase = None
+        ProfileGenerator._flush(self, other)
+        return
+
     def __call__(self, r):
         """Calculate the PDF.
 
@@ -285,16 +366,223 @@ class BasePDFGenerator(ProfileGenerator):
         created in setCrystal. Thus, we need only call pdf with the internal
         structure object.
 
+        The PDF is calculated without the envelope terms and cached. If only
+        the envelope Parameters changed since the last call, the cached PDF
+        is reused.
+
         """
+        if self._ybase is None or r is not self._lastr:
+            if r is not self._lastr:
+                self._prepare(r)
+
+            rcalc, y = self._calcPDF()
+            self._ybase = self._mapPDF(r, rcalc, y)
+
+        return self._applyEnvelope(r, self._ybase)
+
+    def calcBatch(self, values, pars = None, r = None, ncpu = None):
+        """Calculate the PDF for several states of the phase.
+
+        This is meant for finite-difference derivatives and population
+        optimizers, which need the PDF of many nearby structures. The
+        structures are evaluated together in worker processes.
+
+        values  --  Sequence of M vectors of Parameter values, one for each
+                    state.
+        pars    --  The Parameters of the phase that are assigned the values.
+                    If this is None (default), all Parameters of the phase in
+                    the order of its iterPars method.
+        r       --  The points to calculate the PDF over. If this is None
+                    (default), the calculation points of the profile are
+                    used.
+        ncpu    --  Number of worker processes. If this is None (default),
+                    the process-wide WorkerPool is used with all CPUs, see
+                    diffpy.srfit.util.workerpool. If this is 1, the states
+                    are calculated in this process. The structure and the
+                    calculator must be picklable for the worker processes.
+
+        The Parameters keep their values. Constraints on the Parameters are
+        not applied, so pars should only contain free Parameters.
+
+        Returns an array of shape (M, len(r)) with the PDF of each state.
+
+        Raises ValueError if a vector does not match pars.
+
+        """
+        if pars is None:
+            pars = list(self._phase.iterPars())
+        if r is None:
+            r = self.profile.x
+        values = numpy.asarray(values, dtype=float).reshape(-1, len(pars))
+        ybase = self._ybase
         if r is not self._lastr:
             self._prepare(r)
+            # The cached PDF is over the old r.
+            ybase = None
+        saved = [par.getValue() for par in pars]
+        try:
+            if ncpu == 1:
+                ycalc = []
+                for vals in values:
+                    for par, val in zip(pars, vals):
+                        par.setValue(val)
+                    rcalc, y = self._calcPDF()
+                    ycalc.append(self._mapPDF(r, rcalc, y))
+            else:
+                from copy import deepcopy
+                from diffpy.srfit.util.workerpool import getWorkerPool
+                calc = getattr(self._calc, 'pqobj', self._calc)
+                periodic = self._phase.usingSymmetry()
+                nometa = getattr(self._phase, "_nometa", False)
+                tasks = []
+                for vals in values:
+                    for par, val in zip(pars, vals):
+                        par.setValue(val)
+                    tasks.append((calc, deepcopy(self._phase.stru),
+                        periodic, nometa))
+                results = getWorkerPool(ncpu).map(_evalBatchTask, tasks)
+                ycalc = [self._mapPDF(r, rcalc, y) for rcalc, y in results]
+        finally:
+            for par, val in zip(pars, saved):
+                par.setValue(val)
+        # The phase is back in its original state.
+        self._ybase = ybase
+        ycalc = numpy.array(ycalc).reshape(len(values), len(r))
+        return self._applyEnvelope(r, ycalc)
+
+    def _mapPDF(self, r, rcalc, y):
+        """Map the calculator output onto r, replacing NaN with zeros."""
+        # The dot product is NaN only if y contains NaN, and it does not
+        # allocate a temporary array.
+        if numpy.isnan(numpy.dot(y, y)):
+            return numpy.zeros_like(r)
+        return self._interpolate(r, rcalc, y)
+
+    def _applyEnvelope(self, r, y):
+        """Apply the scale and qdamp envelope to the PDF y over r."""
+        y = self.scale.value * y
+        qdamp = self.qdamp.value
+        if qdamp:
+            y = y * numpy.exp(-0.5 * (qdamp * r)**2)
+        return y
 
-        rcalc, y = self._calc(self._phase._getSrRealStructure())
+    def _interpolate(self, r, rcalc, y):
+        """Map the calculator output onto r.
 
-        if numpy.isnan(y).any():
-            y = numpy.zeros_like(r)
-        else:
-            y = numpy.interp(r, rcalc, y)
-        return y
+        The mapping is worked out once for each r and calculator grid. When
+        r coincides with the calculator grid, which is usual after _prepare,
+        the output is returned as is or as a slice of it. Otherwise the
+        interpolation indices and weights are precomputed.
+
+        """
+        grid = (len(rcalc), rcalc[0], rcalc[-1])
+        if self._interp is None or self._interp[0] != grid:
+            self._interp = (grid, _makeInterpolation(r, rcalc))
+        kind, index, weight = self._interp[1]
+        if kind == "slice":
+            return y[index]
+        if kind == "take":
+            return y.take(index)
+        return y.take(index) * (1 - weight) + y.take(index + 1) * weight
+
+    def _calcPDF(self):
+        """Calculate the PDF or get it from the cache.
+
+        Returns the r-grid and the PDF of the calculator.
+
+        """
+        if self._cache is None:
+            return self._evalCalculator()
+        key = self._cacheKey()
+        result = self._cache.get(key)
+        if result is None:
+            result = self._evalCalculator()
+            result = tuple(numpy.asarray(a) for a in result)
+            self._cache.put(key, result)
+        return result
+
+    def _evalCalculator(self):
+        """Run the calculator on the phase.
+
+        The calculator runs in a worker process of _evalpool if that is set
+        and the calculator is not already parallel.
+
+        Returns the r-grid and the PDF of the calculator.
+
+        """
+        if self._evalpool is not None and not hasattr(self._calc, 'pqobj'):
+            return self._evalpool.apply(_evalRemote, (self._calc,
+                self._phase.stru, self._phase.usingSymmetry(),
+                getattr(self._phase, "_nometa", False)))
+        return self._calc(self._phase._getSrRealStructure())
+
+    def _cacheKey(self):
+        """Get the key of the current PDF in the result cache."""
+        phase = self._phase
+        token = _phasetokens.get(phase)
+        if token is None:
+            token = _phasetokens[phase] = _newtoken()
+        # The Parameters that have not been created cannot have changed.
+        state = tuple([_valueKey(par.value)
+            for par in phase._iterCreatedPars()])
+        calc = getattr(self._calc, 'pqobj', self._calc)
+        names = sorted(calc._namesOfDoubleAttributes())
+        config = tuple([calc._getDoubleAttr(n) for n in names])
+        return (token, phase.usingSymmetry(), type(calc).__name__,
+                calc.getRadiationType(), config, state)
 
 # End class BasePDFGenerator
+
+def _evalRemote(calc, stru, periodic, nometa = False):
+    """Run a calculator on a structure in a worker process.
+
+    Calculators with a periodic attribute get the periodicity through it and
+    the bare structure. SrReal calculators get the structure wrapped as by
+    the _getSrRealStructure method of the phase.
+
+    """
+    if hasattr(calc, 'periodic'):
+        calc.periodic = periodic
+    else:
+        from diffpy.srfit.structure.srrealparset import _wrapSrRealStructure
+        stru = _wrapSrRealStructure(stru, periodic, nometa)
+    return tuple(numpy.asarray(a) for a in calc(stru))
+
+def _valueKey(value):
+    """Get a hashable key of a Parameter value, which may be an array."""
+    if isinstance(value, numpy.ndarray):
+        return (value.shape, value.tostring())
+    return value
+
+def _evalBatchTask(task):
+    """Run a (calc, stru, periodic, nometa) task of calcBatch."""
+    return _evalRemote(*task)
+
+def _makeInterpolation(r, rcalc):
+    """Work out the linear interpolation from rcalc onto r.
+
+    The interpolation is equivalent to numpy.interp(r, rcalc, y), including
+    the clipping of points outside of rcalc to its end values.
+
+    Returns a (kind, index, weight) tuple. kind is "slice" if r is a uniform
+    section of rcalc and index is the slice of the section. kind is "take" if
+    all r are on points of rcalc and index is the array of these points. kind
+    is "interp" otherwise, and the values at r are interpolated from the
+    points index and index + 1 of rcalc with the weights weight.
+
+    """
+    r = numpy.asarray(r, dtype=float)
+    rcalc = numpy.asarray(rcalc, dtype=float)
+    n = len(rcalc)
+    tol = 1e-8 * max(1.0, abs(rcalc[-1]))
+    hi = rcalc.searchsorted(r).clip(1, n - 1)
+    lo = hi - 1
+    # Index of the nearest grid point and check if r is on the grid.
+    near = numpy.where(rcalc[hi] - r < r - rcalc[lo], hi, lo)
+    if (numpy.abs(rcalc[near] - r) <= tol).all():
+        if len(near) and (numpy.diff(near) == 1).all():
+            return "slice", slice(near[0], near[0] + len(near)), None
+        return "take", near, None
+    weight = (r - rcalc[lo]) / (rcalc[hi] - rcalc[lo])
+    weight = weight.clip(0, 1)
+    return "interp", lo, weight
@@ -21,21 +21,26 @@ where f(r) is the nanoparticle characteristic function and
 Gcryst(f) is the crystal PDF.
 
 These functions are meant to be imported and added to a FitContribution using
-the 'registerFunction' method of that class.
+the 'registerFunction' method of that class. The size arguments of the
+functions broadcast against r, so that a function can be evaluated for many
+sizes at once. PolydisperseCF uses this to average them over a size
+distribution.
 
 """
 
 __all__ = ["sphericalCF", "spheroidalCF", "spheroidalCF2",
-"lognormalSphericalCF", "sheetCF", "shellCF", "shellCF2", "SASCF"]
+"lognormalSphericalCF", "sheetCF", "shellCF", "shellCF2", "PolydisperseCF",
+"SASCF"]
 
 import numpy
 from numpy import pi, sqrt, log, exp, log2, ceil, sign
 from numpy import arctan as atan
 from numpy import arctanh as atanh
-from numpy.fft import ifft, fftfreq
+from scipy.fftpack import dst, next_fast_len
 from scipy.special import erf
 
 from diffpy.srfit.fitbase.calculator import Calculator
+from diffpy.srfit.util.resultcache import MemoizedFunction
 
 def sphericalCF(r, psize):
     """Spherical nanoparticle characteristic function.
@@ -47,12 +52,12 @@ def sphericalCF(r, psize):
     (converted from radius to diameter)
 
     """
-    f = numpy.zeros(numpy.shape(r), dtype=float)
-    if psize > 0:
-        x = numpy.array(r, dtype=float) / psize
-        inside = (x < 1.0)
-        xin = x[inside]
-        f[inside] = 1.0 - 1.5*xin + 0.5*xin*xin*xin
+    r = numpy.asarray(r, dtype=float)
+    psize = numpy.asarray(psize, dtype=float)
+    valid = psize > 0
+    x = r / numpy.where(valid, psize, 1.0)
+    inside = valid & (x < 1.0)
+    f = numpy.where(inside, 1.0 - 1.5*x + 0.5*x*x*x, 0.0)
     return f
 
 def spheroidalCF(r, erad, prad):
@@ -85,57 +90,52 @@ def spheroidalCF2(r, psize, axrat):
 
     """
     pelpt = 1.0 * axrat
+    r = numpy.asarray(r, dtype=float)
+    psize = numpy.asarray(psize, dtype=float)
+    shape = numpy.broadcast(r, psize).shape
 
-    if psize <= 0 or pelpt <= 0:
-        return numpy.zeros_like(r)
+    if pelpt <= 0:
+        return numpy.zeros(shape)
 
     # to simplify the equations
     v = pelpt
-    d = 1.0 * psize
+    valid = psize > 0
+    d = numpy.where(valid, psize, 1.0)
     d2 = d*d
     v2 = v*v
 
     if v == 1:
         return sphericalCF(r, psize)
 
-    rx = r
-    if v < 1:
+    # The expressions of each region are evaluated everywhere and selected
+    # afterwards, so their invalid values outside of the region are ignored.
+    r2 = r*r
+    with numpy.errstate(all = "ignore"):
 
-        r = rx[rx <= v*psize]
-        r2 = r*r
-        f1 = 1 - 3*r/(4*d*v)*(1-r2/(4*d2)*(1+2.0/(3*v2))) \
-                - 3*r/(4*d)*(1-r2/(4*d2))*v/sqrt(1-v2)*atanh(sqrt(1-v2))
+        if v < 1:
 
-        r = rx[numpy.logical_and(rx > v*psize, rx <= psize)]
-        r2 = r*r
-        f2 = (3*d/(8*r)*(1+r2/(2*d2))*sqrt(1-r2/d2) \
-                - 3*r/(4*d)*(1-r2/(4*d2))*atanh(sqrt(1-r2/d2)) \
-                ) * v/sqrt(1-v2)
+            f1 = 1 - 3*r/(4*d*v)*(1-r2/(4*d2)*(1+2.0/(3*v2))) \
+                    - 3*r/(4*d)*(1-r2/(4*d2))*v/sqrt(1-v2)*atanh(sqrt(1-v2))
 
-        r = rx[rx > psize]
-        f3 = numpy.zeros_like(r)
+            f2 = (3*d/(8*r)*(1+r2/(2*d2))*sqrt(1-r2/d2) \
+                    - 3*r/(4*d)*(1-r2/(4*d2))*atanh(sqrt(1-r2/d2)) \
+                    ) * v/sqrt(1-v2)
 
-        f = numpy.concatenate((f1,f2,f3))
+            f = numpy.where(r <= v*d, f1, numpy.where(r <= d, f2, 0.0))
 
-    elif v > 1:
+        elif v > 1:
 
-        r = rx[rx <= psize]
-        r2 = r*r
-        f1 = 1 - 3*r/(4*d*v)*(1-r2/(4*d2)*(1+2.0/(3*v2))) \
-                - 3*r/(4*d)*(1-r2/(4*d2))*v/sqrt(v2-1)*atan(sqrt(v2-1))
+            f1 = 1 - 3*r/(4*d*v)*(1-r2/(4*d2)*(1+2.0/(3*v2))) \
+                    - 3*r/(4*d)*(1-r2/(4*d2))*v/sqrt(v2-1)*atan(sqrt(v2-1))
 
-        r = rx[numpy.logical_and(rx > psize, rx <= v*psize)]
-        r2 = r*r
-        f2 = 1 - 3*r/(4*d*v)*(1-r2/(4*d2)*(1+2.0/(3*v2))) \
-            - 3.0/8*(1+r2/(2*d2))*sqrt(1-d2/r2)*v/sqrt(v2-1) \
-            - 3*r/(4*d)*(1-r2/(4*d2))*v/sqrt(v2-1) \
-            * (atan(sqrt(v2-1)) - atan(sqrt(r2/d2-1)))
+            f2 = 1 - 3*r/(4*d*v)*(1-r2/(4*d2)*(1+2.0/(3*v2))) \
+                - 3.0/8*(1+r2/(2*d2))*sqrt(1-d2/r2)*v/sqrt(v2-1) \
+                - 3*r/(4*d)*(1-r2/(4*d2))*v/sqrt(v2-1) \
+                * (atan(sqrt(v2-1)) - atan(sqrt(r2/d2-1)))
 
-        r = rx[rx > v*psize]
-        f3 = numpy.zeros_like(r)
-
-        f = numpy.concatenate((f1,f2,f3))
+            f = numpy.where(r <= d, f1, numpy.where(r <= v*d, f2, 0.0))
 
+    f = numpy.where(valid, f, 0.0)
     return f
 
 
@@ -188,11 +188,12 @@ def sheetCF(r, sthick):
     From Kodama et al., Acta Cryst. A, 62, 444-453
 
     """
-    if sthick <= 0: return numpy.zeros_like(r)
-
-    f = 0.5*sthick/r
-    sel = (r <= sthick)
-    f[sel] = 1 - f[sel]
+    r = numpy.asarray(r, dtype=float)
+    sthick = numpy.asarray(sthick, dtype=float)
+    with numpy.errstate(divide = "ignore"):
+        f = 0.5*sthick/r
+    f = numpy.where(r <= sthick, 1 - f, f)
+    f = numpy.where(sthick > 0, f, 0.0)
     return f
 
 def shellCF(r, radius, thickness):
@@ -221,8 +222,9 @@ def shellCF2(r, a, delta):
     From Lei et al., Phys. Rev. B, 80, 024118 (2009)
 
     """
-    a = 1.0*a
-    d = 1.0*delta
+    r = numpy.asarray(r, dtype=float)
+    a = numpy.asarray(a, dtype=float)
+    d = numpy.asarray(delta, dtype=float)
     a2 = a**2
     d2 = d**2
     dmr = d-r
@@ -233,16 +235,103 @@ def shellCF2(r, a, delta):
       - 2*(2*a-r)**2 * (r*(4*a+r)-3*d2) * sign(2*a-r) \
       + r*(4*a-2*d+r)*(2*a-d-r)**2*sign(2*a-d-r)
 
-    f[r > 2*a+d] = 0
+    f = numpy.where(r > 2*a+d, 0.0, f)
 
     den = 8.0*r*d*(12*a2+d2)
     zmask = (den == 0.0)
-    vmask = ~zmask
-    f[vmask] /= den[vmask]
-    f[zmask] = 1
+    f = numpy.where(zmask, 1.0, f / numpy.where(zmask, 1.0, den))
     return f
 
 
+class PolydisperseCF(object):
+    """Characteristic function of particles with a distribution of sizes.
+
+    This averages a characteristic function over a lognormal distribution of
+    its first size argument. The particles contribute in proportion to their
+    volume, like in lognormalSphericalCF. The average is taken by quadrature
+    over the logarithm of the size, with the characteristic function
+    evaluated on an (nsizes, nr) grid in a single call. The results are
+    cached by the r-array and the parameters, see MemoizedFunction.
+
+    For example, a shell of lognormally distributed radius is registered as
+    pcf = PolydisperseCF(shellCF2, volume = shellVolume)
+    contribution.registerFunction(pcf, name = "f",
+        argnames = ["r", "a", "asig", "delta"])
+    where shellVolume(a, delta) returns a**2 * delta.
+
+    Attributes:
+    cf      --  The characteristic function, called as cf(r, size, *args). Its
+                size argument must broadcast against r, as in the functions of
+                this module.
+    npoints --  The number of quadrature points.
+    volume  --  Function of (size, *args) proportional to the particle
+                volume, or None for size**3.
+    _memo   --  MemoizedFunction of the average.
+
+    """
+
+    def __init__(self, cf, npoints = 64, volume = None):
+        """Initialize the attributes.
+
+        cf      --  The characteristic function, see Attributes.
+        npoints --  The number of quadrature points (default 64).
+        volume  --  Function of (size, *args) proportional to the particle
+                    volume, or None (default) for size**3.
+
+        """
+        self.cf = cf
+        self.npoints = npoints
+        self.volume = volume
+        self._memo = MemoizedFunction(self._average)
+        return
+
+    def __call__(self, r, psize, psig, *args):
+        """Calculate the characteristic function.
+
+        r       --  distance of interaction
+        psize   --  The mean of the size
+        psig    --  The standard deviation of the size
+        args    --  The other arguments of cf.
+
+        """
+        return self._memo(r, psize, psig, *args)
+
+    def _average(self, r, psize, psig, *args):
+        """Calculate the average over the size distribution."""
+        r = numpy.asarray(r, dtype=float)
+        if psize <= 0:
+            return numpy.zeros_like(r)
+        if psig <= 0:
+            return self.cf(r, psize, *args)
+        sizes, weights = self.getSizes(psize, psig, *args)
+        sizes = sizes.reshape((-1,) + (1,) * r.ndim)
+        f = self.cf(r[numpy.newaxis, ...], sizes, *args)
+        return numpy.tensordot(weights, f, 1)
+
+    def getSizes(self, psize, psig, *args):
+        """Get the quadrature points of the size distribution.
+
+        Returns arrays of the sizes and their weights. The weights include the
+        particle volume and sum to one.
+
+        """
+        # The lognormal parameters as in lognormalSphericalCF. The quadrature
+        # is the midpoint rule over +-6 standard deviations of log(size).
+        s = sqrt(log(1.0*psig*psig/(psize*psize) + 1))
+        mu = log(psize) - s*s/2
+        x = 12.0 * ((numpy.arange(self.npoints) + 0.5) / self.npoints - 0.5)
+        sizes = exp(mu + s*x)
+        if self.volume is None:
+            vol = sizes**3
+        else:
+            vol = self.volume(sizes, *args)
+        weights = exp(-0.5*x*x) * vol
+        weights /= weights.sum()
+        return sizes, weights
+
+# End class PolydisperseCF
+
+
 class SASCF(Calculator):
     """Calculator class for characteristic functions from sans-models.
 
@@ -253,6 +342,10 @@ class SASCF(Calculator):
 
     Attributes:
     _model      --  BaseModel object this adapts.
+    _grids      --  Dictionary of the (q, rp) grids of the transform, indexed
+                    by the number of points and the transform range.
+    _interp     --  Dictionary of the indices and weights that interpolate
+                    the transform onto an input r, indexed by r and the grid.
 
     Managed Parameters:
     These depend on the parameters of the BaseModel object held by _model. They
@@ -263,6 +356,9 @@ class SASCF(Calculator):
 
     """
 
+    # Maximum number of cached grids and interpolations.
+    maxgrids = 8
+
     def __init__(self, name, model):
         """Initialize the generator.
 
@@ -273,6 +369,8 @@ class SASCF(Calculator):
         Calculator.__init__(self, name)
 
         self._model = model
+        self._grids = {}
+        self._interp = {}
 
         from diffpy.srfit.sas.sasparameter import SASParameter
         # Wrap normal parameters
@@ -296,8 +394,7 @@ class SASCF(Calculator):
         # We want very fine r-spacing so we can properly normalize f(r). This
         # equates to having a large qmax so that the Fourier transform is
         # finely spaced. We also want the calculation to be fast, so we pick
-        # qmax such that the number of q-points is a power of 2. This allows us
-        # to use the fft.
+        # the number of q-points such that the transform is fast.
         #
         # The initial dr is somewhat arbitrary, but using dr = 0.01 allows for
         # the f(r) calculated from a particle of diameter 50, over r =
@@ -313,36 +410,31 @@ class SASCF(Calculator):
             y = numpy.zeros_like(r)
             return y
 
+        # Round the range up to 1/16 of an octave, so that the grid is reused
+        # when the size changes a little.
         rmax = max(ed, 2 * r[-1])
-        dq = pi / rmax
-        qmax = pi / dr
-        numpoints = int(2**(ceil(log2(qmax/dq))))
-        qmax = dq * numpoints
+        rmax = 2**(ceil(16 * log2(rmax)) / 16)
+        q, rp = self._getGrid(dr, rmax)
 
-        # Calculate F(q) = q * I(q) from model
-        q = fftfreq(int(qmax/dq)) * qmax
+        # Calculate F(q) = q * I(q) from model. F(q) is odd, so its sine
+        # transform only needs the positive q-values.
         fq = q * self._model.evalDistribution(q)
 
-        # Calculate g(r) and the effective r-points
-        rp = fftfreq(numpoints) * 2 * pi / dq
-        # Note sine transform = imaginary part of ifft
-        gr = ifft(fq).imag
+        # Calculate g(r) on the effective r-points. This is the imaginary part
+        # of the inverse fft of F(q) over the full q-range.
+        numpoints = 2 * len(rp)
+        gr = numpy.zeros_like(rp)
+        gr[1:] = dst(fq, type = 1) / numpoints
 
-        # Calculate full-fr for normalization
-        assert (rp[0] == 0.0)
-        frp = numpy.zeros_like(gr)
-        frp[1:] = gr[1:] / rp[1:]
-
-        # Inerpolate onto requested grid, do not use data after jump in rp
-        assert (numpoints % 2 == 0)
-        nhalf = numpoints / 2
-        fr = numpy.interp(r, rp[:nhalf], gr[:nhalf])
+        # Interpolate onto requested grid
+        idx, w = self._getInterp(r, rp)
+        fr = (1 - w) * gr[idx] + w * gr[idx + 1]
         vmask = (r != 0)
         fr[vmask] /= r[vmask]
 
         # Normalize. We approximate fr[0] by using the fact that f(r) is linear
         # at low r. By definition, fr[0] should equal 1.
-        fr0 = 2*frp[2] - frp[1]
+        fr0 = 2 * gr[2] / rp[2] - gr[1] / rp[1]
         fr /= fr0
 
         # Fix potential divide-by-zero issue, fr is 1 at r == 0
@@ -350,5 +442,53 @@ class SASCF(Calculator):
 
         return fr
 
+    def _getGrid(self, dr, rmax):
+        """Get the grids of the sine transform.
+
+        dr      --  The r-resolution of the transform. The full fft has at
+                    least rmax / dr points, of which the sine transform keeps
+                    half, so the r-points are spaced by at most 2 * dr.
+        rmax    --  The range of the transform in r.
+
+        Returns the q-points, q = k * dq for 0 < k < n, and the r-points, rp
+        = k * pi / (n * dq) for 0 <= k < n, where dq = pi / rmax and 2 * n is
+        a fast length for the fft.
+
+        """
+        n = next_fast_len(int(ceil(rmax / dr / 2)))
+        key = (n, rmax)
+        grid = self._grids.get(key)
+        if grid is None:
+            if len(self._grids) >= self.maxgrids:
+                self._grids.clear()
+                self._interp.clear()
+            dq = pi / rmax
+            k = numpy.arange(n, dtype = float)
+            grid = (k[1:] * dq, k * pi / (n * dq))
+            self._grids[key] = grid
+        return grid
+
+    def _getInterp(self, r, rp):
+        """Get the linear interpolation from rp onto r.
+
+        Returns index and weight arrays, so that f(r) = (1 - w) * f[index] +
+        w * f[index + 1]. Like numpy.interp, the values beyond the ends of rp
+        are those at the ends.
+
+        """
+        r = numpy.asarray(r, dtype = float)
+        key = (r.tostring(), len(rp), rp[-1])
+        result = self._interp.get(key)
+        if result is None:
+            if len(self._interp) >= self.maxgrids:
+                self._interp.clear()
+            step = rp[1] - rp[0]
+            idx = numpy.clip((r / step).astype(int), 0, len(rp) - 2)
+            w = numpy.clip((r - rp[idx]) / step, 0, 1)
+            result = (idx, w)
+            self._interp[key] = result
+        return result
+
+# End class SASCF
 
 # End of file
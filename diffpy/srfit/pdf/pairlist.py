@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+########################################################################
+#
+# diffpy.srfit      by DANSE Diffraction group
+#                   Simon J. L. Billinge
+#                   (c) 2010 The Trustees of Columbia University
+#                   in the City of New York.  All rights reserved.
+#
+# See AUTHORS.txt for a list of people who contributed.
+# See LICENSE_DANSE.txt for license information.
+#
+########################################################################
+"""Classes for tabulating interatomic distances.
+
+A PairList holds all atom pairs of a structure that are closer than a cutoff
+distance, with their distances and directions. A PairHistogram only counts
+the pairs of each element pair in distance bins, so that its size does not
+depend on the number of atoms. Both depend only on the geometry of the
+structure, that is the lattice and the atom positions, so they can be reused
+as long as these do not change.
+
+"""
+__all__ = ["PairList", "PairHistogram"]
+
+import numpy
+
+# Maximum number of elements of the temporary arrays used in the pair search.
+_chunksize = 2**20
+
+class PairList(object):
+    """Table of the atom pairs of a structure up to a cutoff distance.
+
+    Pairs are ordered, that is both (i, j) and (j, i) are listed. In periodic
+    structures the second atom of a pair can be any periodic image of atom j.
+
+    Attributes
+    rcut    --  The cutoff distance.
+    natoms  --  The number of atoms.
+    i       --  Array of the indices of the first atoms of the pairs.
+    j       --  Array of the indices of the second atoms of the pairs.
+    d       --  Array of the pair distances.
+    u       --  Array of the unit vectors from atom i to atom j, with shape
+                (npairs, 3).
+    _xyz    --  The Cartesian atom positions, shape (natoms, 3).
+    _base   --  The Cartesian lattice vectors as rows, or None for
+                non-periodic structures.
+
+    """
+
+    def __init__(self, xyz, base = None, rcut = 10.0):
+        """Find the atom pairs.
+
+        xyz     --  Cartesian atom positions, shape (natoms, 3).
+        base    --  Cartesian lattice vectors as rows of a 3x3 array, or
+                    None for a non-periodic structure (default None).
+        rcut    --  The cutoff distance (default 10).
+
+        """
+        self.rcut = float(rcut)
+        self._xyz = numpy.array(xyz, dtype=float).reshape(-1, 3)
+        self._base = None
+        if base is not None:
+            self._base = numpy.array(base, dtype=float)
+        self.natoms = len(self._xyz)
+        self.i, self.j, self.d, self.u = self._findPairs(
+                numpy.arange(self.natoms))
+        return
+
+    def __len__(self):
+        """Get the number of pairs."""
+        return len(self.d)
+
+    def pairsOf(self, sel):
+        """Get the pairs that involve the selected atoms.
+
+        sel     --  Array of atom indices.
+
+        Returns the i, j, d, u arrays of the pairs where atom i or atom j is
+        selected.
+
+        """
+        mask = numpy.in1d(self.i, sel) | numpy.in1d(self.j, sel)
+        return self.i[mask], self.j[mask], self.d[mask], self.u[mask]
+
+    def update(self, sel, xyz):
+        """Update the pairs after some of the atoms moved.
+
+        Only the pairs of the moved atoms are searched again, which takes
+        O(natoms) operations for each moved atom.
+
+        sel     --  Array of the indices of the moved atoms.
+        xyz     --  The new Cartesian positions of all atoms.
+
+        """
+        sel = numpy.unique(sel)
+        self._xyz = numpy.array(xyz, dtype=float).reshape(-1, 3)
+        keep = ~(numpy.in1d(self.i, sel) | numpy.in1d(self.j, sel))
+        i, j, d, u = self._findPairs(sel)
+        # The pairs that end at a moved atom are the reverse of the pairs
+        # that start there.
+        rev = ~numpy.in1d(j, sel)
+        self.i = numpy.concatenate([self.i[keep], i, j[rev]])
+        self.j = numpy.concatenate([self.j[keep], j, i[rev]])
+        self.d = numpy.concatenate([self.d[keep], d, d[rev]])
+        self.u = numpy.concatenate([self.u[keep], u, -u[rev]])
+        return
+
+    def _findPairs(self, sel):
+        """Find the pairs that start at the selected atoms.
+
+        sel     --  Array of the indices of the first atoms.
+
+        Returns the i, j, d, u arrays of the pairs.
+
+        """
+        xyz = self._xyz
+        n = len(xyz)
+        trans = _translations(xyz, self._base, self.rcut)
+        found = []
+        # Block the search so that the temporary arrays stay small.
+        bi = max(1, _chunksize // max(n, 1))
+        for lo in range(0, len(sel), bi):
+            isel = sel[lo:lo + bi]
+            bt = max(1, _chunksize // (len(isel) * max(n, 1)))
+            for tlo in range(0, len(trans), bt):
+                t = trans[tlo:tlo + bt]
+                # Shape (ntrans, nsel, natoms, 3)
+                v = (xyz[numpy.newaxis, numpy.newaxis, :, :]
+                        + t[:, numpy.newaxis, numpy.newaxis, :]
+                        - xyz[isel][numpy.newaxis, :, numpy.newaxis, :])
+                d = numpy.sqrt((v**2).sum(axis=-1))
+                it, ii, jj = numpy.nonzero((d > 1e-8) & (d <= self.rcut))
+                dd = d[it, ii, jj]
+                found.append((isel[ii], jj, dd, v[it, ii, jj] / dd[:, None]))
+        if not found:
+            return (numpy.zeros(0, dtype=int), numpy.zeros(0, dtype=int),
+                    numpy.zeros(0), numpy.zeros((0, 3)))
+        return tuple(numpy.concatenate(a) for a in zip(*found))
+
+# End class PairList
+
+
+class PairHistogram(object):
+    """Histogram of the pair distances of a structure by element pair.
+
+    The histogram counts ordered pairs, like PairList, up to a cutoff
+    distance. The distances are computed in blocks and only the counts are
+    kept, so that the memory use is independent of the number of pairs.
+    The mean distance of the pairs in each bin is kept as well, so that the
+    error of the binning is well below the bin width.
+
+    Attributes
+    rcut        --  The cutoff distance.
+    binwidth    --  The width of the distance bins.
+    ntypes      --  The number of atom types.
+    counts      --  Array of the pair counts with shape (ntypes, ntypes,
+                    nbins). The count of bin k is for distances in
+                    [k * binwidth, (k + 1) * binwidth). This is symmetric in
+                    the first two indices.
+    distances   --  Array of the mean pair distances of the bins, with the
+                    shape of counts. Empty bins hold the bin center.
+
+    """
+
+    def __init__(self, xyz, types, base = None, rcut = 10.0,
+            binwidth = 0.001):
+        """Count the atom pairs.
+
+        xyz     --  Cartesian atom positions, shape (natoms, 3).
+        types   --  Array of the type indices of the atoms.
+        base    --  Cartesian lattice vectors as rows of a 3x3 array, or
+                    None for a non-periodic structure (default None).
+        rcut    --  The cutoff distance (default 10).
+        binwidth    --  The width of the distance bins (default 0.001).
+
+        """
+        self.rcut = float(rcut)
+        self.binwidth = float(binwidth)
+        xyz = numpy.array(xyz, dtype=float).reshape(-1, 3)
+        types = numpy.asarray(types, dtype=int)
+        self.ntypes = types.max() + 1 if len(types) else 0
+        nbins = int(self.rcut / self.binwidth) + 1
+        self.counts = numpy.zeros((self.ntypes, self.ntypes, nbins))
+        self.distances = numpy.zeros_like(self.counts)
+        self.distances[...] = self.getBinCenters()
+        if len(xyz):
+            xyz = xyz - xyz.mean(axis=0)
+            if base is not None:
+                base = numpy.array(base, dtype=float)
+            self._count(xyz, types, base, nbins)
+        return
+
+    def getBinCenters(self):
+        """Get the distances of the bin centers."""
+        return self.binwidth * (numpy.arange(self.counts.shape[-1]) + 0.5)
+
+    def _count(self, xyz, types, base, nbins):
+        """Count the pairs into the histogram."""
+        n = len(xyz)
+        ntypes = self.ntypes
+        trans = _translations(xyz, base, self.rcut)
+        # Only pairs with i < j are counted in the home cell, each twice.
+        # Translated images are counted in full.
+        sq = (xyz**2).sum(axis=1)
+        flat = numpy.zeros(ntypes * ntypes * nbins)
+        dsum = numpy.zeros_like(flat)
+        bi = max(1, _chunksize // max(n, 1))
+        for lo in range(0, n, bi):
+            hi = min(n, lo + bi)
+            xi = xyz[lo:hi]
+            for t in trans:
+                home = not t.any()
+                jlo = lo if home else 0
+                xj = xyz[jlo:] + t
+                # The squared distances from the Gram matrix, which is
+                # faster than forming the difference vectors.
+                d2 = (sq[lo:hi, None] + (xj**2).sum(axis=1)[None, :]
+                        - 2 * numpy.dot(xi, xj.T))
+                mask = d2 <= self.rcut**2
+                if home:
+                    mask &= (numpy.arange(lo, hi)[:, None] <
+                            numpy.arange(jlo, n)[None, :])
+                ii, jj = numpy.nonzero(mask)
+                if not len(ii):
+                    continue
+                d = numpy.sqrt(numpy.maximum(d2[ii, jj], 0))
+                keep = d > 1e-8
+                ii, jj, d = ii[keep], jj[keep], d[keep]
+                k = numpy.minimum((d / self.binwidth).astype(int), nbins - 1)
+                ti = types[lo + ii]
+                tj = types[jlo + jj]
+                w = 2.0 if home else 1.0
+                idx = (ti * ntypes + tj) * nbins + k
+                flat += w * numpy.bincount(idx, minlength = len(flat))
+                dsum += w * numpy.bincount(idx, d, len(flat))
+        counts = flat.reshape(ntypes, ntypes, nbins)
+        dsum = dsum.reshape(ntypes, ntypes, nbins)
+        # Make the histogram symmetric in the types.
+        counts = 0.5 * (counts + counts.transpose(1, 0, 2))
+        dsum = 0.5 * (dsum + dsum.transpose(1, 0, 2))
+        nz = counts > 0
+        self.counts = counts
+        self.distances[nz] = dsum[nz] / counts[nz]
+        return
+
+# End class PairHistogram
+
+def _translations(xyz, base, rcut):
+    """Get the lattice translations that can hold pairs within rcut.
+
+    xyz     --  Cartesian atom positions, shape (natoms, 3).
+    base    --  Cartesian lattice vectors as rows, or None for non-periodic
+                structures.
+    rcut    --  The cutoff distance.
+
+    Returns an array of Cartesian translation vectors, shape (ntrans, 3).
+
+    """
+    if base is None or not len(xyz):
+        return numpy.zeros((1, 3))
+    frac = numpy.dot(xyz, numpy.linalg.inv(base))
+    spread = frac.max(axis=0) - frac.min(axis=0)
+    # The spacing of the lattice planes is the inverse length of the
+    # reciprocal vectors.
+    h = 1 / numpy.sqrt((numpy.linalg.inv(base)**2).sum(axis=0))
+    nmax = numpy.ceil(rcut / h + spread).astype(int)
+    ranges = [numpy.arange(-m, m + 1) for m in nmax]
+    grid = numpy.array(numpy.meshgrid(*ranges, indexing = "ij"))
+    cells = grid.reshape(3, -1).T
+    return numpy.dot(cells, base)
+
+# End of file
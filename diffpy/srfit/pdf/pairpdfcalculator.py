@@ -0,0 +1,695 @@
+#!/usr/bin/env python
+########################################################################
+#
+# diffpy.srfit      by DANSE Diffraction group
+#                   Simon J. L. Billinge
+#                   (c) 2010 The Trustees of Columbia University
+#                   in the City of New York.  All rights reserved.
+#
+# See AUTHORS.txt for a list of people who contributed.
+# See LICENSE_DANSE.txt for license information.
+#
+########################################################################
+"""Real-space PDF calculator that reuses the pair list of a structure.
+
+The PairPDFCalculator computes the PDF of a diffpy.Structure.Structure as a
+sum of Gaussian peaks over a PairList. It has the configuration interface of
+the SrReal PDF calculators, so that it can be driven by a BasePDFGenerator.
+
+The pair list and the partial PDFs of the element pairs are held by a
+StructurePairs instance. When the Parameters of the structure are watched
+(see StructurePairs.watch), the pair list is only rebuilt after a change of
+the geometry, that is of the lattice or of the atom positions. Changes of the
+ADPs or occupancies only recompute the peak widths and weights. A
+StructurePairs can be shared by several calculators that work on the same
+structure, for example for x-ray and neutron data. The peaks of the element
+pairs are then found once per structure state, and calculators with the same
+grid and peak width terms also share the partial PDFs. Each calculator only
+combines the partials with its own scattering factors.
+
+When single atoms move, as in Monte Carlo searches of disorder models, only
+the pairs of the moved atoms are searched again, and their old and new
+contributions are exchanged in the cached partial PDFs.
+
+For large isolated particles the pairs can be binned by distance and element
+pair into a PairHistogram instead (see PairPDFCalculator.binwidth). The
+evaluation then costs the same for any number of atoms.
+
+"""
+__all__ = ["PairPDFCalculator", "StructurePairs"]
+
+import numpy
+from scipy.special import erf
+from diffpy.srreal.scatteringfactortable import ScatteringFactorTable
+
+from diffpy.srfit.pdf.pairlist import PairList, PairHistogram
+
+# Maximum number of elements of the temporary arrays of the peak summation.
+_chunksize = 2**20
+
+
+class StructurePairs(object):
+    """Cached pair list and partial PDFs of one structure.
+
+    Attributes
+    tracking    --  Flag indicating that changes of the structure are reported
+                    through the watched Parameters (see watch). If this is
+                    False (default), nothing is reused between calculations.
+    pairlist    --  The PairList of the structure, or None.
+    histogram   --  The PairHistogram of the structure, or None.
+    _periodic   --  The periodicity the pair list was built for.
+    _atomindex  --  Dictionary of the atom indices indexed by the id of the
+                    watched position Parameters.
+    _watched    --  List of the watched Parameters. This keeps the ids in
+                    _atomindex and _watchedids valid.
+    _watchedids --  Set of the ids of the watched Parameters.
+    _moved      --  Set of the indices of the atoms that moved since the
+                    last calculation.
+    _nupdates   --  The number of incremental updates of the partial PDFs
+                    since they were calculated in full.
+    _histperiodic   --  The periodicity the histogram was built for.
+    _atoms      --  Cached tuple of the atom arrays of the structure, see
+                    getAtoms, or None.
+    _peaks      --  Dictionary of cached peaks of the partial PDFs indexed by
+                    the periodicity, cutoff and bin width. See _getPeaks.
+    _partials   --  Dictionary of cached partial PDFs indexed by the grid and
+                    peak width configuration.
+
+    """
+
+    # Maximum number of cached partial PDF configurations.
+    maxpartials = 4
+    # Number of incremental updates after which the partial PDFs are
+    # calculated in full, so that rounding errors do not accumulate.
+    maxupdates = 1000
+
+    def __init__(self):
+        """Initialize the attributes."""
+        self.tracking = False
+        self.pairlist = None
+        self.histogram = None
+        self._periodic = None
+        self._histperiodic = None
+        self._atoms = None
+        self._peaks = {}
+        self._partials = {}
+        self._atomindex = {}
+        self._watched = []
+        self._watchedids = set()
+        self._moved = set()
+        self._nupdates = 0
+        return
+
+    def watch(self, parset):
+        """Watch the Parameters of a structure ParameterSet for changes.
+
+        Changes of Parameters for which parset.isGeometric is True invalidate
+        the pair list, except for the position Parameters of the scatterers.
+        These mark their atom as moved, so that the pair list and the partial
+        PDFs are updated for the moved atoms only. Other changes only
+        invalidate the partial PDFs.
+
+        The Parameters of the scatterers are watched once they are created,
+        so this does not create them (see BaseScattererParSet).
+
+        parset  --  The SrRealParSet of the structure.
+
+        """
+
+        def watchScatterer(k, scatterer):
+            self._watchPars(parset, scatterer.iterPars(), k)
+            return
+
+        parset._watchScatterers(watchScatterer)
+        self._watchPars(parset, parset._iterCreatedPars())
+        self.tracking = True
+        self.clear()
+        return
+
+    def _watchPars(self, parset, pars, k = None):
+        """Observe the Parameters that are not watched yet.
+
+        parset  --  The SrRealParSet of the structure.
+        pars    --  Iterable of Parameters of parset.
+        k       --  The index of the scatterer of pars, or None (default).
+                    The geometric Parameters of a scatterer are its position.
+
+        """
+        for par in pars:
+            if id(par) in self._watchedids:
+                continue
+            self._watchedids.add(id(par))
+            self._watched.append(par)
+            if not parset.isGeometric(par):
+                par.addObserver(self._stateChanged)
+            elif k is None:
+                par.addObserver(self._geometryChanged)
+            else:
+                self._atomindex[id(par)] = k
+                par.addObserver(self._positionChanged)
+        return
+
+    def clear(self):
+        """Discard all cached data."""
+        self.pairlist = None
+        self.histogram = None
+        self._atoms = None
+        self._peaks.clear()
+        self._partials.clear()
+        self._moved.clear()
+        return
+
+    def getPartials(self, stru, periodic, nr, dr, rcut, delta1, delta2,
+            qbroad, binwidth = 0):
+        """Get the partial PDFs of the element pairs.
+
+        The partial PDF of the element pair (a, b) is the sum of occ_i * occ_j
+        times the normalized Gaussian peak of each pair of an a and a b atom,
+        over the grid r_k = k * dr. Peaks of (a, b) and (b, a) pairs are
+        summed into the same partial.
+
+        stru    --  The diffpy.Structure.Structure.
+        periodic    --  Flag indicating if the structure is periodic.
+        nr      --  Number of grid points.
+        dr      --  Grid spacing.
+        rcut    --  The maximum pair distance.
+        delta1, delta2, qbroad  --  The peak width terms.
+        binwidth    --  If positive, the pair distances are taken from a
+                    PairHistogram with this bin width, and the ADPs and
+                    occupancies are averaged over the atoms of each element.
+                    Otherwise (default), the pairs are summed exactly.
+
+        Returns a (symbols, typepairs, partials) tuple. symbols is the list of
+        the element symbols, typepairs is an (npartials, 2) array of the
+        symbol indices of the partials and partials has shape (npartials,
+        nr).
+
+        """
+        key = (periodic, nr, dr, rcut, delta1, delta2, qbroad, binwidth)
+        if not self.tracking:
+            self.clear()
+        if self._moved:
+            self._updateMoved(stru)
+        result = self._partials.get(key)
+        if result is not None:
+            return result
+        symbols, typepairs, peaks = self._getPeaks(stru, periodic, rcut,
+                binwidth)
+        partials = numpy.zeros((len(typepairs), nr))
+        for y, (d, msd, weight) in zip(partials, peaks):
+            sel = d <= rcut
+            d, msd, weight = d[sel], msd[sel], weight[sel]
+            sigma2 = msd * _widthCorrection(d, delta1, delta2, qbroad)
+            sigma = numpy.sqrt(numpy.maximum(sigma2, 0) + 1e-12)
+            _addPeaks(y, dr, d, sigma, weight)
+        if len(self._partials) >= self.maxpartials:
+            self._partials.clear()
+        result = (symbols, typepairs, partials)
+        self._partials[key] = result
+        return result
+
+    def _getPeaks(self, stru, periodic, rcut, binwidth):
+        """Get the peaks of the partial PDFs for the structure state.
+
+        The peaks do not depend on the grid or the peak width terms, so they
+        are shared by all calculators of the structure. Peaks computed for a
+        larger cutoff are reused.
+
+        Returns a (symbols, typepairs, peaks) tuple. peaks is a list with a
+        (d, msd, weight) tuple of arrays for each type pair. d are the peak
+        positions, msd the mean-square displacements along the pairs and
+        weight the peak weights. Peaks with the same position and
+        displacement are merged.
+
+        """
+        for key, result in self._peaks.items():
+            if key[0] == periodic and key[2] == binwidth and key[1] >= rcut:
+                return result
+        atoms = self.getAtoms(stru)
+        symbols = atoms[0]
+        iu, ju = numpy.triu_indices(len(symbols))
+        typepairs = numpy.array([iu, ju]).T
+        if binwidth > 0:
+            peaks = self._histogramPeaks(atoms, periodic, rcut, binwidth,
+                    typepairs)
+        else:
+            peaks = self._pairPeaks(atoms, periodic, rcut, typepairs)
+            peaks = [_mergePeaks(*pk) for pk in peaks]
+        result = (symbols, typepairs, peaks)
+        self._peaks[(periodic, rcut, binwidth)] = result
+        return result
+
+    def _pairPeaks(self, atoms, periodic, rcut, typepairs):
+        """Get the peaks of the partial PDFs from the pair list.
+
+        Returns a list with a (d, msd, weight) tuple of arrays for each type
+        pair, see _getPeaks.
+
+        """
+        xyz, base = atoms[4], atoms[5]
+        pairs = self._getPairList(xyz, base if periodic else None, rcut,
+                periodic)
+        sel = pairs.d <= rcut
+        return _splitPairs(atoms, typepairs, pairs.i[sel], pairs.j[sel],
+                pairs.d[sel], pairs.u[sel])
+
+    def _updateMoved(self, stru):
+        """Update the pair list and the partial PDFs for the moved atoms.
+
+        The old contributions of the pairs of the moved atoms are subtracted
+        from the cached partial PDFs and the new ones are added. Everything
+        is recalculated instead if many atoms moved.
+
+        """
+        moved = numpy.array(sorted(self._moved))
+        self._moved.clear()
+        self._atoms = None
+        self._peaks.clear()
+        self.histogram = None
+        pl = self.pairlist
+        if pl is None:
+            self._partials.clear()
+            return
+        atoms = self.getAtoms(stru)
+        xyz = atoms[4]
+        if len(xyz) != pl.natoms or 2 * len(moved) > pl.natoms:
+            self.pairlist = None
+            self._partials.clear()
+            return
+        old = pl.pairsOf(moved)
+        pl.update(moved, xyz)
+        new = pl.pairsOf(moved)
+        self._nupdates += 1
+        if self._nupdates > self.maxupdates:
+            self._nupdates = 0
+            self._partials.clear()
+        for key, result in self._partials.items():
+            periodic, nr, dr, rcut, delta1, delta2, qbroad, binwidth = key
+            if binwidth > 0 or periodic != self._periodic:
+                del self._partials[key]
+                continue
+            symbols, typepairs, partials = result
+            for sign, (i, j, d, u) in [(-1, old), (1, new)]:
+                sel = d <= rcut
+                peaks = _splitPairs(atoms, typepairs, i[sel], j[sel], d[sel],
+                        u[sel])
+                for y, (dp, msd, weight) in zip(partials, peaks):
+                    sigma2 = msd * _widthCorrection(dp, delta1, delta2,
+                            qbroad)
+                    sigma = numpy.sqrt(numpy.maximum(sigma2, 0) + 1e-12)
+                    _addPeaks(y, dr, dp, sigma, sign * weight)
+        return
+
+    def _histogramPeaks(self, atoms, periodic, rcut, binwidth, typepairs):
+        """Get the peaks of the partial PDFs from the pair histogram.
+
+        The peaks are at the mean distances of the occupied bins. Each
+        element gets the mean occupancy and the mean isotropic ADP of its
+        atoms.
+
+        Returns a list like _pairPeaks.
+
+        """
+        symbols, types, occ, ucart, xyz, base, volume = atoms
+        hist = self._getHistogram(xyz, types, base if periodic else None,
+                rcut, binwidth, periodic)
+        ntypes = len(symbols)
+        ntype = numpy.bincount(types, minlength = ntypes)
+        meanocc = numpy.bincount(types, occ, ntypes) / ntype
+        uiso = numpy.trace(ucart, axis1 = 1, axis2 = 2) / 3
+        meanuiso = numpy.bincount(types, uiso, ntypes) / ntype
+        peaks = []
+        for a, b in typepairs:
+            counts = hist.counts[a, b]
+            if a != b:
+                counts = 2 * counts
+            nz = numpy.nonzero(counts)[0]
+            d = hist.distances[a, b, nz]
+            msd = numpy.repeat(meanuiso[a] + meanuiso[b], len(nz))
+            weight = counts[nz] * meanocc[a] * meanocc[b]
+            peaks.append((d, msd, weight))
+        return peaks
+
+    def getAtoms(self, stru):
+        """Get the atom arrays of a structure.
+
+        Returns a (symbols, types, occ, ucart, xyz, base, volume) tuple.
+        symbols is the list of the element symbols, types the array of the
+        symbol indices of the atoms, occ the occupancies, ucart the Cartesian
+        ADP tensors, xyz the Cartesian positions, base the Cartesian lattice
+        vectors and volume the unit cell volume.
+
+        """
+        if self._atoms is None:
+            self._atoms = _atomArrays(stru)
+        return self._atoms
+
+    def _getHistogram(self, xyz, types, base, rcut, binwidth, periodic):
+        """Get the pair histogram, rebuilding it if needed."""
+        hist = self.histogram
+        if (hist is None or hist.rcut < rcut or hist.binwidth != binwidth
+                or self._histperiodic != periodic):
+            self.histogram = PairHistogram(xyz, types, base, rcut, binwidth)
+            self._histperiodic = periodic
+        return self.histogram
+
+    def _getPairList(self, xyz, base, rcut, periodic):
+        """Get the pair list, rebuilding it if needed."""
+        pl = self.pairlist
+        if pl is None or pl.rcut < rcut or self._periodic != periodic:
+            self.pairlist = PairList(xyz, base, rcut)
+            self._periodic = periodic
+        return self.pairlist
+
+    def _geometryChanged(self, other):
+        """Handle a change of the geometry of the structure."""
+        self.pairlist = None
+        self.histogram = None
+        self._moved.clear()
+        self._stateChanged(other)
+        return
+
+    def _positionChanged(self, other):
+        """Handle the move of an atom."""
+        self._moved.add(self._atomindex[id(other)])
+        self._atoms = None
+        return
+
+    def _stateChanged(self, other):
+        """Handle a change of the ADPs or occupancies of the structure."""
+        self._atoms = None
+        self._peaks.clear()
+        self._partials.clear()
+        return
+
+# End class StructurePairs
+
+
+class PairPDFCalculator(object):
+    """Real-space PDF calculator over a PairList.
+
+    The PDF is
+    G(r) = 1 / (N <f>**2) sum_ij f_i f_j occ_i occ_j T_ij(r) / r - 4 pi rho0 r
+    where T_ij is a normalized Gaussian at the distance of the pair, N is the
+    total occupancy of the structure, <f> is the occupancy-averaged
+    scattering factor and rho0 the number density. The baseline is only
+    applied to periodic structures. The peak width of a pair is
+    sigma_ij = sqrt(msd_ij * (1 - delta1/r_ij - delta2/r_ij**2 +
+    (qbroad * r_ij)**2)), where msd_ij is the mean-square displacement along
+    the pair from the anisotropic ADPs. The PDF is limited to the [qmin,
+    qmax] range of the scattering vector by Fourier filtering.
+
+    Attributes
+    rmin, rmax, rstep   --  The r-grid of the PDF. The grid points are
+                    rmin + k * rstep below rmax.
+    qmin, qmax  --  The range of the scattering vector (default 0, 100).
+    delta1, delta2, qbroad  --  Peak width terms (default 0).
+    scale       --  Scale factor (default 1).
+    qdamp       --  Gaussian dampening of the PDF (default 0).
+    rpad        --  Pairs are tabulated up to rmax + rpad, so that the tails
+                    of the peaks beyond rmax and the termination ripples are
+                    included (default 5).
+    periodic    --  Flag indicating if the structure is periodic (default
+                    True).
+    binwidth    --  If positive, the pair distances are binned into a
+                    PairHistogram with this bin width and the ADPs and
+                    occupancies are averaged per element. The histogram is
+                    only rebuilt when the geometry changes, and the cost of
+                    an evaluation does not depend on the number of atoms.
+                    Smaller bins are more accurate. If this is 0 (default),
+                    every pair is summed exactly.
+    pairs       --  The StructurePairs with the cached data. This can be
+                    shared with other PairPDFCalculators that work on the
+                    same structure.
+    _stype      --  The scattering type.
+    _lookup     --  Function that returns the scattering factor of an
+                    element symbol.
+
+    """
+
+    _doubleattrs = ["rmin", "rmax", "rstep", "qmin", "qmax", "delta1",
+            "delta2", "qbroad", "scale", "qdamp", "rpad", "binwidth"]
+
+    def __init__(self):
+        """Initialize the attributes."""
+        self.rmin = 0.0
+        self.rmax = 10.0
+        self.rstep = 0.01
+        self.qmin = 0.0
+        self.qmax = 100.0
+        self.delta1 = 0.0
+        self.delta2 = 0.0
+        self.qbroad = 0.0
+        self.scale = 1.0
+        self.qdamp = 0.0
+        self.rpad = 5.0
+        self.periodic = True
+        self.binwidth = 0.0
+        self.pairs = StructurePairs()
+        self._stype = None
+        self._lookup = None
+        self.setScatteringFactorTableByType("X")
+        return
+
+    def __call__(self, stru):
+        """Calculate the PDF of a structure.
+
+        stru    --  A diffpy.Structure.Structure instance.
+
+        Returns the r-grid and the PDF.
+
+        """
+        rcalc = self.getRgrid()
+        dr = float(self.rstep)
+        rext = float(self.rmax) + float(self.rpad)
+        nr = int(numpy.ceil(rext / dr)) + 1
+        symbols, typepairs, partials = self.pairs.getPartials(stru,
+                bool(self.periodic), nr, dr, rext, self.delta1, self.delta2,
+                self.qbroad, self.binwidth)
+        symbols, types, occ, ucart, xyz, base, volume = \
+                self.pairs.getAtoms(stru)
+
+        f = numpy.array([self._lookup(s) for s in symbols])
+        ntot = occ.sum()
+        if ntot == 0:
+            return rcalc, numpy.zeros_like(rcalc)
+        favg = numpy.dot(occ, f[types]) / ntot
+        coef = f[typepairs[:, 0]] * f[typepairs[:, 1]]
+        y = numpy.dot(coef, partials) / (ntot * favg**2)
+
+        r = dr * numpy.arange(nr)
+        y[1:] /= r[1:]
+        y[0] = 0
+        y = _terminate(y, dr, self.qmin, self.qmax)
+        if self.periodic:
+            y -= 4 * numpy.pi * ntot / volume * r
+        y = numpy.interp(rcalc, r, y)
+        y *= self.scale
+        if self.qdamp:
+            y *= numpy.exp(-0.5 * (self.qdamp * rcalc)**2)
+        return rcalc, y
+
+    def __getstate__(self):
+        """Get the state for pickling.
+
+        The cached pair data and the scattering factor lookup are not
+        pickled. They are recreated from the scattering type.
+
+        """
+        state = self.__dict__.copy()
+        del state["pairs"], state["_lookup"]
+        return state
+
+    def __setstate__(self, state):
+        """Restore the state from pickling."""
+        self.__dict__.update(state)
+        self.pairs = StructurePairs()
+        self.setScatteringFactorTableByType(self._stype)
+        return
+
+    def getRgrid(self):
+        """Get the r-grid of the PDF."""
+        n = int(numpy.ceil((self.rmax - self.rmin) / self.rstep - 1e-8))
+        return self.rmin + self.rstep * numpy.arange(max(n, 0))
+
+    def setScatteringFactorTableByType(self, stype):
+        """Set the scattering type.
+
+        stype   --  "X" for x-ray, "N" for neutron, or any type known to
+                    diffpy.srreal.
+
+        Raises ValueError for unknown scattering type.
+
+        """
+        self._lookup = _scatteringFactorLookup(stype)
+        self._stype = stype
+        return
+
+    def getRadiationType(self):
+        """Get the scattering type. See setScatteringFactorTableByType."""
+        return self._stype
+
+    def _namesOfDoubleAttributes(self):
+        """Get the names of the floating point configuration attributes."""
+        return set(self._doubleattrs)
+
+    def _getDoubleAttr(self, name):
+        """Get a floating point configuration attribute."""
+        return float(getattr(self, name))
+
+# End class PairPDFCalculator
+
+def _scatteringFactorLookup(stype):
+    """Get a function that returns the scattering factor of an element.
+
+    Raises ValueError for unknown scattering type.
+
+    """
+    sftable = ScatteringFactorTable.createByType(stype)
+    return lambda symbol: sftable.lookup(symbol, 0)
+
+def _atomArrays(stru):
+    """Get the atom arrays of a diffpy.Structure.Structure.
+
+    See StructurePairs.getAtoms.
+
+    """
+    symbols = []
+    types = []
+    index = {}
+    for a in stru:
+        t = index.get(a.element)
+        if t is None:
+            t = index[a.element] = len(symbols)
+            symbols.append(a.element)
+        types.append(t)
+    types = numpy.array(types, dtype=int)
+    occ = numpy.array([a.occupancy for a in stru], dtype=float)
+    lat = stru.lattice
+    base = numpy.array(lat.base, dtype=float)
+    xyz = numpy.dot(numpy.array([a.xyz for a in stru], dtype=float), base)
+    # Convert the ADPs from the crystal to the Cartesian system.
+    an = numpy.dot(base.T, numpy.diag([lat.ar, lat.br, lat.cr]))
+    uc = numpy.array([a.U for a in stru], dtype=float).reshape(-1, 3, 3)
+    ucart = numpy.einsum("ab,nbc,dc->nad", an, uc, an)
+    return symbols, types, occ, ucart, xyz, base, lat.volume
+
+def _splitPairs(atoms, typepairs, i, j, d, u):
+    """Get the peaks of pairs, split by type pair.
+
+    atoms   --  The atom arrays, see StructurePairs.getAtoms.
+    typepairs   --  Array of the type pairs of the partial PDFs.
+    i, j, d, u  --  The arrays of the pairs, see PairList.
+
+    Returns a list with a (d, msd, weight) tuple of arrays for each type
+    pair, see StructurePairs._getPeaks.
+
+    """
+    symbols, types, occ, ucart, xyz, base, volume = atoms
+    ntypes = len(symbols)
+    pidx = numpy.zeros((ntypes, ntypes), dtype=int)
+    pidx[typepairs[:, 0], typepairs[:, 1]] = numpy.arange(len(typepairs))
+    pidx[typepairs[:, 1], typepairs[:, 0]] = numpy.arange(len(typepairs))
+    msd = _pairMSD(i, j, u, ucart)
+    weight = occ[i] * occ[j]
+    p = pidx[types[i], types[j]]
+    peaks = []
+    for k in range(len(typepairs)):
+        psel = p == k
+        peaks.append((d[psel], msd[psel], weight[psel]))
+    return peaks
+
+def _pairMSD(i, j, u, ucart):
+    """Get the mean-square displacements of the pairs along their direction.
+    """
+    msd = numpy.empty(len(u))
+    bs = max(1, _chunksize // 9)
+    for lo in range(0, len(u), bs):
+        s = slice(lo, lo + bs)
+        usum = ucart[i[s]] + ucart[j[s]]
+        msd[s] = numpy.einsum("pa,pab,pb->p", u[s], usum, u[s])
+    return msd
+
+def _mergePeaks(d, msd, weight):
+    """Merge the peaks with the same position and displacement.
+
+    These are frequent in crystals. Returns the d, msd, weight arrays of the
+    merged peaks.
+
+    """
+    key = numpy.column_stack([numpy.round(d * 1e6), numpy.round(msd * 1e10)])
+    if not len(key):
+        return d, msd, weight
+    key, inv = numpy.unique(key, axis = 0, return_inverse = True)
+    if len(key) == len(d):
+        return d, msd, weight
+    cnt = numpy.bincount(inv)
+    d = numpy.bincount(inv, d) / cnt
+    msd = numpy.bincount(inv, msd) / cnt
+    weight = numpy.bincount(inv, weight)
+    return d, msd, weight
+
+def _widthCorrection(d, delta1, delta2, qbroad):
+    """Get the factor of the peak variances from the peak width terms."""
+    return 1 - delta1 / d - delta2 / d**2 + (qbroad * d)**2
+
+def _addPeaks(y, dr, d, sigma, weight):
+    """Add normalized Gaussian peaks to y over the grid r_k = k * dr.
+
+    Only the points within 5 sigma of the peak centers are summed. Peaks
+    narrower than the grid step are averaged over the grid cells, so that
+    their area is kept.
+
+    """
+    if not len(d):
+        return
+    nr = len(y)
+    order = numpy.argsort(sigma)
+    d, sigma, weight = d[order], sigma[order], weight[order]
+    nnarrow = sigma.searchsorted(dr)
+    lo = 0
+    while lo < len(d):
+        # Size the window for the widest peak of the block.
+        nw = int(numpy.ceil(10 * sigma[min(lo + 1023, len(d) - 1)] / dr)) + 2
+        hi = min(len(d), lo + max(1, _chunksize // nw))
+        if lo < nnarrow:
+            hi = min(hi, nnarrow)
+        nw = int(numpy.ceil(10 * sigma[hi - 1] / dr)) + 2
+        db = d[lo:hi, None]
+        sb = sigma[lo:hi, None]
+        k = numpy.rint((db - 5 * sb) / dr).astype(int) + numpy.arange(nw)
+        if lo < nnarrow:
+            edges = (numpy.hstack([k, k[:, -1:] + 1]) - 0.5) * dr
+            cdf = erf((edges - db) / (numpy.sqrt(2) * sb))
+            g = 0.5 * numpy.diff(cdf, axis=1) / dr
+        else:
+            g = numpy.exp(-0.5 * ((k * dr - db) / sb)**2)
+            g /= numpy.sqrt(2 * numpy.pi) * sb
+        g *= weight[lo:hi, None]
+        valid = (k >= 0) & (k < nr)
+        y += numpy.bincount(k[valid], g[valid], minlength = nr)[:nr]
+        lo = hi
+    return
+
+def _terminate(y, dr, qmin, qmax):
+    """Limit a function over r_k = k * dr to the Q-range [qmin, qmax].
+
+    The function is extended to an odd function and low-pass filtered with a
+    fast Fourier transform. Nothing is done if the Q-range covers all
+    frequencies of the grid.
+
+    """
+    n = len(y)
+    if (qmax >= numpy.pi / dr and qmin <= 0) or n < 2:
+        return y
+    m = 2**int(numpy.ceil(numpy.log2(2 * n)))
+    b = numpy.zeros(2 * m)
+    b[:n] = y
+    b[2 * m - n + 1:] = -y[:0:-1]
+    a = numpy.fft.fft(b)
+    k = numpy.arange(2 * m)
+    q = numpy.pi / (m * dr) * numpy.minimum(k, 2 * m - k)
+    a[(q > qmax) | (q < qmin)] = 0
+    return numpy.fft.ifft(a).real[:n]
+
+# End of file
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+########################################################################
+#
+# diffpy.srfit      by DANSE Diffraction group
+#                   Simon J. L. Billinge
+#                   (c) 2010 The Trustees of Columbia University
+#                   in the City of New York.  All rights reserved.
+#
+# See AUTHORS.txt for a list of people who contributed.
+# See LICENSE_DANSE.txt for license information.
+#
+########################################################################
+"""PDF profile generator that reuses interatomic distances.
+
+The PairPDFGenerator class calculates the PDF of a diffpy.Structure.Structure
+with a PairPDFCalculator. The pair list of the structure is kept as long as
+the lattice and the atom positions do not change, so that refinements of
+displacement parameters and occupancies do not repeat the search for the
+atom pairs.
+
+With periodic = False and a positive bin width (see setBinWidth), the
+PairPDFGenerator is an approximate replacement of the DebyePDFGenerator for
+large nanoparticles. The pair distances are then binned once per geometry
+change and the cost of the PDF does not grow with the number of atoms.
+
+"""
+__all__ = ["PairPDFGenerator"]
+
+from weakref import WeakKeyDictionary
+
+from diffpy.srfit.pdf.basepdfgenerator import BasePDFGenerator
+from diffpy.srfit.pdf.pairpdfcalculator import PairPDFCalculator
+from diffpy.srfit.pdf.pairpdfcalculator import StructurePairs
+from diffpy.srfit.structure.diffpyparset import DiffpyStructureParSet
+
+# The StructurePairs of the phases, shared by all generators of a phase.
+_phasepairs = WeakKeyDictionary()
+
+class PairPDFGenerator(BasePDFGenerator):
+    """A class for calculating the PDF from a pair list.
+
+    This works with diffpy.Structure.Structure instances. The managed
+    Parameters are not created until the structure is added. Generators that
+    share a phase through setPhase also share its pair list.
+
+    Attributes:
+    _calc   --  PairPDFCalculator instance for calculating the PDF
+    _phase  --  The structure ParameterSets used to calculate the profile.
+    stru    --  The structure objected adapted by _phase.
+    _lastr  --  The last value of r over which the PDF was calculated. This is
+                used to configure the calculator when r changes.
+
+    Managed Parameters:
+    scale   --  Scale factor
+    delta1  --  Linear peak broadening term
+    delta2  --  Quadratic peak broadening term
+    qbroad  --  Resolution peak broadening term
+    qdamp   --  Resolution peak dampening term
+
+    Managed ParameterSets:
+    The structure ParameterSet (DiffpyStructureParSet instance) used to
+    calculate the profile is named by the user.
+
+    Usable Metadata:
+    binwidth    --  The bin width of the pair distances (see setBinWidth).
+    stype   --  The scattering type "X" for x-ray, "N" for neutron (see
+                'setScatteringType').
+    qmax    --  The maximum scattering vector used to generate the PDF (see
+                setQmax).
+    qmin    --  The minimum scattering vector used to generate the PDF (see
+                setQmin).
+    scale   --  See Managed Parameters.
+    delta1  --  See Managed Parameters.
+    delta2  --  See Managed Parameters.
+    qbroad  --  See Managed Parameters.
+    qdamp   --  See Managed Parameters.
+
+    """
+
+    def __init__(self, name = "pdf"):
+        """Initialize the generator.
+
+        """
+        BasePDFGenerator.__init__(self, name)
+        self._setCalculator(PairPDFCalculator())
+        return
+
+    def setPhase(self, parset, periodic = True):
+        """Set the phase that will be used to calculate the PDF.
+
+        Set the phase directly with a DiffpyStructureParSet. The passed
+        ParameterSet will be managed by this generator.
+
+        parset  --  A DiffpyStructureParSet that holds the structural
+                    information. This can be used to share the phase between
+                    multiple BasePDFGenerators, and have the changes in one
+                    reflect in another.
+        periodic -- The structure should be treated as periodic (default
+                    True).
+
+        Raises TypeError if parset is not a DiffpyStructureParSet.
+
+        """
+        if not isinstance(parset, DiffpyStructureParSet):
+            raise TypeError("PairPDFGenerator requires a DiffpyStructureParSet")
+        BasePDFGenerator.setPhase(self, parset, periodic)
+        pairs = _phasepairs.get(parset)
+        if pairs is None:
+            pairs = _phasepairs[parset] = StructurePairs()
+            pairs.watch(parset)
+        self._calc.pairs = pairs
+        self._flush(self)
+        return
+
+    def processMetaData(self):
+        """Process the metadata once it gets set."""
+        BasePDFGenerator.processMetaData(self)
+        binwidth = self.meta.get("binwidth")
+        if binwidth is not None:
+            self.setBinWidth(binwidth)
+        return
+
+    def setBinWidth(self, binwidth):
+        """Set the bin width of the pair distances.
+
+        binwidth    --  If positive, the pair distances are binned by element
+                        pair with this bin width, which sets the accuracy of
+                        the peak positions. The ADPs and occupancies are
+                        averaged over the atoms of each element. If this is 0,
+                        every pair is summed exactly.
+
+        """
+        self._calc.binwidth = max(0.0, float(binwidth))
+        self.meta["binwidth"] = self.getBinWidth()
+        self._flush(self)
+        return
+
+    def getBinWidth(self):
+        """Get the bin width of the pair distances."""
+        return self._calc.binwidth
+
+    def _evalCalculator(self):
+        """Run the calculator on the phase.
+
+        Returns the r-grid and the PDF of the calculator.
+
+        """
+        self._calc.periodic = self._phase.usingSymmetry()
+        return self._calc(self._phase.stru)
+
+# End class PairPDFGenerator
+
+# End of file
@@ -19,6 +19,8 @@ This is a custom FitContribution that simplifies the creation of PDF fits.
 """
 __all__ = ["PDFContribution"]
 
+from numpy import asarray
+
 from diffpy.srfit.fitbase import FitContribution
 from diffpy.srfit.fitbase import Profile
 
@@ -53,6 +55,10 @@ class PDFContribution(FitContribution):
     _xname          --  Name of the x-variable
     _yname          --  Name of the y-variable
     _dyname         --  Name of the dy-variable
+    _threadpool     --  ThreadPool for the concurrent evaluation of the
+                        phases, or None. See parallelPhases.
+    _workers        --  The WorkerPool that runs the SrReal calculators of
+                        the phases, or None. See parallelPhases.
 
     Managed Parameters:
     scale   --  Scale factor
@@ -69,6 +75,8 @@ class PDFContribution(FitContribution):
         """
         FitContribution.__init__(self, name)
         self._meta = {}
+        self._threadpool = None
+        self._workers = None
         # Add the profile
         profile = Profile()
         self.setProfile(profile, xname = "r")
@@ -240,12 +248,85 @@ class PDFContribution(FitContribution):
         # Update with our metadata
         gen.meta.update(self._meta)
         gen.processMetaData()
+        gen._evalpool = self._workers
 
         # Constrain the shared parameters
         self.constrain(gen.qdamp, self.qdamp)
         self.constrain(gen.qbroad, self.qbroad)
         return
 
+    # Evaluation methods
+
+    def parallelPhases(self, ncpu, processes = True):
+        """Evaluate the phases concurrently.
+
+        The generators of the phases that need a new PDF are evaluated in
+        separate threads before the equation sums them.
+
+        ncpu    --  Number of phases evaluated at the same time. Revert to
+                    serial evaluation when 1.
+        processes   --  If True (default), the SrReal calculators run in the
+                    worker processes of the process-wide WorkerPool (see
+                    diffpy.srfit.util.workerpool), since they do not release
+                    the GIL. This requires that the structure and the
+                    calculator can be pickled. Both are pickled and sent to
+                    a worker on every evaluation, which pays off only if the
+                    PDF takes much longer to calculate than to transfer.
+                    Generators that do not use SrReal, such as the
+                    PairPDFGenerator, always run in the threads. If False,
+                    the threads run the calculators themselves, which only
+                    helps calculators that release the GIL.
+
+        """
+        from diffpy.srfit.util.workerpool import getWorkerPool
+        if self._threadpool is not None:
+            self._threadpool.close()
+            self._threadpool = None
+        self._workers = None
+        if ncpu > 1:
+            from multiprocessing.pool import ThreadPool
+            self._threadpool = ThreadPool(ncpu)
+            if processes:
+                self._workers = getWorkerPool(ncpu)
+        for gen in self._generators.values():
+            gen._evalpool = self._workers
+        return
+
+    def residual(self):
+        """Calculate the residual for this fitcontribution.
+
+        See FitContribution.residual. The phases are evaluated concurrently
+        if requested with parallelPhases.
+
+        """
+        self._evaluatePhases()
+        return FitContribution.residual(self)
+
+    def evaluate(self):
+        """Evaluate the contribution equation."""
+        self._evaluatePhases()
+        return FitContribution.evaluate(self)
+
+    def _evaluatePhases(self):
+        """Evaluate the generators that need a new PDF concurrently.
+
+        The threads only calculate the PDFs. The generators are given their
+        values here, like ProfileGenerator.operation does, so that the
+        equation does not evaluate them again.
+
+        """
+        if self._threadpool is None:
+            return
+        gens = [gen for gen in self._generators.values()
+                if gen._value is None]
+        if len(gens) < 2:
+            return
+        values = self._threadpool.map(_calculate, gens)
+        for gen, y in zip(gens, values):
+            gen.profile.ycalc = asarray(y)
+            gen._value = y
+        return
+
     # Calculation setup methods
 
     def _getMetaValue(self, kwd):
@@ -302,4 +383,10 @@ class PDFContribution(FitContribution):
         """Get the qmin value."""
         return self._getMetaValue("qmin")
 
+# End class PDFContribution
+
+def _calculate(gen):
+    """Calculate the profile of a generator without storing it."""
+    return gen(gen.profile.x)
+
 # End of file
@@ -18,12 +18,13 @@
 
 """
 
-__all__ = ["SASGenerator", "SASParser", "SASProfile", "PrCalculator",
-"CFCalculator"]
+__all__ = ["SASGenerator", "SASParser", "SASProfile", "SASResolution",
+"PrCalculator", "CFCalculator"]
 
 from sasgenerator import SASGenerator
 from sasparser import SASParser
 from sasprofile import SASProfile
+from sasresolution import SASResolution
 from prcalculator import PrCalculator, CFCalculator
 
 # End of file
@@ -19,6 +19,9 @@ Calculator. This is not wrapped as a ProfileGenerator because it will be used
 to share information between SAS I(Q) to PDF G(r), but it does not use the same
 profile as the PDF, which is where the calculator will be applied.
 
+The sans.pr package is imported when the first PrCalculator is created, so
+that importing this module is cheap.
+
 """
 
 __all__ = ["PrCalculator", "CFCalculator"]
@@ -27,8 +30,6 @@ import numpy
 
 from diffpy.srfit.fitbase import Calculator
 
-from sans.pr.invertor import Invertor
-
 class PrCalculator(Calculator):
     """A class for calculating P(r) from data.
 
@@ -45,6 +46,13 @@ class PrCalculator(Calculator):
                     but can be configured by the user after initialization.
                     Note that the 'x', 'y' and 'err' attributes get overwritten
                     every time the invertor is used.
+    _inputs     --  The (q, iq, diq, d_max) of the last inversion, or None.
+    _coeffs     --  The P(r) coefficients of the last inversion, or None.
+                    These are reused while the inputs do not change, and
+                    start the next inversion otherwise.
+    _basis      --  A (key, matrix) pair of the P(r) basis functions on the
+                    last r-grid, or None. key identifies the grid and the
+                    matrix has shape (len(r), len(_coeffs)).
 
     Managed Parameters:
     scale       --  The scale factor (default 1).
@@ -62,12 +70,16 @@ class PrCalculator(Calculator):
         """
         Calculator.__init__(self, name)
 
+        Invertor = _import_sans_Invertor()
         self._invertor = Invertor()
 
         self._newParameter("scale", 1)
         self._newParameter("q", None)
         self._newParameter("iq", None)
         self._newParameter("diq", None)
+        self._inputs = None
+        self._coeffs = None
+        self._basis = None
         return
 
     def __call__(self, r):
@@ -77,18 +89,62 @@ class PrCalculator(Calculator):
         diq = self.diq.value
         if diq is None:
             diq = numpy.ones_like(q)
-        self._invertor.d_max = max(r) + 5.0
+        d_max = max(r) + 5.0
+        c = self._invert(q, iq, diq, d_max)
+        pr = numpy.dot(self._getBasis(r, d_max, len(c)), c)
+        return self.scale.value * pr
+
+    def _invert(self, q, iq, diq, d_max):
+        """Get the P(r) coefficients for the signal.
+
+        The inversion is skipped if the signal and d_max did not change since
+        the last call. Otherwise the least-squares fit of invert_optimize is
+        started from the last coefficients.
+
+        Returns the array of coefficients.
+
+        """
+        inputs = (q, iq, diq, d_max)
+        if self._inputs is not None and all(numpy.array_equal(a, b)
+                for a, b in zip(inputs, self._inputs)):
+            return self._coeffs
+        inv = self._invertor
+        inv.d_max = d_max
         # Assume profile doesn't include 0. It's up to the user to make this
         # happen.
-        self._invertor.x = q
-        self._invertor.y = iq
-        self._invertor.err = diq
-        c, c_cov = self._invertor.invert_optimize()
-        l = lambda x: self._invertor.pr(c, x)
-        pr = map(l, r)
-
-        pr = numpy.array(pr)
-        return self.scale.value * pr
+        inv.x = q
+        inv.y = iq
+        inv.err = diq
+        c0 = self._coeffs
+        if c0 is None:
+            c, c_cov = inv.invert_optimize()
+        else:
+            from scipy import optimize
+            if inv.is_valid() <= 0:
+                msg = "Invertor: invalid data; incompatible data lengths."
+                raise RuntimeError(msg)
+            c = optimize.leastsq(inv.residuals, c0)[0]
+        self._inputs = tuple(numpy.array(a, copy = True) for a in inputs)
+        self._coeffs = c
+        return c
+
+    def _getBasis(self, r, d_max, nfunc):
+        """Get the matrix of the P(r) basis functions on r.
+
+        Column k of the matrix is the P(r) of the unit coefficients of
+        function k, as calculated by the invertor. The matrix is kept as long
+        as r, d_max and the number of functions do not change.
+
+        """
+        r = numpy.asarray(r, dtype = float)
+        key = (r.tostring(), d_max, nfunc)
+        if self._basis is None or self._basis[0] != key:
+            inv = self._invertor
+            inv.d_max = d_max
+            unit = numpy.identity(nfunc)
+            basis = numpy.array([[inv.pr(u, x) for u in unit] for x in r])
+            self._basis = (key, basis.reshape(len(r), nfunc))
+        return self._basis[1]
 
 # End class PrCalculator
 
@@ -124,3 +180,17 @@ class CFCalculator(PrCalculator):
         return fr
 
 # End class CFCalculator
+
+# Local Helpers --------------------------------------------------------------
+
+def _import_sans_Invertor():
+    """Return the Invertor class from the sans.pr package.
+
+    The import is deferred until it is needed, since sans.pr loads a large
+    part of the sans packages.
+    """
+    global _the_Invertor
+    if _the_Invertor is None:
+        from sans.pr.invertor import Invertor as _the_Invertor
+    return _the_Invertor
+_the_Invertor = None
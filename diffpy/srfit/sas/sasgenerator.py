@@ -21,14 +21,31 @@ ProfileGenerator.
 
 __all__ = ["SASGenerator"]
 
+from itertools import count
+
+import numpy
+
 from diffpy.srfit.fitbase import ProfileGenerator
 from diffpy.srfit.sas.sasparameter import SASParameter
+from diffpy.srfit.util.resultcache import ResultCache
+
+# Tokens that identify generators in the keys of a shared cache.
+_newtoken = count().next
+
+# The parameters that enter I(Q) linearly, with their neutral values.
+_linearpars = {"scale" : 1.0, "background" : 0.0}
 
 class SASGenerator(ProfileGenerator):
     """A class for calculating I(Q) from a scattering type.
 
     Attributes:
     _model      --  BaseModel object this adapts.
+    _linear     --  Names of the model parameters that enter I(Q) linearly,
+                    as scale * I0(Q) + background.
+    _cache      --  A ResultCache for I0(Q), or None. See setCache.
+    _token      --  Number that identifies the generator in the cache keys.
+    _resolution --  A SASResolution that smears I(Q), or None. See
+                    setResolution.
 
     Managed Parameters:
     These depend on the parameters of the BaseModel object held by _model. They
@@ -62,10 +79,104 @@ class SASGenerator(ProfileGenerator):
             par = SASParameter(name, model, parname)
             self.addParameter(par)
 
+        self._linear = [n for n in _linearpars if n in model.params]
+        self._cache = ResultCache()
+        self._token = _newtoken()
+        self._resolution = None
+        return
+
+    def setResolution(self, resolution):
+        """Set the instrumental resolution.
+
+        The model is then evaluated on the oversampled Q-grid of the
+        resolution and smeared onto the requested Q-points. The resolution of
+        the data in a SASProfile is available from its getResolution method.
+
+        resolution  --  A SASResolution instance, or None to turn off the
+                        smearing.
+
+        """
+        self._resolution = resolution
+        return
+
+    def getResolution(self):
+        """Get the instrumental resolution. See 'setResolution'."""
+        return self._resolution
+
+    def setCache(self, cache):
+        """Set a cache for the intensity of the model.
+
+        The cache holds the intensity I0(Q) without the scale and background,
+        so that changes of these only rescale and shift it. I0(Q) is found by
+        the values of the other model parameters and of the dispersion
+        settings of the model. Other changes of the model, such as a new
+        dispersion object, are not detected and require clearing the cache.
+        Generators can share a cache to bound the memory use of all of them.
+        A new SASGenerator has its own cache.
+
+        cache   --  A diffpy.srfit.util.resultcache.ResultCache instance, or
+                    None to turn off caching.
+
+        """
+        self._cache = cache
         return
 
+    def getCache(self):
+        """Get the cache of the intensity. See 'setCache'."""
+        return self._cache
+
+    def getCacheStats(self):
+        """Get the statistics of the cache, see ResultCache.getStats.
+
+        Returns None if there is no cache.
+
+        """
+        if self._cache is None:
+            return None
+        return self._cache.getStats()
+
     def __call__(self, q):
         """Calculate I(Q) for the BaseModel."""
-        return self._model.evalDistribution(q)
+        res = self._resolution
+        qeval = q
+        if res is not None:
+            qeval, smearing = res.getGrid(q)
+        if self._cache is None:
+            iq = self._model.evalDistribution(qeval)
+            if res is not None:
+                # The rows of the smearing sum to one, so the background is
+                # not changed.
+                iq = smearing.dot(iq)
+            return iq
+        qeval = numpy.asarray(qeval)
+        lin = dict(_linearpars)
+        for n in self._linear:
+            lin[n] = self._model.getParam(n)
+        iq = self._getIntensity(qeval)
+        if res is not None:
+            iq = smearing.dot(iq)
+        return lin["scale"] * iq + lin["background"]
+
+    def _getIntensity(self, q):
+        """Get I0(Q), the intensity with unit scale and no background."""
+        model = self._model
+        pars = sorted((n, model.getParam(n)) for n in model.params
+                if n not in self._linear)
+        disp = sorted((n, tuple(sorted(d.items())))
+                for n, d in model.dispersion.items())
+        key = (self._token, str(q.dtype), q.tostring(), tuple(pars),
+                tuple(disp))
+        iq = self._cache.get(key)
+        if iq is None:
+            values = [model.getParam(n) for n in self._linear]
+            for n in self._linear:
+                model.setParam(n, _linearpars[n])
+            try:
+                iq = numpy.asarray(model.evalDistribution(q), dtype = float)
+            finally:
+                for n, v in zip(self._linear, values):
+                    model.setParam(n, v)
+            self._cache.put(key, iq)
+        return iq
 
 # End class SASGenerator
@@ -18,9 +18,11 @@
 
 __all__ = ["SASProfile"]
 
+import numpy
 from numpy import ones_like
 
 from diffpy.srfit.fitbase.profile import Profile
+from diffpy.srfit.sas.sasresolution import SASResolution
 
 class SASProfile(Profile):
     """Observed and calculated profile container for SAS data.
@@ -96,3 +98,44 @@ class SASProfile(Profile):
         self._datainfo.y = self._yobs
         self._datainfo.dy = self._dyobs
         return
+
+    def getResolution(self):
+        """Get the instrumental resolution of the data.
+
+        The Gaussian resolution is taken from the dx attribute of the
+        DataInfo object and the slit length from its dxl attribute.
+
+        Returns a SASResolution instance for use with
+        SASGenerator.setResolution, or None if the data has no resolution.
+        The resolution applies to any calculation points within the range
+        of the observed data.
+
+        """
+        dq = _resolutionArray(getattr(self._datainfo, "dx", None),
+                self._xobs)
+        slitlength = _resolutionArray(getattr(self._datainfo, "dxl", None),
+                self._xobs)
+        if dq is None and slitlength is None:
+            return None
+        return SASResolution(dq, slitlength, self._xobs)
+
+# End class SASProfile
+
+def _resolutionArray(value, xobs):
+    """Get a resolution array of the data.
+
+    value   --  The dx or dxl attribute of a DataInfo object.
+    xobs    --  The observed Q-points.
+
+    Returns a float array with the shape of xobs, or None if value is None,
+    empty or all zero.
+
+    """
+    if value is None:
+        return None
+    value = numpy.asarray(value, dtype = float)
+    if not value.size or not value.any():
+        return None
+    return numpy.broadcast_to(value, numpy.shape(xobs)).copy()
+
+# End of file
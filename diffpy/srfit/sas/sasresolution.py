@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+########################################################################
+#
+# diffpy.srfit      by DANSE Diffraction group
+#                   Simon J. L. Billinge
+#                   (c) 2010 The Trustees of Columbia University
+#                   in the City of New York.  All rights reserved.
+#
+# See AUTHORS.txt for a list of people who contributed.
+# See LICENSE_DANSE.txt for license information.
+#
+########################################################################
+"""Instrumental resolution of SAS data.
+
+The SASResolution class smears a calculated I(Q) with the resolution of the
+measurement. The smearing is a sparse matrix that maps the intensity on an
+oversampled Q-grid onto the Q-points of the data. It is built once per
+Q-grid, so that each evaluation is one sparse matrix-vector product.
+
+"""
+
+__all__ = ["SASResolution"]
+
+import numpy
+
+class SASResolution(object):
+    """Gaussian and slit smearing of SAS intensities.
+
+    The Gaussian resolution of Q-point q has the standard deviation dq. The
+    slit smearing averages I(sqrt(q**2 + u**2)) over u in [0, slitlength].
+    If both are given, the slit-smeared intensity is smeared by the Gaussian.
+
+    Attributes
+    dq          --  The standard deviations of the Gaussian resolution. This
+                    is a scalar, an array over the Q-points, or None.
+    slitlength  --  The slit lengths, like dq, or None.
+    qobs        --  The Q-points of the dq and slitlength arrays, or None.
+                    If given, the resolution is interpolated at the Q-points
+                    that are smeared, which then may differ from qobs.
+    nsigma      --  The Gaussian is cut off at nsigma standard deviations.
+    oversampling    --  The number of points of the oversampled Q-grid per
+                    resolution width.
+    _grid       --  A (key, qeval, matrix) tuple of the last Q-grid, or None.
+                    key identifies the Q-points, qeval is the oversampled
+                    Q-grid and matrix is the scipy.sparse smearing matrix with
+                    shape (len(q), len(qeval)).
+
+    """
+
+    def __init__(self, dq = None, slitlength = None, qobs = None, nsigma = 3,
+            oversampling = 8):
+        """Initialize the attributes.
+
+        dq          --  The standard deviations of the Gaussian resolution,
+                        see Attributes (default None).
+        slitlength  --  The slit lengths (default None).
+        qobs        --  The Q-points of the resolution arrays (default None).
+        nsigma      --  The cutoff of the Gaussian in standard deviations
+                        (default 3).
+        oversampling    --  The number of grid points per resolution width
+                        (default 8).
+
+        """
+        self.dq = dq
+        self.slitlength = slitlength
+        self.qobs = qobs
+        self.nsigma = nsigma
+        self.oversampling = oversampling
+        self._grid = None
+        return
+
+    def getGrid(self, q):
+        """Get the smearing of the Q-points q.
+
+        Returns the oversampled Q-grid, where the intensity has to be
+        calculated, and the sparse smearing matrix, which maps the intensity
+        on that grid onto q. The result is kept until q changes.
+
+        """
+        q = numpy.asarray(q, dtype = float)
+        key = (q.tostring(), _key(self.dq), _key(self.slitlength),
+                _key(self.qobs), self.nsigma, self.oversampling)
+        if self._grid is None or self._grid[0] != key:
+            qeval, matrix = self._makeGrid(q)
+            self._grid = (key, qeval, matrix)
+        return self._grid[1:]
+
+    def smear(self, q, iq):
+        """Smear an intensity.
+
+        q       --  The Q-points of the data.
+        iq      --  The intensity on the oversampled Q-grid of q, see getGrid.
+
+        Returns the smeared intensity at q.
+
+        """
+        qeval, matrix = self.getGrid(q)
+        return matrix.dot(iq)
+
+    def _getSamples(self, q):
+        """Sample the resolution kernels of the Q-points.
+
+        Returns arrays of the row index, the Q-value and the weight of the
+        samples. The weights of each row sum to one.
+
+        """
+        nq = len(q)
+        rows = numpy.arange(nq)[:, numpy.newaxis]
+        qs = q[:, numpy.newaxis]
+        ws = numpy.ones((nq, 1))
+        ns = 2 * self.nsigma * self.oversampling
+        if self.slitlength is not None:
+            sl = self._getWidth(self.slitlength, q)
+            u = sl * (numpy.arange(ns) + 0.5) / ns
+            qs = numpy.sqrt(qs**2 + u**2)
+            ws = numpy.repeat(ws / ns, ns, axis = 1)
+            rows = numpy.repeat(rows, ns, axis = 1)
+        if self.dq is not None:
+            dq = self._getWidth(self.dq, q)
+            t = numpy.linspace(-self.nsigma, self.nsigma, ns + 1)
+            # Trapezoidal weights of the truncated Gaussian
+            g = numpy.exp(-0.5 * t**2)
+            g[[0, -1]] *= 0.5
+            qs = (qs[:, :, numpy.newaxis] + dq[:, :, numpy.newaxis] * t)
+            ws = ws[:, :, numpy.newaxis] * g
+            rows = numpy.repeat(rows[:, :, numpy.newaxis], len(t), axis = 2)
+            qs, ws, rows = [a.reshape(nq, -1) for a in (qs, ws, rows)]
+        # Drop the samples at negative Q and normalize the rows.
+        ws = numpy.where(qs > 0, ws, 0.0)
+        ws /= ws.sum(axis = 1)[:, numpy.newaxis]
+        sel = ws.ravel() > 0
+        return rows.ravel()[sel], qs.ravel()[sel], ws.ravel()[sel]
+
+    def _getWidth(self, value, q):
+        """Get the dq or slitlength at q as a column vector."""
+        value = numpy.asarray(value, dtype = float)
+        if self.qobs is not None and value.ndim:
+            value = numpy.interp(q, self.qobs, value)
+        value = numpy.broadcast_to(value, q.shape)
+        return value[:, numpy.newaxis]
+
+    def _makeGrid(self, q):
+        """Make the oversampled Q-grid and the smearing matrix of q."""
+        from scipy.sparse import csr_matrix
+        rows, qs, ws = self._getSamples(q)
+        # The grid spacing follows the width of the kernels, that is their
+        # standard deviation, but it is not made finer than the spacing of
+        # the Q-points needs. The widths are interpolated between the
+        # Q-points and the grid points are placed at equal steps of the
+        # integral of oversampling / width. The Q-points themselves are on
+        # the grid, so that narrow kernels are exact.
+        nq = len(q)
+        mean = numpy.bincount(rows, ws * qs, nq)
+        width = numpy.bincount(rows, ws * (qs - mean[rows])**2, nq)**0.5
+        order = numpy.argsort(q)
+        qk, wk = q[order], width[order]
+        if len(qk) > 1:
+            wk = numpy.maximum(wk, numpy.gradient(qk))
+        qeval = qk
+        if (wk > 0).all():
+            lo, hi = qs.min(), qs.max()
+            knots = numpy.concatenate([[lo], qk, [hi]])
+            dens = self.oversampling / numpy.concatenate(
+                    [wk[:1], wk, wk[-1:]])
+            s = numpy.concatenate([[0], numpy.cumsum(0.5 * (dens[1:] +
+                dens[:-1]) * numpy.diff(knots))])
+            npts = max(2, int(numpy.ceil(s[-1])) + 1)
+            grid = numpy.interp(numpy.linspace(0, s[-1], npts), s, knots)
+            qeval = numpy.concatenate([grid, qk])
+        qeval = numpy.unique(qeval)
+        # Distribute each sample onto its neighbors in the grid.
+        if len(qeval) == 1:
+            idx = numpy.zeros(len(qs), dtype = int)
+            f = numpy.zeros(len(qs))
+            cols = (idx, idx)
+        else:
+            idx = numpy.clip(numpy.searchsorted(qeval, qs) - 1, 0,
+                    len(qeval) - 2)
+            f = (qs - qeval[idx]) / (qeval[idx + 1] - qeval[idx])
+            f = numpy.clip(f, 0, 1)
+            cols = (idx, idx + 1)
+        data = numpy.concatenate([ws * (1 - f), ws * f])
+        matrix = csr_matrix((data, (numpy.concatenate([rows, rows]),
+            numpy.concatenate(cols))), shape = (len(q), len(qeval)))
+        return qeval, matrix
+
+# End class SASResolution
+
+def _key(value):
+    """Get a hashable key of a scalar or array."""
+    if value is None:
+        return None
+    value = numpy.asarray(value, dtype = float)
+    return (value.shape, value.tostring())
+
+# End of file
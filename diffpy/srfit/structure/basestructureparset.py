@@ -15,11 +15,17 @@
 """Base class for adapting structures to a ParameterSet interface.
 
 The BaseStructureParSet is a ParameterSet with functionality required by all
-structure adapters.
+structure adapters. The BaseScattererParSet is a base class for the
+ParameterSets of the scatterers, which creates their Parameters on first
+access.
 
 """
 
-__all__ = ["BaseStructureParSet"]
+__all__ = ["BaseStructureParSet", "BaseScattererParSet"]
+
+import re
+
+from numpy import inf
 
 from diffpy.srfit.fitbase.parameterset import ParameterSet
 
@@ -63,3 +69,236 @@ class BaseStructureParSet(ParameterSet):
 
         """
         raise NotImplementedError("The must be overloaded")
+
+    def _iterCreatedPars(self, name = "."):
+        """Iterate over the Parameters that have been created.
+
+        Unlike iterPars, this does not create the Parameters of the
+        scatterers that have not been accessed. This is meant for observers
+        of the state of the structure, such as the cache keys of calculators,
+        since these Parameters cannot have been changed. See
+        BaseScattererParSet.
+
+        name    --  Select parameters with this name (regular expression,
+                    default ".").
+        """
+        for par in self._parameters.itervalues():
+            if re.match(name, par.name):
+                yield par
+
+        for obj in self._iterManaged():
+            if isinstance(obj, (BaseStructureParSet, BaseScattererParSet)):
+                pars = obj._iterCreatedPars(name)
+            elif hasattr(obj, "iterPars"):
+                pars = obj.iterPars(name = name)
+            else:
+                continue
+            for par in pars:
+                yield par
+
+        return
+
+    def _watchScatterers(self, callback):
+        """Report the scatterers whose Parameters have been created.
+
+        callback(index, scatterer) is called for each scatterer of
+        getScatterers, for a BaseScattererParSet only once its Parameters
+        have been created. This lets observers attach to the Parameters of
+        the scatterers without creating them.
+
+        """
+        for k, scatterer in enumerate(self.getScatterers()):
+            if isinstance(scatterer, BaseScattererParSet):
+                scatterer._whenMaterialized(_bindIndex(callback, k))
+            else:
+                callback(k, scatterer)
+        return
+
+# End class BaseStructureParSet
+
+class BaseScattererParSet(ParameterSet):
+    """Base class for the ParameterSets of scatterers.
+
+    A structure can have many scatterers, of which a fit usually refines only
+    a few. The Parameters of a scatterer are therefore created by
+    _makeParameters the first time they are accessed, that is, by get,
+    attribute access, iteration, iterPars or addParameter. A scatterer whose
+    Parameters have not been accessed is considered valid and is skipped by
+    _iterCreatedPars. Its sub-scatterers, such as the atoms of a molecule,
+    are still validated and visited.
+
+    Attributes
+    _lazynames      --  Names of the Parameters made by _makeParameters.
+                        Looking up one of these names creates the Parameters.
+    _materialized   --  Flag indicating that the Parameters have been
+                        created.
+    _oncreate       --  List of the callbacks that are called once the
+                        Parameters have been created, see _whenMaterialized.
+
+    """
+
+    _lazynames = frozenset()
+    _materialized = False
+    _oncreate = ()
+
+    def _makeParameters(self):
+        """Create the Parameters of the scatterer.
+
+        This must be overloaded.
+
+        """
+        raise NotImplementedError("The must be overloaded")
+
+    def _materialize(self):
+        """Create the Parameters if that has not been done."""
+        if not self._materialized:
+            self._materialized = True
+            self._makeParameters()
+            callbacks = self._oncreate
+            self._oncreate = ()
+            for callback in callbacks:
+                callback(self)
+        return
+
+    def _whenMaterialized(self, callback):
+        """Call callback(self) once the Parameters have been created.
+
+        The callback is called right away if they exist.
+
+        """
+        if self._materialized:
+            callback(self)
+        else:
+            self._oncreate = list(self._oncreate) + [callback]
+        return
+
+    def get(self, name, default = None):
+        """Get a managed object."""
+        if name in self._lazynames:
+            self._materialize()
+        return ParameterSet.get(self, name, default)
+
+    def iterPars(self, name = ".", recurse = True):
+        """Iterate over Parameters.
+
+        name    --  Select parameters with this name (regular expression,
+                    default ".").
+        recurse --  Recurse into managed objects (default True)
+        """
+        self._materialize()
+        return ParameterSet.iterPars(self, name, recurse)
+
+    def __iter__(self):
+        """Iterate over top-level parameters."""
+        self._materialize()
+        return ParameterSet.__iter__(self)
+
+    def __len__(self):
+        """Get number of top-level parameters."""
+        self._materialize()
+        return ParameterSet.__len__(self)
+
+    def __getitem__(self, idx):
+        """Get top-level parameters by index."""
+        self._materialize()
+        return ParameterSet.__getitem__(self, idx)
+
+    def __setattr__(self, name, value):
+        """Parameter access and object checking."""
+        if name in self._lazynames:
+            self._materialize()
+        ParameterSet.__setattr__(self, name, value)
+        return
+
+    def __delattr__(self, name):
+        """Delete parameters with del."""
+        if name in self._lazynames:
+            self._materialize()
+        ParameterSet.__delattr__(self, name)
+        return
+
+    def getNames(self):
+        """Get the names of managed parameters."""
+        self._materialize()
+        return ParameterSet.getNames(self)
+
+    def getValues(self):
+        """Get the values of managed parameters."""
+        self._materialize()
+        return ParameterSet.getValues(self)
+
+    def _addParameter(self, par, check = True):
+        """Store a Parameter, after the Parameters of the scatterer."""
+        self._materialize()
+        ParameterSet._addParameter(self, par, check)
+        return
+
+    addParameter = _addParameter
+
+    # The names in string equations refer to the Parameters.
+
+    def evaluateEquation(self, eqstr, ns = {}):
+        """Evaluate a string equation, see RecipeOrganizer."""
+        self._materialize()
+        return ParameterSet.evaluateEquation(self, eqstr, ns)
+
+    def constrain(self, par, con, ns = {}):
+        """Constrain a parameter to an equation, see RecipeOrganizer."""
+        self._materialize()
+        return ParameterSet.constrain(self, par, con, ns)
+
+    def restrain(self, res, lb = -inf, ub = inf, sig = 1, scaled = False,
+            ns = {}):
+        """Restrain an expression to specified bounds, see RecipeOrganizer."""
+        self._materialize()
+        return ParameterSet.restrain(self, res, lb, ub, sig, scaled, ns)
+
+    def _iterCreatedPars(self, name = "."):
+        """Iterate over the Parameters that have been created.
+
+        This does not create the Parameters of this scatterer or of its
+        sub-scatterers.
+
+        name    --  Select parameters with this name (regular expression,
+                    default ".").
+        """
+        if self._materialized:
+            for par in ParameterSet.iterPars(self, name, recurse = False):
+                yield par
+
+        for obj in self._iterManaged():
+            if isinstance(obj, BaseScattererParSet):
+                pars = obj._iterCreatedPars(name)
+            elif hasattr(obj, "iterPars"):
+                pars = obj.iterPars(name = name)
+            else:
+                continue
+            for par in pars:
+                yield par
+
+        return
+
+    def _validate(self):
+        """Validate my state.
+
+        Only the managed objects are validated if the Parameters have not
+        been created.
+
+        """
+        if self._materialized:
+            ParameterSet._validate(self)
+        else:
+            self._validateOthers(self._iterManaged())
+        return
+
+# End class BaseScattererParSet
+
+def _bindIndex(callback, k):
+    """Get a function that calls callback(k, scatterer)."""
+
+    def f(scatterer):
+        return callback(k, scatterer)
+
+    return f
+
+# End of file
@@ -31,14 +31,16 @@ ScattererParSet     --  Wrapper for cctbx.xray.scatterer
 from diffpy.srfit.fitbase.parameter import Parameter, ParameterAdapter
 from diffpy.srfit.fitbase.parameterset import ParameterSet
 from diffpy.srfit.structure.basestructureparset import BaseStructureParSet
+from diffpy.srfit.structure.basestructureparset import BaseScattererParSet
 
 __all__ = ["CCTBXScattererParSet", "CCTBXUnitCellParSet",
 "CCTBXCrystalParSet"]
 
-class CCTBXScattererParSet(ParameterSet):
+class CCTBXScattererParSet(BaseScattererParSet):
     """A wrapper for cctbx.xray.scatterer
 
-    This class derives from ParameterSet.
+    This class derives from BaseScattererParSet, so the Parameters are created
+    on first access.
 
     Attributes:
     name        --  Name of the scatterer. The name is always of the form
@@ -51,6 +53,8 @@ class CCTBXScattererParSet(ParameterSet):
 
     """
 
+    _lazynames = frozenset(["x", "y", "z", "occupancy", "Uiso"])
+
     def __init__(self, name, strups, idx):
         """Initialize
 
@@ -59,10 +63,13 @@ class CCTBXScattererParSet(ParameterSet):
         idx     --  The index of the scatterer in the structure.
 
         """
-        ParameterSet.__init__(self, name)
+        BaseScattererParSet.__init__(self, name)
         self.strups = strups
         self.idx = idx
+        return
 
+    def _makeParameters(self):
+        """Create the Parameters of the scatterer."""
         # x, y, z, occupancy
         self.addParameter(ParameterAdapter("x", None, self._xyzgetter(0),
             self._xyzsetter(0)))
@@ -0,0 +1,293 @@
+#!/usr/bin/env python
+########################################################################
+#
+# diffpy.srfit      by DANSE Diffraction group
+#                   Simon J. L. Billinge
+#                   (c) 2010 The Trustees of Columbia University
+#                   in the City of New York.  All rights reserved.
+#
+# See AUTHORS.txt for a list of people who contributed.
+# See LICENSE_DANSE.txt for license information.
+#
+########################################################################
+"""Array-backed adapter for large diffpy.Structure.Structure objects.
+
+DiffpyStructureParSet creates a DiffpyAtomParSet with about 27 Parameters for
+every atom, which makes the setup slow for large structures, and every change
+of a position goes through its own Parameter. DiffpyStructureArrayParSet
+instead holds the positions, occupancies and ADPs of all atoms in three
+array-valued Parameters, which are written to the structure in bulk. The
+DiffpyAtomParSets of the atoms are created when they are first accessed.
+
+As with DiffpyStructureParSet, the structure should be fully configured
+before it is passed to the adapter. The occupancies and ADPs of the atoms
+should not be changed outside of the adapter afterwards.
+
+DiffpyStructureArrayParSet  --  Array-backed adapter for
+                                diffpy.Structure.Structure
+AtomArrayParameter          --  Array-valued Parameter of a property of all
+                                atoms
+
+"""
+
+__all__ = ["DiffpyStructureArrayParSet", "AtomArrayParameter"]
+
+import numpy
+
+from diffpy.srfit.fitbase.parameter import Parameter, ParameterProxy
+from diffpy.srfit.structure.srrealparset import SrRealParSet
+from diffpy.srfit.structure.diffpyparset import DiffpyStructureParSet
+from diffpy.srfit.structure.diffpyparset import DiffpyAtomParSet
+from diffpy.srfit.structure.diffpyparset import DiffpyLatticeParSet
+from diffpy.srfit.structure.diffpyparset import _getAtomNames
+
+# The array Parameter that holds the values of the Parameters of an atom.
+_arraynames = {"x" : "xyz", "y" : "xyz", "z" : "xyz",
+        "occupancy" : "occupancy"}
+
+class AtomArrayParameter(Parameter):
+    """Array-valued Parameter of a property of all atoms.
+
+    The value is a read-only array with one row per atom. Setting the value
+    writes all changed rows to the structure at once.
+
+    Attributes
+    parset  --  The DiffpyStructureArrayParSet that owns the array.
+
+    """
+
+    def __init__(self, name, parset):
+        """Initialize.
+
+        name    --  The name of the array in parset, "xyz", "occupancy" or
+                    "U".
+        parset  --  The DiffpyStructureArrayParSet that owns the array.
+
+        """
+        self.name = name
+        self.parset = parset
+        self._value = None
+        Parameter.__init__(self, name, self.getValue())
+        return
+
+    def getValue(self):
+        """Get a read-only copy of the array."""
+        if self._value is None:
+            value = getattr(self.parset, "_" + self.name).copy()
+            value.setflags(write = False)
+            self._value = value
+        return self._value
+
+    def setValue(self, value, lb = None, ub = None):
+        """Set the array and write the changed rows to the structure."""
+        self.parset._setArray(self.name, value)
+        if lb is not None: self.bounds[0] = lb
+        if ub is not None: self.bounds[1] = ub
+        return self
+
+# End class AtomArrayParameter
+
+class DiffpyStructureArrayParSet(DiffpyStructureParSet):
+    """Array-backed wrapper for diffpy.Structure.Structure.
+
+    This is a DiffpyStructureParSet, but the DiffpyAtomParSets of the atoms
+    are only created when they are accessed by name, or all at once by
+    getScatterers. They are views of the arrays, that is, changing the
+    Parameters of an atom also changes the arrays and vice versa. Note that
+    iterPars does not visit the atoms that have not been accessed.
+
+    Attributes:
+    atoms   --  The list of DiffpyAtomParSets (property). This creates all of
+                them.
+    stru    --  The diffpy.Structure.Structure this is adapting
+    _xyz    --  Array of the fractional coordinates of the atoms. The xyz
+                attributes of the atoms are views of its rows, so the
+                positions are written with a single assignment.
+    _occupancy  --  Array of the occupancies of the atoms.
+    _U      --  Array of the ADP tensors of the atoms.
+    _atomnames  --  List of the names of the atoms.
+    _atomindex  --  Dictionary of the atom indices indexed by name.
+    _views  --  Dictionary of the created DiffpyAtomParSets indexed by the
+                atom index.
+    _viewpars   --  Dictionary of (index, array name) pairs of the Parameters
+                of the created DiffpyAtomParSets, indexed by their id.
+    _writing    --  Flag that is set while the arrays are written to the
+                structure.
+    _oncreate   --  List of the callbacks that are called when a
+                DiffpyAtomParSet is created, see _watchScatterers.
+
+    Managed Parameters:
+    xyz         --  The fractional coordinates, shape (n, 3)
+                    (AtomArrayParameter).
+    occupancy   --  The occupancies, shape (n,) (AtomArrayParameter).
+    U           --  The anisotropic ADPs, shape (n, 3, 3)
+                    (AtomArrayParameter).
+
+    Managed ParameterSets:
+    lattice     --  The managed DiffpyLatticeParSet
+    <el><idx>   --  The DiffpyAtomParSets, named as in DiffpyStructureParSet.
+                    These are created on first access.
+
+    """
+
+    # Needed by get before the attributes are set.
+    _atomindex = {}
+
+    def __init__(self, name, stru):
+        """Initialize
+
+        name    --  A name for the structure
+        stru    --  A diffpy.Structure.Structure instance
+
+        """
+        SrRealParSet.__init__(self, name)
+        self.stru = stru
+        self.addParameterSet(DiffpyLatticeParSet(stru.lattice))
+
+        n = len(stru)
+        self._xyz = numpy.array([a.xyz for a in stru],
+                dtype=float).reshape(n, 3)
+        for a, xyz in zip(stru, self._xyz):
+            a.xyz = xyz
+        self._occupancy = numpy.array([a.occupancy for a in stru],
+                dtype=float)
+        self._U = numpy.array([a.U for a in stru],
+                dtype=float).reshape(n, 3, 3)
+        self._atomnames = _getAtomNames(stru)
+        self._atomindex = dict((aname, i) for i, aname in
+                enumerate(self._atomnames))
+        self._views = {}
+        self._viewpars = {}
+        self._writing = False
+        self._oncreate = []
+        for pname in ("xyz", "occupancy", "U"):
+            self.addParameter(AtomArrayParameter(pname, self))
+
+        # other setup
+        self.__repr__ = stru.__repr__
+        return
+
+    atoms = property(lambda self: self.getScatterers())
+
+    def get(self, name, default = None):
+        """Get a managed object.
+
+        This creates the DiffpyAtomParSet of an atom on first access.
+
+        """
+        obj = DiffpyStructureParSet.get(self, name)
+        if obj is None and name in self._atomindex:
+            obj = self._getAtom(self._atomindex[name])
+        if obj is None:
+            return default
+        return obj
+
+    def getScatterers(self):
+        """Get a list of ParameterSets that represents the scatterers.
+
+        This creates the DiffpyAtomParSets of all atoms.
+
+        """
+        return [self._getAtom(i) for i in xrange(len(self._atomnames))]
+
+    def _watchScatterers(self, callback):
+        """Report the DiffpyAtomParSets that have been created.
+
+        callback(index, atom) is called for each created DiffpyAtomParSet,
+        and for the others when they are created.
+
+        """
+        for i, atom in sorted(self._views.items()):
+            callback(i, atom)
+        self._oncreate.append(callback)
+        return
+
+    def _getAtom(self, i):
+        """Get the DiffpyAtomParSet of atom i, creating it if needed."""
+        atom = self._views.get(i)
+        if atom is not None:
+            return atom
+        atom = DiffpyAtomParSet(self._atomnames[i], self.stru[i])
+        for par in atom:
+            if isinstance(par, ParameterProxy):
+                continue
+            self._viewpars[id(par)] = (i, _arraynames.get(par.name, "U"))
+            par.addObserver(self._atomChanged)
+        self._views[i] = atom
+        # This bypasses the name check of addParameterSet, which would create
+        # the atom again through get.
+        self._parsets[atom.name] = atom
+        atom.addObserver(self._flush)
+        self._storeConfigurable(atom)
+        for callback in self._oncreate:
+            callback(i, atom)
+        return atom
+
+    def _setArray(self, name, value):
+        """Write an array to the structure.
+
+        Only the rows that differ from the current array are written. The
+        occupancies and ADPs are set through the atoms, so that the atoms
+        can apply their constraints, such as isotropy, and are then read
+        back.
+
+        """
+        data = getattr(self, "_" + name)
+        value = numpy.broadcast_to(numpy.asarray(value, dtype=float),
+                data.shape)
+        changed = (value != data).reshape(len(data), -1).any(axis=1)
+        rows = numpy.flatnonzero(changed)
+        if not len(rows):
+            return
+        data[...] = value
+        if name == "occupancy":
+            for i in rows:
+                self.stru[i].occupancy = data[i]
+        elif name == "U":
+            for i in rows:
+                a = self.stru[i]
+                a.U = data[i]
+                data[i] = a.U
+        self._arrayChanged(name, rows)
+        return
+
+    def _arrayChanged(self, name, rows):
+        """Notify the observers of a changed array.
+
+        The Parameters of the accessed atoms in rows are notified as well.
+
+        """
+        par = self._parameters[name]
+        par._value = None
+        par.notify()
+        self._writing = True
+        try:
+            for i in rows:
+                atom = self._views.get(i)
+                if atom is None:
+                    continue
+                for apar in atom:
+                    if self._viewpars.get(id(apar), (None, None))[1] == name:
+                        apar.notify()
+        finally:
+            self._writing = False
+        return
+
+    def _atomChanged(self, par):
+        """Update the arrays after a change of an atom Parameter."""
+        if self._writing:
+            return
+        i, name = self._viewpars[id(par)]
+        a = self.stru[i]
+        if name == "occupancy":
+            self._occupancy[i] = a.occupancy
+        elif name == "U":
+            self._U[i] = a.U
+        par = self._parameters[name]
+        par._value = None
+        par.notify()
+        return
+
+# End class DiffpyStructureArrayParSet
+
+# End of file
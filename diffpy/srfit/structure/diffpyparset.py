@@ -33,6 +33,7 @@ __all__ = ["DiffpyStructureParSet"]
 from diffpy.srfit.fitbase.parameter import Parameter, ParameterProxy
 from diffpy.srfit.fitbase.parameter import ParameterAdapter
 from diffpy.srfit.fitbase.parameterset import ParameterSet
+from diffpy.srfit.structure.basestructureparset import BaseScattererParSet
 from diffpy.srfit.structure.srrealparset import SrRealParSet
 
 # Accessor for xyz of atoms
@@ -51,11 +52,13 @@ def _xyzsetter(i):
 
     return f
 
-class DiffpyAtomParSet(ParameterSet):
+class DiffpyAtomParSet(BaseScattererParSet):
     """A wrapper for diffpy.Structure.Atom.
 
-    This class derives from diffpy.srfit.fitbase.parameterset.ParameterSet. See
-    this class for base attributes.
+    This class derives from
+    diffpy.srfit.structure.basestructureparset.BaseScattererParSet, so the
+    Parameters are created on first access. See this class for base
+    attributes.
 
     Attributes:
     atom        --  The diffpy.Structure.Atom this is adapting
@@ -79,15 +82,26 @@ class DiffpyAtomParSet(ParameterSet):
 
     """
 
+    _lazynames = frozenset(["x", "y", "z", "occupancy", "occ", "Uiso",
+        "Biso"] + ["%s%i%i" % (c, i, j) for c in "UB" for i in (1, 2, 3)
+            for j in (1, 2, 3)])
+
     def __init__(self, name, atom):
         """Initialize
 
         atom    --  A diffpy.Structure.Atom instance
 
         """
-        ParameterSet.__init__(self, name)
+        BaseScattererParSet.__init__(self, name)
         self.atom = atom
-        a = atom
+
+        # Other setup
+        self.__repr__ = atom.__repr__
+        return
+
+    def _makeParameters(self):
+        """Create the Parameters of the atom."""
+        a = self.atom
         # x, y, z, occupancy
         self.addParameter(ParameterAdapter("x", a, _xyzgetter(0),
             _xyzsetter(0)))
@@ -132,9 +146,6 @@ class DiffpyAtomParSet(ParameterSet):
         self.addParameter(B23)
         self.addParameter(B32)
         self.addParameter(ParameterAdapter("Biso", a, attr = "Bisoequiv"))
-
-        # Other setup
-        self.__repr__ = a.__repr__
         return
 
     def _getElem(self):
@@ -230,6 +241,9 @@ class DiffpyStructureParSet(SrRealParSet):
 
     """
 
+    # SrReal calculators get the structure inside of a nometa wrapper.
+    _nometa = True
+
     def __init__(self, name, stru):
         """Initialize
 
@@ -242,15 +256,7 @@ class DiffpyStructureParSet(SrRealParSet):
         self.addParameterSet(DiffpyLatticeParSet(stru.lattice))
         self.atoms = []
 
-        cdict = {}
-        for a in stru:
-            el = a.element.title()
-            # Try to sanitize the name.
-            el = el.replace("+","p")
-            el = el.replace("-","m")
-            i = cdict.get(el, 0)
-            aname = "%s%i"%(el,i)
-            cdict[el] = i+1
+        for a, aname in zip(stru, _getAtomNames(stru)):
             atom = DiffpyAtomParSet(aname, a)
             self.addParameterSet(atom)
             self.atoms.append(atom)
@@ -280,17 +286,23 @@ class DiffpyStructureParSet(SrRealParSet):
         """
         return self.atoms
 
-    def _getSrRealStructure(self):
-        """Get the structure object for use with SrReal calculators.
+# End class DiffpyStructureParSet
 
-        If this is periodic, then return the structure, otherwise, pass it
-        inside of a nosymmetry wrapper. This takes the extra step of wrapping
-        the structure in a nometa wrapper.
+def _getAtomNames(stru):
+    """Get the names of the atom ParameterSets of a structure.
 
-        """
-        from diffpy.srreal.structureadapter import nometa
-        stru = SrRealParSet._getSrRealStructure(self)
-        return nometa(stru)
+    The names are the element followed by the index of that element in the
+    structure, e.g. "Ni0", "Ni1", ...
 
-
-# End class DiffpyStructureParSet
+    """
+    names = []
+    cdict = {}
+    for a in stru:
+        el = a.element.title()
+        # Try to sanitize the name.
+        el = el.replace("+","p")
+        el = el.replace("-","m")
+        i = cdict.get(el, 0)
+        names.append("%s%i"%(el,i))
+        cdict[el] = i+1
+    return names
@@ -49,15 +49,17 @@ from diffpy.srfit.fitbase.parameter import Parameter, ParameterAdapter
 from diffpy.srfit.fitbase.parameter import ParameterProxy
 from diffpy.srfit.fitbase.parameterset import ParameterSet
 from diffpy.srfit.fitbase.restraint import Restraint
+from diffpy.srfit.structure.basestructureparset import BaseScattererParSet
 from diffpy.srfit.structure.srrealparset import SrRealParSet
 
-class ObjCrystScattererParSet(ParameterSet):
+class ObjCrystScattererParSet(BaseScattererParSet):
     """A base adaptor for an Objcryst Scatterer.
 
-    This class derives from diffpy.srfit.fitbase.parameterset.ParameterSet and
-    adapts pyobjcryst.scatterer.Scatterer derivatives (Molecule, Atom) and
-    objects with a similar interface (MolAtom).  See the ParameterSet class for
-    base attributes.
+    This class derives from
+    diffpy.srfit.structure.basestructureparset.BaseScattererParSet and adapts
+    pyobjcryst.scatterer.Scatterer derivatives (Molecule, Atom) and objects
+    with a similar interface (MolAtom). The Parameters are created on first
+    access. See the BaseScattererParSet class for base attributes.
 
     Attributes:
     scat        --  The adapted pyobjcryst object.
@@ -70,6 +72,8 @@ class ObjCrystScattererParSet(ParameterSet):
 
     """
 
+    _lazynames = frozenset(["x", "y", "z", "occ"])
+
     def __init__(self, name, scat, parent):
         """Initialize
 
@@ -78,10 +82,13 @@ class ObjCrystScattererParSet(ParameterSet):
         parent  --  The ParameterSet this belongs to
 
         """
-        ParameterSet.__init__(self, name)
+        BaseScattererParSet.__init__(self, name)
         self.scat = scat
         self.parent = parent
+        return
 
+    def _makeParameters(self):
+        """Create the Parameters of the scatterer."""
         # x, y, z, occ
         self.addParameter(ParameterAdapter("x", self.scat, attr = "X"))
         self.addParameter(ParameterAdapter("y", self.scat, attr = "Y"))
@@ -123,6 +130,9 @@ class ObjCrystAtomParSet(ObjCrystScattererParSet):
 
     """
 
+    _lazynames = ObjCrystScattererParSet._lazynames | frozenset(["Biso",
+        "B11", "B22", "B33", "B12", "B21", "B13", "B31", "B23", "B32"])
+
     def __init__(self, name, atom, parent):
         """Initialize
 
@@ -132,7 +142,17 @@ class ObjCrystAtomParSet(ObjCrystScattererParSet):
 
         """
         ObjCrystScattererParSet.__init__(self, name, atom, parent)
+
+        # Give a value to Biso if it doesn't have one, and this is isotropic
         sp = atom.GetScatteringPower()
+        if sp.IsIsotropic() and sp.Biso == 0:
+            sp.Biso = 0.5
+        return
+
+    def _makeParameters(self):
+        """Create the Parameters of the atom."""
+        ObjCrystScattererParSet._makeParameters(self)
+        sp = self.scat.GetScatteringPower()
 
         # The B-parameters
         self.addParameter(ParameterAdapter("Biso", sp, attr = "Biso"))
@@ -151,10 +171,6 @@ class ObjCrystAtomParSet(ObjCrystScattererParSet):
         self.addParameter(B31)
         self.addParameter(B23)
         self.addParameter(B32)
-
-        # Give a value to Biso if it doesn't have one, and this is isotropic
-        if sp.IsIsotropic() and self.Biso.value == 0:
-            self.Biso.value = 0.5
         return
 
     def _getElem(self):
@@ -188,6 +204,9 @@ class ObjCrystMoleculeParSet(ObjCrystScattererParSet):
 
     """
 
+    _lazynames = ObjCrystScattererParSet._lazynames | frozenset(["q0", "q1",
+        "q2", "q3"])
+
     def __init__(self, name, molecule, parent = None):
         """Initialize
 
@@ -199,12 +218,6 @@ class ObjCrystMoleculeParSet(ObjCrystScattererParSet):
         ObjCrystScattererParSet.__init__(self, name, molecule, parent)
         self.stru = molecule
 
-        # Add orientiation quaternion
-        self.addParameter(ParameterAdapter("q0", self.scat, attr = "Q0"))
-        self.addParameter(ParameterAdapter("q1", self.scat, attr = "Q1"))
-        self.addParameter(ParameterAdapter("q2", self.scat, attr = "Q2"))
-        self.addParameter(ParameterAdapter("q3", self.scat, attr = "Q3"))
-
         # Wrap the MolAtoms within the molecule
         self.atoms = []
         anames = []
@@ -225,6 +238,17 @@ class ObjCrystMoleculeParSet(ObjCrystScattererParSet):
 
         return
 
+    def _makeParameters(self):
+        """Create the Parameters of the molecule."""
+        ObjCrystScattererParSet._makeParameters(self)
+
+        # Add orientiation quaternion
+        self.addParameter(ParameterAdapter("q0", self.scat, attr = "Q0"))
+        self.addParameter(ParameterAdapter("q1", self.scat, attr = "Q1"))
+        self.addParameter(ParameterAdapter("q2", self.scat, attr = "Q2"))
+        self.addParameter(ParameterAdapter("q3", self.scat, attr = "Q3"))
+        return
+
     @classmethod
     def canAdapt(self, stru):
         """Return whether the structure can be adapted by this class."""
@@ -621,16 +645,12 @@ class ObjCrystMolAtomParSet(ObjCrystScattererParSet):
 
     """
 
-    def __init__(self, name, scat, parent):
-        """Initialize
-
-        name    --  The name of the scatterer
-        scat    --  The Scatterer instance
-        parent  --  The ObjCrystCrystalParSet this belongs to
+    _lazynames = ObjCrystAtomParSet._lazynames
 
-        """
-        ObjCrystScattererParSet.__init__(self, name, scat, parent)
-        sp = scat.GetScatteringPower()
+    def _makeParameters(self):
+        """Create the Parameters of the atom."""
+        ObjCrystScattererParSet._makeParameters(self)
+        sp = self.scat.GetScatteringPower()
 
         # Only wrap this if there is a scattering power
         if sp is not None:
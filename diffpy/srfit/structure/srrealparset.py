@@ -21,6 +21,11 @@ __all__ = ["SrRealParSet"]
 from diffpy.srfit.structure.basestructureparset import BaseStructureParSet
 from diffpy.srfit.structure.bvsrestraint import BVSRestraint
 
+# Names of the atom Parameters that do not affect the positions of the atoms.
+_nongeometric = frozenset(["occ", "occupancy", "Uiso", "Biso", "U"] +
+        ["%s%i%i" % (c, i, j) for c in "UB" for i in (1, 2, 3)
+            for j in (1, 2, 3)])
+
 class SrRealParSet(BaseStructureParSet):
     """Base class for SrReal-compatible structure adapters.
 
@@ -32,9 +37,15 @@ class SrRealParSet(BaseStructureParSet):
     _usesymmetry    --  A flag indicating if SrReal calculators that operate on
                         this object should use symmetry. By default this is
                         True.
+    _nometa         --  A flag indicating if the metadata of the structure,
+                        such as the PDFFit scale and delta terms, is hidden
+                        from SrReal calculators (class attribute, default
+                        False).
 
     """
 
+    _nometa = False
+
     def __init__(self, *args, **kw):
         BaseStructureParSet.__init__(self, *args, **kw)
         self._usesymmetry = True
@@ -82,14 +93,50 @@ class SrRealParSet(BaseStructureParSet):
         """Check if symmetry is being used."""
         return self._usesymmetry
 
+    def isGeometric(self, par):
+        """Check if a Parameter of this structure affects its geometry.
+
+        The geometry is defined by the lattice and the atom positions. The
+        displacement parameters and the occupancies do not change it, so
+        calculators can reuse the interatomic distances when only these
+        change.
+
+        par     --  A Parameter from this structure.
+
+        """
+        return par.name not in _nongeometric
+
     def _getSrRealStructure(self):
         """Get the structure object for use with SrReal calculators.
 
         If this is periodic, then return the structure, otherwise, pass it
-        inside of a nosymmetry wrapper.
+        inside of a nosymmetry wrapper. If _nometa is set, the structure is
+        passed inside of a nometa wrapper as well.
 
         """
-        from diffpy.srreal.structureadapter import nosymmetry
-        if self._usesymmetry:
-            return self.stru
-        return nosymmetry(self.stru)
+        return _wrapSrRealStructure(self.stru, self._usesymmetry,
+                self._nometa)
+
+# End class SrRealParSet
+
+def _wrapSrRealStructure(stru, periodic, nometa = False):
+    """Wrap a structure for use with SrReal calculators.
+
+    This is also used in worker processes, which get the bare structure.
+
+    stru        --  The adapted structure
+    periodic    --  Flag indicating if the structure is periodic. If not, the
+                    structure is passed inside of a nosymmetry wrapper.
+    nometa      --  Flag indicating if the structure is passed inside of a
+                    nometa wrapper (default False).
+
+    """
+    from diffpy.srreal.structureadapter import nometa as _nometa
+    from diffpy.srreal.structureadapter import nosymmetry
+    if not periodic:
+        stru = nosymmetry(stru)
+    if nometa:
+        stru = _nometa(stru)
+    return stru
+
+# End of file
@@ -32,6 +32,7 @@ def testsuite():
         diffpy.srfit.tests.testfitrecipe
         diffpy.srfit.tests.testfitresults
         diffpy.srfit.tests.testliterals
+        diffpy.srfit.tests.testmultiresolution
         diffpy.srfit.tests.testobjcrystparset
         diffpy.srfit.tests.testordereddict
         diffpy.srfit.tests.testparameter
@@ -41,10 +42,14 @@ def testsuite():
         diffpy.srfit.tests.testprofilegenerator
         diffpy.srfit.tests.testrecipeorganizer
         diffpy.srfit.tests.testrestraint
+        diffpy.srfit.tests.testresultcache
+        diffpy.srfit.tests.testresultsstore
         diffpy.srfit.tests.testsas
+        diffpy.srfit.tests.testsequentialrefinement
         diffpy.srfit.tests.testsgconstriants
         diffpy.srfit.tests.testtagmanager
         diffpy.srfit.tests.testvisitors
+        diffpy.srfit.tests.testworkerpool
     '''.split()
     suite = unittest.TestSuite()
     loader = unittest.defaultTestLoader
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+########################################################################
+#
+# diffpy.srfit      by DANSE Diffraction group
+#                   Simon J. L. Billinge
+#                   (c) 2010 The Trustees of Columbia University
+#                   in the City of New York.  All rights reserved.
+#
+# See AUTHORS.txt for a list of people who contributed.
+# See LICENSE_DANSE.txt for license information.
+#
+########################################################################
+"""Import time of the srfit packages.
+
+Each package is imported in a new Python process, which prints the import
+time, the number of loaded modules and whether the sans packages were loaded.
+This shows the cost of touching a package in short-lived worker processes.
+
+Usage: importspeedtest.py [package ...]
+
+"""
+
+import sys
+import subprocess
+
+packages = ["diffpy.srfit.fitbase", "diffpy.srfit.pdf", "diffpy.srfit.sas"]
+
+# The script that runs in the new process. It prints the import time, the
+# number of new modules and the number of sans modules.
+_script = """
+import sys, time
+before = len(sys.modules)
+t0 = time.time()
+try:
+    __import__(%r)
+except ImportError, e:
+    print "ImportError:", e
+else:
+    nsans = len([m for m in sys.modules if m.split(".")[0] == "sans"])
+    print time.time() - t0, len(sys.modules) - before, nsans
+"""
+
+def timeImport(package):
+    """Import a package in a new process.
+
+    Returns the output of the process as a string.
+
+    """
+    proc = subprocess.Popen([sys.executable, "-c", _script % package],
+            stdout = subprocess.PIPE, stderr = subprocess.PIPE)
+    return proc.communicate()[0].strip()
+
+def importTest(package, repeat = 3):
+    """Print the best import time of a package out of repeat runs."""
+    results = [timeImport(package) for i in range(repeat)]
+    if results[0].startswith("ImportError"):
+        print "%-24s %s" % (package, results[0])
+        return
+    times = [float(r.split()[0]) for r in results]
+    nmodules, nsans = results[0].split()[1:]
+    print "%-24s %10.3f %10s %10s" % (package, min(times), nmodules, nsans)
+    return
+
+if __name__ == "__main__":
+
+    print "%-24s %10s %10s %10s" % ("package", "time (s)", "modules", "sans")
+    for package in sys.argv[1:] or packages:
+        importTest(package)
+
+# End of file
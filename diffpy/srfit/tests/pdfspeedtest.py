@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+########################################################################
+#
+# diffpy.srfit      by DANSE Diffraction group
+#                   Simon J. L. Billinge
+#                   (c) 2010 The Trustees of Columbia University
+#                   in the City of New York.  All rights reserved.
+#
+# See AUTHORS.txt for a list of people who contributed.
+# See LICENSE_DANSE.txt for license information.
+#
+########################################################################
+"""Speed tests of PDF calculations.
+
+speedTest compares the PDF of spherical fcc nickel particles from the
+histogram mode of the PairPDFCalculator with the exact pair sum, and with the
+SrReal DebyePDFCalculator. For each bin width it prints the time to build the
+histogram, the time of an evaluation after a change of the ADPs and the
+relative error of the PDF.
+
+phaseTest times the residual of a multi-phase PDFContribution with serial
+and concurrent evaluation of the phases (see
+PDFContribution.parallelPhases).
+
+Both require diffpy.srreal, like the diffpy.srfit.pdf package.
+
+Usage: pdfspeedtest.py [diameter ...]
+
+"""
+
+import sys
+import time
+
+import numpy
+
+from diffpy.Structure import Structure, Lattice, Atom
+from diffpy.srreal.pdfcalculator import DebyePDFCalculator
+from diffpy.srfit.pdf.pairpdfcalculator import PairPDFCalculator
+
+binwidths = [0.0, 0.001, 0.005, 0.02]
+
+def makeParticle(diameter, a = 3.52, disorder = 0.02):
+    """Make a spherical fcc nickel particle.
+
+    diameter    --  The particle diameter in Angstroms.
+    a           --  The lattice parameter.
+    disorder    --  Standard deviation of random atom displacements. These
+                    spread the pair distances like in a relaxed particle.
+
+    """
+    n = int(numpy.ceil(diameter / a / 2)) + 1
+    cells = numpy.mgrid[-n:n + 1, -n:n + 1, -n:n + 1].reshape(3, -1).T
+    basis = numpy.array([[0, 0, 0], [.5, .5, 0], [.5, 0, .5], [0, .5, .5]])
+    xyz = (cells[:, None, :] + basis[None, :, :]).reshape(-1, 3) * a
+    xyz = xyz[(xyz**2).sum(axis=1) <= (diameter / 2.0)**2]
+    xyz += numpy.random.RandomState(0).normal(0, disorder, xyz.shape)
+    lat = Lattice(1, 1, 1, 90, 90, 90)
+    return Structure([Atom("Ni", x, Uisoequiv = 0.005) for x in xyz], lat)
+
+def makeCrystal(a):
+    """Make an fcc nickel crystal with lattice parameter a."""
+    basis = [(0, 0, 0), (.5, .5, 0), (.5, 0, .5), (0, .5, .5)]
+    lat = Lattice(a, a, a, 90, 90, 90)
+    return Structure([Atom("Ni", x, Uisoequiv = 0.005) for x in basis], lat)
+
+def makeCalculator(binwidth, rmax):
+    """Make a non-periodic PairPDFCalculator."""
+    calc = PairPDFCalculator()
+    calc.rmin, calc.rmax, calc.rstep = 0.5, rmax, 0.01
+    calc.qmax = 25.0
+    calc.periodic = False
+    calc.binwidth = binwidth
+    # Keep the pair data between evaluations as the generator does.
+    calc.pairs.tracking = True
+    return calc
+
+def timeCalculator(stru, binwidth, rmax):
+    """Time the first evaluation and one after an ADP change.
+
+    Returns the two times and the PDF.
+
+    """
+    calc = makeCalculator(binwidth, rmax)
+    t0 = time.time()
+    calc(stru)
+    t1 = time.time()
+    for a in stru:
+        a.Uisoequiv = 0.006
+    calc.pairs._stateChanged(None)
+    t2 = time.time()
+    r, g = calc(stru)
+    t3 = time.time()
+    for a in stru:
+        a.Uisoequiv = 0.005
+    return t1 - t0, t3 - t2, g
+
+def timeDebye(stru, rmax):
+    """Time the SrReal DebyePDFCalculator."""
+    calc = DebyePDFCalculator()
+    calc.rmin, calc.rmax, calc.rstep = 0.5, rmax, 0.01
+    calc.qmax = 25.0
+    t0 = time.time()
+    calc(stru)
+    return time.time() - t0
+
+def speedTest(diameter):
+    stru = makeParticle(diameter)
+    rmax = min(diameter, 30.0)
+    print "Particle diameter %g A, %i atoms" % (diameter, len(stru))
+    print "DebyePDFCalculator: %.3f s" % timeDebye(stru, rmax)
+    print "%10s %12s %12s %12s" % ("binwidth", "build (s)", "update (s)",
+            "rel. error")
+    gexact = None
+    for binwidth in binwidths:
+        tbuild, tupdate, g = timeCalculator(stru, binwidth, rmax)
+        if gexact is None:
+            gexact = g
+        err = numpy.sqrt(((g - gexact)**2).sum() / (gexact**2).sum())
+        print "%10g %12.3f %12.3f %12.2e" % (binwidth, tbuild, tupdate, err)
+    print
+    return
+
+def phaseTest(nphases, ncpu, processes = True, numcalls = 10):
+    """Time the residual of a PDFContribution with nphases phases.
+
+    The phases are fcc crystals with different lattice parameters. Each call
+    changes the lattice parameters, so that all phases are recalculated.
+
+    """
+    from diffpy.srfit.pdf import PDFContribution
+    r = numpy.arange(1, 30, 0.01)
+    times = []
+    for n in (1, ncpu):
+        con = PDFContribution("pdf")
+        con.profile.setObservedProfile(r, numpy.zeros_like(r))
+        phases = []
+        for i in range(nphases):
+            stru = makeCrystal(3.5 + 0.1 * i)
+            phases.append(con.addStructure("phase%i" % i, stru))
+        con.parallelPhases(n, processes)
+        t0 = time.time()
+        for i in xrange(numcalls):
+            for p in phases:
+                p.lattice.a.value *= 1.0001
+            con.residual()
+        times.append((time.time() - t0) / numcalls)
+        con.parallelPhases(1)
+    print "%i phases, %i threads: serial %.4f s, concurrent %.4f s" % (
+            nphases, ncpu, times[0], times[1])
+    return
+
+if __name__ == "__main__":
+
+    diameters = [float(d) for d in sys.argv[1:]] or [15, 25]
+    for d in diameters:
+        speedTest(d)
+    for nphases in (2, 3, 5):
+        phaseTest(nphases, nphases)
+
+# End of file
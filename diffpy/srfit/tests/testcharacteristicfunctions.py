@@ -141,6 +141,59 @@ class TestSASCF(testoptional(TestCaseSaS, TestCasePDF)):
         self.assertAlmostEqual(0, res34, 4)
         return
 
+    def testGridCache(self):
+        """Check that the transform grid is reused for small size changes."""
+        from sans.models.SphereModel import SphereModel
+        model = SphereModel()
+        model.setParam("radius", 25)
+        ff = cf.SASCF("sphere", model)
+        r = numpy.arange(1, 60, 0.1, dtype = float)
+        fr1 = ff(r)
+        ff.radius.value = 25.1
+        fr2 = ff(r)
+        self.assertEqual(1, len(ff._grids))
+        self.assertEqual(1, len(ff._interp))
+        fr3 = cf.sphericalCF(r, 50.2)
+        diff = fr2 - fr3
+        res = numpy.dot(diff, diff)
+        res /= numpy.dot(fr3, fr3)
+        self.assertAlmostEqual(0, res, 4)
+        self.assertFalse(numpy.allclose(fr1, fr2))
+        return
+
+
+class TestPolydisperseCF(testoptional(TestCasePDF)):
+
+    def setUp(self):
+        global cf
+        import diffpy.srfit.pdf.characteristicfunctions as cf
+
+    def testBroadcast(self):
+        """Check that the size arguments broadcast against r."""
+        r = numpy.arange(0, 60, 0.1, dtype = float)
+        sizes = numpy.array([20.0, 30.0, 40.0])
+        for f, args in [(cf.sphericalCF, ()), (cf.spheroidalCF2, (0.7,)),
+                (cf.spheroidalCF2, (1.5,)), (cf.shellCF2, (5.0,))]:
+            fr = f(r, sizes[:, numpy.newaxis], *args)
+            self.assertEqual((3, len(r)), fr.shape)
+            for s, fs in zip(sizes, fr):
+                self.assertTrue(numpy.allclose(f(r, s, *args), fs))
+        return
+
+    def testSphere(self):
+        """Compare the polydisperse sphere with lognormalSphericalCF."""
+        r = numpy.arange(0, 100, 0.1, dtype = float)
+        pcf = cf.PolydisperseCF(cf.sphericalCF)
+        fr1 = pcf(r, 40, 8)
+        fr2 = cf.lognormalSphericalCF(r[1:], 40, 8)
+        self.assertTrue(numpy.allclose(fr1[1:], fr2, atol = 1e-5))
+        self.assertTrue(pcf(r, 40, 8) is fr1)
+        self.assertTrue(numpy.array_equal(cf.sphericalCF(r, 40),
+            pcf(r, 40, 0)))
+        # An axis ratio of 1 is the sphere.
+        pcf2 = cf.PolydisperseCF(cf.spheroidalCF2)
+        self.assertTrue(numpy.allclose(fr1, pcf2(r, 40, 8, 1.0)))
+        return
 
 
 if __name__ == "__main__":
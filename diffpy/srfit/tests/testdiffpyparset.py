@@ -107,6 +107,163 @@ class TestParameterAdapter(testoptional(TestCaseStructure)):
         self.assertNotEquals(d, dsstru.lattice.dist(a1.xyz, a2.xyz))
         return
 
+    def testIsGeometric(self):
+        """Test the classification of the structure Parameters."""
+        a1 = Atom("Cu", xyz = numpy.array([.0, .1, .2]), Uisoequiv = 0.003)
+        l = Lattice(2.5, 2.5, 2.5, 90, 90, 90)
+        s = DiffpyStructureParSet("Cu", Structure([a1], l))
+
+        self.assertTrue(s.isGeometric(s.lattice.a))
+        self.assertTrue(s.isGeometric(s.lattice.gamma))
+        self.assertTrue(s.isGeometric(s.Cu0.x))
+        self.assertTrue(s.isGeometric(s.Cu0.z))
+        for name in ["occ", "occupancy", "Uiso", "Biso", "U11", "U32",
+                "B23"]:
+            self.assertFalse(s.isGeometric(getattr(s.Cu0, name)))
+        return
+
+    def testLazy(self):
+        """Check that the atom Parameters are created on first access."""
+        a1 = Atom("Cu", xyz = numpy.array([.0, .1, .2]), Uisoequiv = 0.003)
+        a2 = Atom("Ag", xyz = numpy.array([.3, .4, .5]), Uisoequiv = 0.002)
+        l = Lattice(2.5, 2.5, 2.5, 90, 90, 90)
+        s = DiffpyStructureParSet("CuAg", Structure([a1, a2], l))
+
+        cu, ag = s.getScatterers()
+        self.assertFalse(cu._materialized)
+        self.assertFalse(ag._materialized)
+        # Validation and the observers of the structure do not create them.
+        s._validate()
+        names = [par.name for par in s._iterCreatedPars()]
+        self.assertEqual(["a", "b", "c", "alpha", "beta", "gamma"], names)
+        self.assertFalse(cu._materialized)
+
+        # Access creates the Parameters of that atom only.
+        self.assertAlmostEqual(0.1, s.Cu0.y.value)
+        self.assertTrue(cu._materialized)
+        self.assertFalse(ag._materialized)
+        self.assertTrue(cu.y in list(s._iterCreatedPars()))
+        self.assertEqual(len(cu), len(list(ag.iterPars())))
+        self.assertTrue(ag._materialized)
+
+        # Iterating over a fresh structure creates them.
+        s = DiffpyStructureParSet("CuAg", Structure([a1, a2], l))
+        pars = list(s.iterPars("Uiso"))
+        self.assertEqual(set([s.Cu0.Uiso, s.Ag0.Uiso]), set(pars))
+        self.assertEqual(len(cu) * 2 + 6, len(list(s.iterPars())))
+
+        # Constraining the structure creates all of them.
+        s = DiffpyStructureParSet("CuAg", Structure([a1, a2], l))
+        s.setConst()
+        self.assertTrue(s.Ag0.x.const)
+        return
+
+    def testLazyNested(self):
+        """Check the Parameters of a scatterer within a scatterer."""
+        from diffpy.srfit.structure.diffpyparset import DiffpyAtomParSet
+        a1 = Atom("Cu", xyz = numpy.array([.0, .1, .2]), Uisoequiv = 0.003)
+        a2 = Atom("C", xyz = numpy.array([.3, .4, .5]), Uisoequiv = 0.002)
+        l = Lattice(2.5, 2.5, 2.5, 90, 90, 90)
+        s = DiffpyStructureParSet("Cu", Structure([a1], l))
+        # Like the atoms of a molecule
+        mol = DiffpyAtomParSet("mol", a1)
+        mol.addParameterSet(DiffpyAtomParSet("C0", a2))
+        s.addParameterSet(mol)
+
+        s.mol.C0.x.value = 0.3
+        self.assertFalse(mol._materialized)
+        pars = list(s._iterCreatedPars())
+        self.assertTrue(mol.C0.x in pars)
+        self.assertFalse(mol._materialized)
+
+        # The nested Parameters are validated.
+        from diffpy.srfit.fitbase.parameter import Parameter
+        mol.C0.addParameter(Parameter("extra"))
+        self.assertRaises(AttributeError, s._validate)
+        self.assertFalse(mol._materialized)
+        return
+
+
+class TestDiffpyStructureArrayParSet(testoptional(TestCaseStructure)):
+
+    def setUp(self):
+        global Atom, Lattice, Structure
+        from diffpy.Structure import Atom, Lattice, Structure
+        from diffpy.srfit.structure.diffpyarrayparset import \
+                DiffpyStructureArrayParSet
+        a1 = Atom("Cu", xyz = numpy.array([.0, .1, .2]), Uisoequiv = 0.003)
+        a2 = Atom("Ag", xyz = numpy.array([.3, .4, .5]), Uisoequiv = 0.002)
+        a3 = Atom("Cu", xyz = numpy.array([.5, .5, .5]), Uisoequiv = 0.004)
+        l = Lattice(2.5, 2.5, 2.5, 90, 90, 90)
+        self.stru = Structure([a1, a2, a3], l)
+        self.parset = DiffpyStructureArrayParSet("CuAg", self.stru)
+        return
+
+    def testArrays(self):
+        """Check that the arrays are written to the structure."""
+        s = self.parset
+        stru = self.stru
+        self.assertTrue(numpy.array_equal(stru.xyz, s.xyz.value))
+        self.assertTrue(numpy.array_equal([0.003, 0.002, 0.004],
+            s.U.value[:,0,0]))
+        self.assertFalse(s.xyz.value.flags.writeable)
+
+        xyz = s.xyz.value + 0.05
+        s.xyz.value = xyz
+        self.assertTrue(numpy.array_equal(xyz, stru.xyz))
+        self.assertTrue(numpy.array_equal(xyz, s.xyz.value))
+        s.occupancy.value = [1, 0.5, 1]
+        self.assertEquals(0.5, stru[1].occupancy)
+        U = s.U.value.copy()
+        U[2] = numpy.diag([0.01, 0.01, 0.01])
+        s.U.value = U
+        self.assertEquals(0.01, stru[2].Uisoequiv)
+        self.assertRaises(ValueError, s.xyz.setValue, xyz[:2])
+        return
+
+    def testAtoms(self):
+        """Check the atom ParameterSets created on demand."""
+        s = self.parset
+        stru = self.stru
+        self.assertEquals(0, len(s._views))
+        self.assertEquals(["Cu0", "Ag0", "Cu1"],
+                [a.name for a in s.getScatterers()])
+        self.assertEquals(3, len(s._views))
+        self.assertTrue(s.Cu1 is s.getScatterers()[2])
+        self.assertTrue(s.get("Cu2") is None)
+
+        # Changes of the atom Parameters change the arrays.
+        xyz = s.xyz.value
+        s.Cu1.x.value = 0.7
+        self.assertEquals(0.7, stru[2].x)
+        self.assertEquals(0.7, s.xyz.value[2, 0])
+        self.assertFalse(xyz is s.xyz.value)
+        s.Ag0.occ.value = 0.8
+        self.assertEquals(0.8, s.occupancy.value[1])
+        s.Cu0.Uiso.value = 0.005
+        self.assertAlmostEquals(0.005, s.U.value[0, 1, 1])
+
+        # Changes of the arrays notify the atom Parameters.
+        changed = []
+        def observer(other):
+            changed.append(other)
+        s.Cu0.y.addObserver(observer)
+        s.Ag0.y.addObserver(observer)
+        xyz = s.xyz.value.copy()
+        xyz[1, 1] = 0.25
+        s.xyz.value = xyz
+        self.assertEquals([s.Ag0.y], changed)
+        self.assertEquals(0.25, s.Ag0.y.value)
+        return
+
+    def testIsGeometric(self):
+        """Test the classification of the array Parameters."""
+        s = self.parset
+        self.assertTrue(s.isGeometric(s.xyz))
+        self.assertFalse(s.isGeometric(s.occupancy))
+        self.assertFalse(s.isGeometric(s.U))
+        self.assertTrue(s.isGeometric(s.Cu0.x))
+        return
 
 
 if __name__ == "__main__":
@@ -16,7 +16,7 @@
 
 import unittest
 
-from numpy import linspace, array_equal, pi, sin, dot
+from numpy import linspace, array_equal, allclose, pi, sin, dot
 
 from diffpy.srfit.fitbase.fitrecipe import FitRecipe
 from diffpy.srfit.fitbase.fitcontribution import FitContribution
@@ -140,6 +140,38 @@ class TestFitRecipe(unittest.TestCase):
         self.assertTrue(2 in values)
         return
 
+    def testSetValues(self):
+        """Test bulk assignment of variable values."""
+        recipe = self.recipe
+        con = self.fitcontribution
+        recipe.addVar(con.A, 2)
+        recipe.addVar(con.k, 1)
+        recipe.addVar(con.c, 0, fixed = True)
+
+        names, values = recipe.getSnapshot()
+        self.assertEqual(["A", "k", "c"], names)
+        self.assertTrue(array_equal([2, 1, 0], values))
+
+        recipe.setValues(["c", "A"], [3, 4])
+        self.assertEqual(4, con.A.value)
+        self.assertEqual(1, con.k.value)
+        self.assertEqual(3, con.c.value)
+        self.assertRaises(ValueError, recipe.setValues, ["B"], [1])
+        self.assertRaises(ValueError, recipe.setValues, ["A", "k"], [1])
+        self.assertEqual(4, con.A.value)
+
+        recipe.setValues(names, values)
+        self.assertTrue(array_equal(values, recipe.getSnapshot()[1]))
+
+        # The contribution is notified once, after both values are set.
+        calls = []
+        con.addObserver(lambda other: calls.append(con.k.value))
+        recipe.setValues(["A", "k"], [5, 2])
+        self.assertEqual([2], calls)
+        x = self.profile.x
+        self.assertTrue(allclose(5 * sin(2 * x), con.evaluate()))
+        return
+
     def testResidual(self):
         """Test the residual and everything that can change it."""
 
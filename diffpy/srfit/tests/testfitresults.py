@@ -75,6 +75,17 @@ class TestInitializeRecipe(unittest.TestCase):
         self.assertAlmostEquals(self.x0val, recipe.x0.value)
         return
 
+    def testInitializeFromSnapshot(self):
+        recipe = self.recipe
+        initializeRecipe(recipe, (["x0", "A", "B"], [3, 2, 1]))
+        self.assertEquals(2, recipe.A.value)
+        self.assertEquals(0, recipe.sig.value)
+        self.assertEquals(3, recipe.x0.value)
+        initializeRecipe(recipe, {"sig" : 4})
+        self.assertEquals(4, recipe.sig.value)
+        self.assertRaises(AttributeError, initializeRecipe, recipe, {})
+        return
+
 if __name__ == "__main__":
 
     unittest.main()
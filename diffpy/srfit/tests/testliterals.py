@@ -176,6 +176,47 @@ class TestConvolutionOperator(unittest.TestCase):
         self.assertAlmostEquals(0, sum((g3-g3c)**2))
         return
 
+    def testFFT(self):
+        """Compare the FFT convolution with the direct one."""
+
+        import numpy
+        from diffpy.srfit.equation.literals import operators
+
+        x = numpy.linspace(0, 10, 5000)
+        g1 = numpy.exp(-0.5*((x-4.5)/0.1)**2)
+        g2 = numpy.exp(-0.5*((x-2.5)/0.4)**2)
+        a1 = literals.Argument(name = "g1", value = g1)
+        a2 = literals.Argument(name = "g2", value = g2)
+        op = literals.ConvolutionOperator()
+        op.addLiteral(a1)
+        op.addLiteral(a2)
+
+        g3c = op.value
+        fftratio = operators._fftratio
+        try:
+            operators._fftratio = numpy.inf
+            g3 = operators._conv(g1, g2)
+        finally:
+            operators._fftratio = fftratio
+        self.assertTrue(numpy.allclose(g3, g3c))
+
+        # The transform of the unchanged kernel is reused.
+        kernel = op.operation._kernel
+        a1.setValue(numpy.roll(g1, 100))
+        self.assertTrue(numpy.allclose(numpy.roll(g3, 100), op.value))
+        self.assertTrue(kernel is op.operation._kernel)
+        a2.setValue(g2.copy())
+        op.value
+        self.assertTrue(kernel is op.operation._kernel)
+
+        # A kernel that is changed in place is transformed again.
+        g2[:] = numpy.exp(-0.5*((x-2.5)/0.2)**2)
+        a2.setValue(g2)
+        a1.setValue(g1)
+        self.assertTrue(numpy.allclose(operators._conv(g1, g2), op.value))
+        self.assertFalse(kernel is op.operation._kernel)
+        return
+
 
 if __name__ == "__main__":
     unittest.main()
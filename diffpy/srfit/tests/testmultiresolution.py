@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+##############################################################################
+#
+# diffpy.srfit      by DANSE Diffraction group
+#                   Simon J. L. Billinge
+#                   (c) 2010 The Trustees of Columbia University
+#                   in the City of New York.  All rights reserved.
+#
+# See AUTHORS.txt for a list of people who contributed.
+# See LICENSE_DANSE.txt for license information.
+#
+##############################################################################
+"""Tests for multiresolution module."""
+
+import unittest
+
+from numpy import array_equal
+
+from diffpy.srfit.fitbase.multiresolution import MultiResolutionOptimizer
+from diffpy.srfit.fitbase.sequentialrefinement import SequentialRefinement
+from diffpy.srfit.tests.testsequentialrefinement import _makeRecipe
+from diffpy.srfit.tests.testsequentialrefinement import _makeSeries
+
+
+class TestMultiResolutionOptimizer(unittest.TestCase):
+
+    def setUp(self):
+        self.recipe = _makeRecipe()
+        x, y = _makeSeries([200])[0]
+        self.profile = self.recipe.g.profile
+        self.profile.setObservedProfile(x, y)
+        self.recipe.x0.value = 5.2
+        return
+
+    def testRefine(self):
+        """Test the coarse-to-fine refinement."""
+        recipe = self.recipe
+        x = self.profile.x
+        optimize = MultiResolutionOptimizer(strides = (4, 8, 2))
+        self.assertEqual([8, 4, 2, 1], optimize.strides)
+        self.assertTrue(optimize(recipe))
+        self.assertAlmostEqual(2, recipe.A.value, 5)
+        self.assertAlmostEqual(5.4, recipe.x0.value, 5)
+        self.assertAlmostEqual(0.5, abs(recipe.sigma.value), 5)
+        # The original grid is restored and used in the last stage.
+        self.assertTrue(array_equal(x, self.profile.x))
+        stride, npoints, cost = optimize.stages[-1]
+        self.assertEqual(1, stride)
+        self.assertEqual(len(x), npoints)
+        self.assertEqual(13, optimize.stages[0][1])
+        self.assertRaises(ValueError, MultiResolutionOptimizer, (2, 0))
+        return
+
+    def testSkipStages(self):
+        """Test skipping of stages."""
+        recipe = self.recipe
+        # Grids with too few points are skipped.
+        optimize = MultiResolutionOptimizer(strides = (50, 2))
+        optimize(recipe)
+        self.assertEqual([2, 1], [s[0] for s in optimize.stages])
+        # Settled variables move on to the original grid.
+        optimize = MultiResolutionOptimizer(strides = (8, 4, 2))
+        optimize(recipe)
+        self.assertEqual([8, 4, 1], [s[0] for s in optimize.stages])
+        return
+
+    def testSequential(self):
+        """Test use in a sequential refinement."""
+        optimize = MultiResolutionOptimizer()
+        seq = SequentialRefinement(_makeRecipe(), optimizer = optimize)
+        store = seq.refine(_makeSeries([100, 200]))
+        self.assertTrue(all(store.converged))
+        x0, dx0 = store.getColumn("x0")
+        self.assertAlmostEqual(5.4, x0[1], 5)
+        return
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -162,6 +162,422 @@ class TestPDFGenerator(testoptional(TestCaseStructure, TestCasePDF)):
         self.assertAlmostEquals(0, res)
         return
 
+    def testEnvelope(self):
+        """Check that scale and qdamp are applied to the cached PDF."""
+        gen = PDFGenerator()
+        from diffpy.Structure import PDFFitStructure
+        stru = PDFFitStructure()
+        stru.read(datafile("ni.cif"))
+        for i in range(4):
+            stru[i].Bisoequiv = 1
+        gen.setStructure(stru)
+        profile = Profile()
+        r = numpy.arange(0, 10, 0.1)
+        profile.setCalculationPoints(r)
+        gen.setProfile(profile)
+        y0 = gen.value
+
+        calls = []
+        calc = gen._calc
+        def countingcalc(srstru):
+            calls.append(srstru)
+            return calc(srstru)
+        gen._calc = countingcalc
+
+        gen.scale.value = 2
+        gen.qdamp.value = 0.1
+        y = gen.value
+        self.assertEqual(0, len(calls))
+        calc.scale = 2
+        calc.qdamp = 0.1
+        calc.eval(stru)
+        self.assertTrue(numpy.allclose(calc.pdf, y))
+        self.assertTrue(numpy.allclose(2 * y0 * numpy.exp(-0.5 *
+            (0.1 * r)**2), y))
+        calc.scale = 1
+        calc.qdamp = 0
+
+        gen.delta2.value = 1
+        gen.value
+        self.assertEqual(1, len(calls))
+        return
+
+    def testCache(self):
+        """Check that generators sharing a phase share cached PDFs."""
+        from diffpy.Structure import PDFFitStructure
+        from diffpy.srfit.util.resultcache import ResultCache
+        stru = PDFFitStructure()
+        stru.read(datafile("ni.cif"))
+        for i in range(4):
+            stru[i].Bisoequiv = 1
+        cache = ResultCache()
+        r = numpy.arange(0, 10, 0.1)
+        gen1 = PDFGenerator("pdf1")
+        gen1.setStructure(stru)
+        gen2 = PDFGenerator("pdf2")
+        gen2.setPhase(gen1.phase)
+        gen1.setCache(cache)
+        gen2.setCache(cache)
+        self.assertTrue(gen1.getCache() is cache)
+
+        y1 = gen1(r)
+        y2 = gen2(numpy.array(r))
+        self.assertTrue(numpy.array_equal(y1, y2))
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(1, cache.misses)
+
+        # A different configuration misses the cache.
+        gen2.setScatteringType("N")
+        gen2(r)
+        self.assertEqual(2, cache.misses)
+        # So does a change of the structure.
+        gen1.phase.lattice.a.value = 3.6
+        gen1(r)
+        self.assertEqual(3, cache.misses)
+        return
+
+    def testCacheArrays(self):
+        """Check the cache with the array-valued Parameters of a phase."""
+        from diffpy.Structure import PDFFitStructure
+        from diffpy.srfit.structure.diffpyarrayparset import \
+                DiffpyStructureArrayParSet
+        from diffpy.srfit.util.resultcache import ResultCache
+        stru = PDFFitStructure()
+        stru.read(datafile("ni.cif"))
+        phase = DiffpyStructureArrayParSet("ni", stru)
+        cache = ResultCache()
+        r = numpy.arange(0, 10, 0.1)
+        gen = PDFGenerator()
+        gen.setPhase(phase)
+        gen.setCache(cache)
+        y0 = gen(r)
+        xyz0 = phase.xyz.value
+        phase.xyz.value = xyz0 + [0.01, 0, 0]
+        y1 = gen(r)
+        self.assertFalse(numpy.allclose(y0, y1))
+        self.assertEqual(2, cache.misses)
+        phase.xyz.value = xyz0
+        self.assertTrue(numpy.array_equal(y0, gen(r)))
+        self.assertEqual(1, cache.hits)
+        return
+
+    def testInterpolation(self):
+        """Check the mapping of the calculator grid onto r."""
+        from diffpy.Structure import PDFFitStructure
+        from diffpy.srfit.pdf.basepdfgenerator import _makeInterpolation
+        stru = PDFFitStructure()
+        stru.read(datafile("ni.cif"))
+        gen = PDFGenerator()
+        gen.setStructure(stru)
+        r = numpy.arange(1, 10, 0.05)
+        y = gen(r)
+        self.assertEqual("slice", gen._interp[1][0])
+        rcalc, ycalc = gen._calc(gen._phase._getSrRealStructure())
+        self.assertTrue(numpy.allclose(numpy.interp(r, rcalc, ycalc), y))
+        # Non-uniform points are interpolated.
+        rcalc = numpy.arange(0, 5.01, 0.01)
+        rnu = numpy.array([-1, 0.02, 0.025, 1.333, 4.5, 7])
+        kind, index, weight = _makeInterpolation(rnu, rcalc)
+        self.assertEqual("interp", kind)
+        ycalc = numpy.sin(rcalc)
+        yi = ycalc[index] * (1 - weight) + ycalc[index + 1] * weight
+        self.assertTrue(numpy.allclose(numpy.interp(rnu, rcalc, ycalc), yi))
+        kind, index, weight = _makeInterpolation(rcalc[::2], rcalc)
+        self.assertEqual("take", kind)
+        return
+
+    def testBatch(self):
+        """Check the PDF of several structure states."""
+        from diffpy.Structure import PDFFitStructure
+        stru = PDFFitStructure()
+        stru.read(datafile("ni.cif"))
+        gen = PDFGenerator()
+        gen.setStructure(stru)
+        gen.scale.value = 1.5
+        r = numpy.arange(1, 10, 0.05)
+        pars = [gen.phase.lattice.a, gen.phase.Ni0.Uiso]
+        values = [[3.52, 0.005], [3.6, 0.005], [3.52, 0.008]]
+        yref = []
+        for a, uiso in values:
+            pars[0].value = a
+            pars[1].value = uiso
+            yref.append(gen(r))
+        pars[0].value = 3.52
+        pars[1].value = 0.005
+        y0 = gen(r)
+
+        for ncpu in (1, 2):
+            y = gen.calcBatch(values, pars, r, ncpu)
+            self.assertEqual((3, len(r)), y.shape)
+            self.assertTrue(numpy.allclose(yref, y))
+            self.assertEqual(3.52, pars[0].value)
+            self.assertTrue(numpy.allclose(y0, gen(r)))
+        self.assertRaises(ValueError, gen.calcBatch, [[1, 2, 3]], pars, r)
+
+        # A batch over other points does not leave a stale PDF.
+        r2 = numpy.arange(2, 6, 0.05)
+        gen.calcBatch(values, pars, r2, 1)
+        y2 = gen(r2)
+        self.assertEqual(len(r2), len(y2))
+        self.assertTrue(numpy.allclose(numpy.interp(r2, r, y0), y2))
+        return
+
+    def testRemoteMetaData(self):
+        """Check that worker processes ignore the PDFFit metadata."""
+        from diffpy.Structure import PDFFitStructure
+        from diffpy.srfit.util.workerpool import getWorkerPool
+        stru = PDFFitStructure()
+        stru.read(datafile("ni.cif"))
+        stru.pdffit["scale"] = 0.5
+        stru.pdffit["delta2"] = 3.0
+        gen = PDFGenerator()
+        gen.setStructure(stru)
+        r = numpy.arange(1, 10, 0.05)
+        y0 = gen(r)
+        a = gen.phase.lattice.a
+        y = gen.calcBatch([[a.value]], [a], r, ncpu = 2)
+        self.assertTrue(numpy.allclose(y0, y[0]))
+        gen2 = PDFGenerator()
+        gen2.setPhase(gen.phase)
+        gen2._evalpool = getWorkerPool(2)
+        self.assertTrue(numpy.allclose(y0, gen2(r)))
+        return
+
+
+class TestPairPDFGenerator(testoptional(TestCaseStructure, TestCasePDF)):
+
+    def setUp(self):
+        global PairPDFGenerator
+        from diffpy.srfit.pdf import PairPDFGenerator
+
+    def testGenerator(self):
+        """Check the PDF against the SrReal PDFCalculator."""
+        from diffpy.Structure import PDFFitStructure
+        from diffpy.srreal.pdfcalculator import PDFCalculator
+        stru = PDFFitStructure()
+        stru.read(datafile("ni.cif"))
+        for i in range(4):
+            stru[i].Bisoequiv = 1
+        gen = PairPDFGenerator()
+        gen.setStructure(stru)
+        r = numpy.arange(1, 10, 0.01)
+        y = gen(r)
+
+        calc = PDFCalculator()
+        calc.rstep = r[1] - r[0]
+        calc.rmin = r[0]
+        calc.rmax = r[-1] + 0.5 * calc.rstep
+        calc.eval(stru)
+        yref = calc.pdf
+        diff = y - yref
+        self.assertTrue(numpy.dot(diff, diff) < 1e-4 * numpy.dot(yref, yref))
+        self.assertRaises(TypeError, gen.setPhase, None)
+        return
+
+    def testPairReuse(self):
+        """Check that the pair list survives non-geometric changes."""
+        from diffpy.Structure import PDFFitStructure
+        stru = PDFFitStructure()
+        stru.read(datafile("ni.cif"))
+        gen1 = PairPDFGenerator("pdf1")
+        gen1.setStructure(stru)
+        gen2 = PairPDFGenerator("pdf2")
+        gen2.setPhase(gen1.phase)
+        self.assertTrue(gen1._calc.pairs is gen2._calc.pairs)
+        r = numpy.arange(1, 10, 0.01)
+        y = gen1(r)
+        pairs = gen1._calc.pairs.pairlist
+
+        gen1.phase.Ni0.Uiso.value = 0.008
+        gen1.phase.Ni0.occ.value = 0.9
+        y2 = gen1(r)
+        self.assertTrue(gen1._calc.pairs.pairlist is pairs)
+        self.assertFalse(numpy.allclose(y, y2))
+
+        gen1.phase.lattice.a.value = 3.6
+        y3 = gen1(r)
+        self.assertFalse(gen1._calc.pairs.pairlist is pairs)
+        self.assertTrue(numpy.allclose(y3, gen2(r)))
+        return
+
+    def testIncremental(self):
+        """Check the update of the pair list for moved atoms."""
+        from diffpy.Structure import PDFFitStructure
+        from diffpy.srfit.pdf.pairpdfcalculator import PairPDFCalculator
+        stru = PDFFitStructure()
+        stru.read(datafile("ni.cif"))
+        gen = PairPDFGenerator()
+        gen.setStructure(stru)
+        r = numpy.arange(1, 10, 0.01)
+        y = gen(r)
+        pairs = gen._calc.pairs.pairlist
+
+        gen.phase.Ni0.x.value = 0.02
+        y2 = gen(r)
+        self.assertTrue(gen._calc.pairs.pairlist is pairs)
+        self.assertFalse(numpy.allclose(y, y2))
+
+        # Compare with a calculation from scratch
+        calc = PairPDFCalculator()
+        for name in ("rmin", "rmax", "rstep", "qmax"):
+            setattr(calc, name, getattr(gen._calc, name))
+        r3, y3 = calc(gen.phase.stru)
+        self.assertTrue(numpy.allclose(y2, numpy.interp(r, r3, y3)))
+        return
+
+    def testMultiRadiation(self):
+        """Check that x-ray and neutron generators share the partials."""
+        from diffpy.Structure import PDFFitStructure
+        stru = PDFFitStructure()
+        stru.read(datafile("ni.cif"))
+        stru[0].element = "Cu"
+        genx = PairPDFGenerator("x")
+        genx.setStructure(stru)
+        genn = PairPDFGenerator("n")
+        genn.setPhase(genx.phase)
+        genn.setScatteringType("N")
+        r = numpy.arange(1, 10, 0.01)
+        yx = genx(r)
+        yn = genn(r)
+        pairs = genx._calc.pairs
+        self.assertEqual(1, len(pairs._partials))
+        self.assertFalse(numpy.allclose(yx, yn))
+
+        # Different peak widths only share the peaks.
+        genn.qbroad.value = 0.02
+        yn = genn(r)
+        self.assertEqual(1, len(pairs._peaks))
+        self.assertEqual(2, len(pairs._partials))
+
+        # The shared results match separate calculations.
+        for gen, y in [(genx, yx), (genn, yn)]:
+            calc = gen._calc
+            calc.pairs = type(pairs)()
+            self.assertTrue(numpy.allclose(y, gen._evalCalculator()[1]))
+            calc.pairs = pairs
+        return
+
+    def testHistogram(self):
+        """Check the pair histogram against the pair list."""
+        from diffpy.Structure import PDFFitStructure
+        from diffpy.srfit.pdf.pairlist import PairList, PairHistogram
+        stru = PDFFitStructure()
+        stru.read(datafile("ni.cif"))
+        xyz = numpy.dot(stru.xyz, stru.lattice.base)
+        types = numpy.array([0, 1, 0, 1])
+        pairs = PairList(xyz, stru.lattice.base, 8.0)
+        hist = PairHistogram(xyz, types, stru.lattice.base, 8.0, 0.01)
+        self.assertEqual(len(pairs), hist.counts.sum())
+        for a in range(2):
+            for b in range(2):
+                sel = (types[pairs.i] == a) & (types[pairs.j] == b)
+                self.assertEqual(sel.sum(), hist.counts[a, b].sum())
+                nz = hist.counts[a, b] > 0
+                self.assertTrue(numpy.allclose(
+                    numpy.unique(pairs.d[sel].round(6)),
+                    hist.distances[a, b, nz]))
+
+        # The histogram PDF of a particle matches the exact one.
+        stru.lattice.setLatPar(1, 1, 1, 90, 90, 90)
+        stru.xyz = xyz[:, :]
+        gen = PairPDFGenerator()
+        gen.setStructure(stru, periodic = False)
+        r = numpy.arange(1, 8, 0.01)
+        y = gen(r)
+        gen.setBinWidth(0.005)
+        self.assertEqual(0.005, gen.getBinWidth())
+        self.assertTrue(numpy.allclose(y, gen(r)))
+        self.assertTrue(gen._calc.pairs.histogram is not None)
+        return
+
+class TestStructurePairs(testoptional(TestCaseStructure, TestCasePDF)):
+
+    def setUp(self):
+        from diffpy.Structure import Atom, Lattice, Structure
+        atoms = [Atom("Ni", xyz = [0, 0, 0]), Atom("Ni", xyz = [.5, .5, 0]),
+                Atom("O", xyz = [.5, 0, 0])]
+        self.stru = Structure(atoms, Lattice(4, 4, 4, 90, 90, 90))
+        return
+
+    def testWatch(self):
+        """Check that watching a structure does not create its Parameters."""
+        from diffpy.srfit.pdf.pairpdfcalculator import StructurePairs
+        from diffpy.srfit.structure.diffpyparset import DiffpyStructureParSet
+        phase = DiffpyStructureParSet("phase", self.stru)
+        pairs = StructurePairs()
+        pairs.watch(phase)
+        for atom in phase.getScatterers():
+            self.assertFalse(atom._materialized)
+
+        # The Parameters of an atom are watched once they are created.
+        phase.Ni1.x.value = 0.4
+        self.assertEqual(set([1]), pairs._moved)
+        self.assertFalse(phase.O0._materialized)
+        pairs.pairlist = "pairs"
+        phase.O0.Uiso.value = 0.01
+        self.assertEqual("pairs", pairs.pairlist)
+        phase.lattice.a.value = 4.1
+        self.assertTrue(pairs.pairlist is None)
+        return
+
+    def testWatchArrays(self):
+        """Check the watching of a DiffpyStructureArrayParSet."""
+        from diffpy.srfit.pdf.pairpdfcalculator import StructurePairs
+        from diffpy.srfit.structure.diffpyarrayparset import \
+                DiffpyStructureArrayParSet
+        phase = DiffpyStructureArrayParSet("phase", self.stru)
+        pairs = StructurePairs()
+        pairs.watch(phase)
+        self.assertEqual({}, phase._views)
+        pairs.pairlist = "pairs"
+        phase.xyz.value = phase.xyz.value + 0.01
+        self.assertTrue(pairs.pairlist is None)
+
+        # An atom is watched once it is created. Its moves change the xyz
+        # array as well.
+        pairs.pairlist = "pairs"
+        phase.O0.z.value = 0.2
+        self.assertTrue(pairs.pairlist is None)
+        self.assertEqual([2], phase._views.keys())
+        self.assertEqual(2, pairs._atomindex[id(phase.O0.z)])
+        return
+
+
+class TestPDFContribution(testoptional(TestCaseStructure, TestCasePDF)):
+
+    def setUp(self):
+        global PDFContribution
+        from diffpy.srfit.pdf import PDFContribution
+
+    def testParallelPhases(self):
+        """Check the concurrent evaluation of the phases."""
+        from diffpy.Structure import PDFFitStructure
+        con = PDFContribution("pdf")
+        r = numpy.arange(1, 10, 0.05)
+        con.profile.setObservedProfile(r, numpy.zeros_like(r))
+        phases = []
+        for i in range(3):
+            stru = PDFFitStructure()
+            stru.read(datafile("ni.cif"))
+            stru.lattice.setLatPar(3.5 + 0.1 * i, 3.5 + 0.1 * i,
+                    3.5 + 0.1 * i)
+            phases.append(con.addStructure("phase%i" % i, stru))
+        y0 = con.evaluate()
+
+        for processes in (False, True):
+            con.parallelPhases(3, processes)
+            for p in phases:
+                p.lattice.a.value *= 1.01
+            y1 = con.evaluate()
+            for p in phases:
+                p.lattice.a.value /= 1.01
+            self.assertFalse(numpy.allclose(y0, y1))
+            self.assertTrue(numpy.allclose(y0, con.evaluate()))
+        con.parallelPhases(1)
+        self.assertTrue(con._threadpool is None)
+        self.assertTrue(con.phase0._evalpool is None)
+        return
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -19,6 +19,8 @@ import unittest
 from numpy import array, arange, array_equal, ones_like
 
 from diffpy.srfit.fitbase.profile import Profile
+from diffpy.srfit.fitbase.profileparser import ProfileParser
+from diffpy.srfit.fitbase.profilestream import ProfileStream
 from diffpy.srfit.tests.utils import datafile
 
 
@@ -192,5 +194,62 @@ class TestProfile(unittest.TestCase):
         return
 
 
+class _ColumnParser(ProfileParser):
+    """Parser for the x, y, dx, dy columns of testdata.txt."""
+
+    def parseString(self, patstring):
+        from numpy import loadtxt
+        from StringIO import StringIO
+        x, y, dx, dy = loadtxt(StringIO(patstring), unpack = True)
+        self._banks.append([x, y, dx, dy])
+        return
+
+
+class TestProfileStream(unittest.TestCase):
+
+    def setUp(self):
+        self.profile = Profile()
+        self.sources = [datafile("testdata.txt")] * 5
+        return
+
+    def _checkStream(self, stream):
+        prof = self.profile
+        loaded = []
+        for source in stream:
+            loaded.append(source)
+            self.assertEqual(source, prof.meta["filename"])
+            self.assertAlmostEqual(1e-2, prof.x[0])
+            self.assertAlmostEqual(1.105784e-1, prof.y[0])
+            self.assertAlmostEqual(1.802192e-3, prof.dy[0])
+            self.assertTrue(len(stream._pending) <= stream.prefetch)
+        self.assertEqual(self.sources, loaded)
+        self.assertTrue(stream._pool is None)
+        return
+
+    def testThreads(self):
+        """Test parsing in background threads."""
+        stream = ProfileStream(self.profile, self.sources, _ColumnParser,
+                prefetch = 2)
+        self._checkStream(stream)
+        return
+
+    def testProcesses(self):
+        """Test parsing in worker processes."""
+        stream = ProfileStream(self.profile, self.sources, _ColumnParser,
+                prefetch = 3, processes = True)
+        self._checkStream(stream)
+        return
+
+    def testErrors(self):
+        """Test error handling."""
+        self.assertRaises(ValueError, ProfileStream, self.profile,
+                self.sources, _ColumnParser, prefetch = 0)
+        stream = ProfileStream(self.profile, ["nonexistent.txt"],
+                _ColumnParser)
+        self.assertRaises(IOError, list, stream)
+        self.assertTrue(stream._pool is None)
+        return
+
+
 if __name__ == "__main__":
     unittest.main()
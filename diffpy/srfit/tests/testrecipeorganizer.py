@@ -445,6 +445,25 @@ class TestRecipeOrganizer(unittest.TestCase):
 
         return
 
+    def testRegisterMemoizedFunction(self):
+        """Test registering a function with cached results."""
+        calls = []
+        def g(A, x):
+            calls.append(A)
+            return A * x
+
+        eq = self.m.registerFunction(g, "g", memoize = True)
+        x = numpy.arange(0.5, 10, 0.5)
+        self.m.x.setValue(x)
+        self.m.A.setValue(2.0)
+        self.assertTrue(numpy.array_equal(2 * x, eq()))
+        self.m.A.setValue(3.0)
+        eq()
+        self.m.A.setValue(2.0)
+        self.assertTrue(numpy.array_equal(2 * x, eq()))
+        self.assertEqual([2.0, 3.0], calls)
+        return
+
     def testRegisterStringFunction(self):
         """Test registering string functions in various ways."""
 
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+##############################################################################
+#
+# diffpy.srfit      by DANSE Diffraction group
+#                   Simon J. L. Billinge
+#                   (c) 2010 The Trustees of Columbia University
+#                   in the City of New York.  All rights reserved.
+#
+# See AUTHORS.txt for a list of people who contributed.
+# See LICENSE_DANSE.txt for license information.
+#
+##############################################################################
+"""Tests for resultcache module."""
+
+import unittest
+
+import numpy
+
+from diffpy.srfit.util.resultcache import ResultCache, MemoizedFunction
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        # Room for three arrays of 10 doubles.
+        self.cache = ResultCache(maxbytes = 240)
+        return
+
+    def testGetPut(self):
+        """Test storing and retrieving values."""
+        cache = self.cache
+        self.assertTrue(cache.get("a") is None)
+        a = numpy.zeros(10)
+        cache.put("a", a)
+        self.assertTrue(cache.get("a") is a)
+        self.assertTrue("a" in cache)
+        self.assertRaises(ValueError, a.fill, 1)
+        xy = (numpy.zeros(5), numpy.ones(5))
+        cache.put("b", xy)
+        self.assertTrue(cache.get("b") is xy)
+        self.assertEqual(160, cache.nbytes)
+        stats = cache.getStats()
+        self.assertEqual(2, stats["hits"])
+        self.assertEqual(1, stats["misses"])
+        self.assertEqual(2, stats["size"])
+        cache.clear()
+        self.assertEqual(0, len(cache))
+        self.assertEqual(0, cache.nbytes)
+        self.assertEqual(0, cache.hits)
+        return
+
+    def testEviction(self):
+        """Test that the least recently used values are discarded."""
+        cache = self.cache
+        for key in "abc":
+            cache.put(key, numpy.zeros(10))
+        cache.get("a")
+        cache.put("d", numpy.zeros(10))
+        self.assertEqual(3, len(cache))
+        self.assertFalse("b" in cache)
+        self.assertTrue("a" in cache)
+        # Replacing a value does not count it twice.
+        cache.put("d", numpy.zeros(10))
+        self.assertEqual(240, cache.nbytes)
+        # Values above the bound are not cached.
+        cache.put("e", numpy.zeros(100))
+        self.assertFalse("e" in cache)
+        self.assertEqual(3, len(cache))
+        return
+
+    def testMemoizedFunction(self):
+        """Test caching the results of a function."""
+        calls = []
+        def f(r, a):
+            calls.append(a)
+            return a * r
+        mf = MemoizedFunction(f, self.cache)
+        r = numpy.arange(10.0)
+        self.assertTrue(numpy.array_equal(2 * r, mf(r, 2)))
+        self.assertTrue(mf(r, 2) is mf(r, 2))
+        self.assertEqual([2], calls)
+        mf(r, 3)
+        self.assertEqual([2, 3], calls)
+        # A new array is a new argument, even with equal values.
+        mf(r.copy(), 2)
+        self.assertEqual([2, 3, 2], calls)
+        # Unhashable arguments are passed through.
+        self.assertEqual([1, 1], mf([1], 2))
+        self.assertEqual(4, len(calls))
+        return
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+##############################################################################
+#
+# diffpy.srfit      by DANSE Diffraction group
+#                   Simon J. L. Billinge
+#                   (c) 2010 The Trustees of Columbia University
+#                   in the City of New York.  All rights reserved.
+#
+# See AUTHORS.txt for a list of people who contributed.
+# See LICENSE_DANSE.txt for license information.
+#
+##############################################################################
+"""Tests for resultsstore module."""
+
+import unittest
+from cStringIO import StringIO
+
+from numpy import isnan, array_equal
+
+from diffpy.srfit.fitbase.resultsstore import ResultsStore
+from diffpy.srfit.fitbase.sequentialrefinement import SequentialRefinement
+from diffpy.srfit.tests.testsequentialrefinement import _makeRecipe
+from diffpy.srfit.tests.testsequentialrefinement import _makeSeries
+
+
+class TestResultsStore(unittest.TestCase):
+
+    def setUp(self):
+        self.recipe = _makeRecipe()
+        self.store = ResultsStore(storeycalc = True)
+        seq = SequentialRefinement(self.recipe, store = self.store)
+        series = _makeSeries([100, 200, 300])
+        seq.refine(series[:2], ["a", "b"])
+        self.recipe.fix("sigma")
+        seq.refine(series[2:], ["c"])
+        return
+
+    def testColumns(self):
+        """Test the columnar queries."""
+        store = self.store
+        self.assertEqual(3, len(store))
+        self.assertEqual(["A", "x0", "sigma"], store.varnames)
+        sigma, dsigma = store.getColumn("sigma")
+        self.assertFalse(isnan(sigma[:2]).any())
+        self.assertTrue(isnan(sigma[2]))
+        self.assertTrue(isnan(dsigma[2]))
+        names, vals, unc = store.getRow(2)
+        self.assertEqual(["A", "x0"], names)
+        self.assertEqual(2, len(vals))
+        names, cov = store.getCovariance(0)
+        self.assertEqual((3, 3), cov.shape)
+        names, cov = store.getCovariance(2)
+        self.assertEqual((2, 2), cov.shape)
+        x, ycalc = store.getProfile(1, "g")
+        self.assertEqual(len(x), len(ycalc))
+        self.assertRaises(KeyError, store.getProfile, 1, "h")
+        return
+
+    def testSaveLoad(self):
+        """Test saving and loading the store."""
+        store = self.store
+        stream = StringIO()
+        store.save(stream)
+        stream.seek(0)
+        store2 = ResultsStore.load(stream)
+        self.assertEqual(len(store), len(store2))
+        self.assertEqual(store.labels, store2.labels)
+        self.assertEqual(store.varnames, store2.varnames)
+        self.assertEqual(store.chi2, store2.chi2)
+        self.assertEqual(store.rw, store2.rw)
+        self.assertEqual(store.converged, store2.converged)
+        for name in store.varnames:
+            vals, unc = store.getColumn(name)
+            vals2, unc2 = store2.getColumn(name)
+            self.assertTrue(array_equal(isnan(vals), isnan(vals2)))
+            self.assertTrue(array_equal(vals[~isnan(vals)],
+                vals2[~isnan(vals2)]))
+        for k in range(len(store)):
+            self.assertTrue(array_equal(store.getCovariance(k)[1],
+                store2.getCovariance(k)[1]))
+            x, y = store.getProfile(k, "g")
+            x2, y2 = store2.getProfile(k, "g")
+            self.assertTrue(array_equal(y, y2))
+        # Loaded stores can be appended to.
+        store2.extend(store)
+        self.assertEqual(6, len(store2))
+        return
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -137,6 +137,196 @@ class TestSASGenerator(TestCaseSaS):
         self.assertAlmostEqual(0, res)
         return
 
+    def testCache(self):
+        """Check that scale and background changes reuse the intensity."""
+        from sans.models.EllipsoidModel import EllipsoidModel
+        model = EllipsoidModel()
+        gen = sas.SASGenerator("ellipsoid", model)
+        q = numpy.arange(0.01, 0.5, 0.01)
+        y = gen(q)
+        gen.scale.value = 2.5
+        gen.background.value = 0.1
+        y2 = gen(q)
+        self.assertTrue(numpy.allclose(model.evalDistribution(q), y2))
+        self.assertTrue(numpy.allclose(2.5 * y + 0.1, y2))
+        stats = gen.getCacheStats()
+        self.assertEqual(1, stats["hits"])
+        self.assertEqual(1, stats["size"])
+        self.assertEqual(2.5, model.getParam("scale"))
+
+        # Shape changes are calculated.
+        gen.radius_a.value *= 1.1
+        y3 = gen(q)
+        self.assertTrue(numpy.allclose(model.evalDistribution(q), y3))
+        self.assertEqual(2, gen.getCacheStats()["size"])
+        gen.setCache(None)
+        self.assertTrue(gen.getCacheStats() is None)
+        self.assertTrue(numpy.allclose(y3, gen(q)))
+        return
+
+    def testResolution(self):
+        """Check the smearing of the intensity."""
+        from sans.models.SphereModel import SphereModel
+        model = SphereModel()
+        model.setParam("radius", 60)
+        model.setParam("background", 0.1)
+        gen = sas.SASGenerator("sphere", model)
+        q = numpy.arange(0.01, 0.3, 0.002)
+        y = gen(q)
+        dq = 0.05 * q
+        res = sas.SASResolution(dq, oversampling = 40)
+        gen.setResolution(res)
+        self.assertTrue(res is gen.getResolution())
+        ys = gen(q)
+        # Compare with the direct average over the Gaussian.
+        t = numpy.linspace(-3, 3, 241)
+        w = numpy.exp(-0.5 * t**2)
+        yref = [numpy.dot(w, model.evalDistribution(x + dx * t)) / w.sum()
+                for x, dx in zip(q, dq)]
+        self.assertTrue(numpy.allclose(yref, ys, rtol = 1e-3))
+        self.assertFalse(numpy.allclose(y, ys, rtol = 1e-3))
+        gen.setResolution(None)
+        self.assertTrue(numpy.allclose(y, gen(q)))
+        return
+
+
+class TestPrCalculator(TestCaseSaS):
+
+    def setUp(self):
+        global sas
+        import diffpy.srfit.sas as sas
+
+
+    def testCalculator(self):
+        """Check that the inversion is reused for unchanged input."""
+        from sans.models.SphereModel import SphereModel
+        model = SphereModel()
+        model.setParam("radius", 20)
+        q = numpy.arange(0.01, 0.5, 0.005)
+        iq = model.evalDistribution(q)
+        calc = sas.PrCalculator("pr")
+        calc.q.value = q
+        calc.iq.value = iq
+        r = numpy.arange(1, 40, 0.5)
+        pr = calc(r)
+
+        # P(r) agrees with the invertor.
+        c = calc._coeffs
+        prref = numpy.array([calc._invertor.pr(c, x) for x in r])
+        self.assertTrue(numpy.allclose(prref, pr))
+
+        # The unchanged input is not inverted again.
+        calc.scale.value = 2
+        self.assertTrue(numpy.allclose(2 * pr, calc(r)))
+        self.assertTrue(calc._coeffs is c)
+
+        # A change of the signal is inverted again.
+        calc.iq.value = 2 * iq
+        pr2 = calc(r)
+        self.assertFalse(calc._coeffs is c)
+        self.assertTrue(numpy.allclose(4 * pr, pr2, rtol = 1e-3,
+            atol = 1e-3 * abs(pr).max()))
+        return
+
+
+class TestSASResolution(unittest.TestCase):
+
+    def setUp(self):
+        from diffpy.srfit.sas.sasresolution import SASResolution
+        self.SASResolution = SASResolution
+        self.q = numpy.arange(0.005, 0.5, 0.005)
+        return
+
+    def iq(self, q):
+        """Intensity of a sphere of radius 50."""
+        x = 50 * q
+        return (3 * (numpy.sin(x) - x * numpy.cos(x)) / x**3)**2
+
+    def testGaussian(self):
+        """Compare the Gaussian smearing with direct sampling."""
+        q = self.q
+        dq = 0.004 + 0.02 * q
+        res = self.SASResolution(dq)
+        qeval, matrix = res.getGrid(q)
+        self.assertEqual((len(q), len(qeval)), matrix.shape)
+        self.assertTrue(numpy.allclose(1, matrix.sum(axis = 1)))
+        ys = res.smear(q, self.iq(qeval))
+        rows, qs, ws = res._getSamples(q)
+        yref = numpy.bincount(rows, ws * self.iq(qs), len(q))
+        self.assertTrue(numpy.allclose(yref, ys, rtol = 5e-3))
+        # The grid is reused.
+        self.assertTrue(matrix is res.getGrid(q)[1])
+        res.dq = 2 * dq
+        self.assertFalse(matrix is res.getGrid(q)[1])
+        return
+
+    def testSlit(self):
+        """Compare the slit smearing with direct sampling."""
+        q = self.q
+        res = self.SASResolution(slitlength = 0.02, qobs = q)
+        qeval, matrix = res.getGrid(q[10:])
+        ys = matrix.dot(self.iq(qeval))
+        u = numpy.linspace(0, 0.02, 2001)
+        yref = [self.iq(numpy.sqrt(x**2 + u**2)).mean() for x in q[10:]]
+        # The minima of the sphere are barely smeared, so compare with the
+        # envelope of the intensity.
+        envelope = 4.5 / (50 * q[10:])**4
+        self.assertTrue(numpy.allclose(yref, ys, rtol = 5e-3,
+            atol = 1e-3 * envelope))
+        return
+
+    def testNarrow(self):
+        """Check that a narrow resolution does not change the intensity."""
+        q = self.q
+        res = self.SASResolution(1e-8 * q, 1e-8)
+        qeval, matrix = res.getGrid(q)
+        self.assertTrue(numpy.allclose(self.iq(q), matrix.dot(self.iq(qeval))))
+        return
+
+    def testProfile(self):
+        """Check the resolution of the data of a SASProfile."""
+        from diffpy.srfit.sas.sasprofile import SASProfile
+        class DataInfo(object):
+            def __init__(self, x, **kw):
+                self.x = x
+                self.y = numpy.ones_like(x)
+                self.dy = None
+                self.__dict__.update(kw)
+        q = self.q
+        profile = SASProfile(DataInfo(q, dx = 0.01 * q))
+        res = profile.getResolution()
+        self.assertTrue(numpy.array_equal(0.01 * q, res.dq))
+        self.assertTrue(res.slitlength is None)
+        self.assertTrue(res.qobs is q)
+
+        profile = SASProfile(DataInfo(q, dx = numpy.zeros_like(q),
+            dxl = 0.02))
+        res = profile.getResolution()
+        self.assertTrue(res.dq is None)
+        self.assertEqual(q.shape, res.slitlength.shape)
+        self.assertTrue(numpy.all(res.slitlength == 0.02))
+
+        profile = SASProfile(DataInfo(q, dx = None, dxl = []))
+        self.assertTrue(profile.getResolution() is None)
+        self.assertTrue(SASProfile(DataInfo(q)).getResolution() is None)
+        return
+
+
+class TestLazyImport(unittest.TestCase):
+
+    def testImport(self):
+        """Check that importing the sas package does not load sans."""
+        import os
+        import subprocess
+        import sys
+        code = ("import sys, diffpy.srfit.sas; "
+                "print sorted(m for m in sys.modules if m.startswith('sans'))")
+        env = dict(os.environ, PYTHONPATH = os.pathsep.join(sys.path))
+        out = subprocess.Popen([sys.executable, "-c", code],
+                stdout = subprocess.PIPE, env = env).communicate()[0]
+        self.assertEqual("[]", out.strip())
+        return
+
 
 if __name__ == "__main__":
     unittest.main()
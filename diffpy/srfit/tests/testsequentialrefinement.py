@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+##############################################################################
+#
+# diffpy.srfit      by DANSE Diffraction group
+#                   Simon J. L. Billinge
+#                   (c) 2010 The Trustees of Columbia University
+#                   in the City of New York.  All rights reserved.
+#
+# See AUTHORS.txt for a list of people who contributed.
+# See LICENSE_DANSE.txt for license information.
+#
+##############################################################################
+"""Tests for sequentialrefinement module."""
+
+import unittest
+
+from numpy import linspace, exp, array, isnan
+
+from diffpy.srfit.fitbase.fitrecipe import FitRecipe
+from diffpy.srfit.fitbase.fitcontribution import FitContribution
+from diffpy.srfit.fitbase.profile import Profile
+from diffpy.srfit.fitbase.sequentialrefinement import SequentialRefinement
+
+
+def _makeRecipe():
+    """Make a recipe that fits a gaussian."""
+    profile = Profile()
+    contribution = FitContribution("g")
+    contribution.setProfile(profile)
+    contribution.setEquation("A * exp(-0.5*(x-x0)**2/sigma**2)")
+    recipe = FitRecipe()
+    recipe.clearFitHooks()
+    recipe.addContribution(contribution)
+    recipe.addVar(contribution.A, 1)
+    recipe.addVar(contribution.x0, 5)
+    recipe.addVar(contribution.sigma, 1)
+    return recipe
+
+def _makeSeries(temperatures):
+    """Make a series of gaussians with a drifting center."""
+    x = linspace(0, 10, 101)
+    series = []
+    for t in temperatures:
+        x0 = 5 + 0.002 * t
+        y = 2 * exp(-0.5*(x-x0)**2 / 0.5**2)
+        series.append((x, y))
+    return series
+
+
+class TestSequentialRefinement(unittest.TestCase):
+
+    def setUp(self):
+        self.temperatures = [100, 150, 200, 250, 300]
+        self.series = _makeSeries(self.temperatures)
+        return
+
+    def _checkStore(self, store):
+        self.assertEqual(len(self.series), len(store))
+        self.assertEqual(self.temperatures, store.labels)
+        self.assertTrue(all(store.converged))
+        x0, dx0 = store.getColumn("x0")
+        self.assertEqual(len(self.series), len(x0))
+        xref = 5 + 0.002 * array(self.temperatures)
+        for a, b in zip(xref, x0):
+            self.assertAlmostEqual(a, b, 5)
+        A, dA = store.getColumn("A")
+        for a in A:
+            self.assertAlmostEqual(2, a, 5)
+        self.assertRaises(KeyError, store.getColumn, "B")
+        return
+
+    def testRefine(self):
+        """Test refinement with the warm-start strategies."""
+        for warmstart in SequentialRefinement.warmstarts:
+            seq = SequentialRefinement(_makeRecipe(), warmstart = warmstart)
+            store = seq.refine(self.series, self.temperatures)
+            self.assertTrue(store is seq.store)
+            self._checkStore(store)
+        self.assertRaises(ValueError, SequentialRefinement, _makeRecipe(),
+                warmstart = "nope")
+        return
+
+    def testStartValues(self):
+        """Test the extrapolated starting values."""
+        seq = SequentialRefinement(_makeRecipe(), warmstart = "extrapolate")
+        initial = array([1.0])
+        self.assertEqual(initial, seq._startValues(initial, [], 10))
+        history = [(10, array([1.0]))]
+        self.assertEqual(1.0, seq._startValues(initial, history, 20))
+        history.append((20, array([2.0])))
+        self.assertAlmostEqual(4.0, seq._startValues(initial, history, 40))
+        history = [("a", array([1.0])), ("b", array([2.0]))]
+        self.assertAlmostEqual(3.0, seq._startValues(initial, history, "c"))
+        return
+
+    def testFixedVariable(self):
+        """Test that unrefined variables get NaN entries."""
+        recipe = _makeRecipe()
+        seq = SequentialRefinement(recipe)
+        seq.refine(self.series[:2])
+        recipe.fix("sigma")
+        seq.refine(self.series[2:])
+        sigma, dsigma = seq.store.getColumn("sigma")
+        self.assertFalse(isnan(sigma[:2]).any())
+        self.assertTrue(isnan(sigma[2:]).all())
+        return
+
+    def testRefineChunks(self):
+        """Test refinement of chunks in worker processes."""
+        seq = SequentialRefinement(_makeRecipe())
+        store = seq.refineChunks(_makeRecipe, self.series, 2,
+                self.temperatures)
+        self._checkStore(store)
+        return
+
+
+if __name__ == "__main__":
+    unittest.main()
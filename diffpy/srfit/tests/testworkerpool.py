@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+##############################################################################
+#
+# diffpy.srfit      by DANSE Diffraction group
+#                   Simon J. L. Billinge
+#                   (c) 2010 The Trustees of Columbia University
+#                   in the City of New York.  All rights reserved.
+#
+# See AUTHORS.txt for a list of people who contributed.
+# See LICENSE_DANSE.txt for license information.
+#
+##############################################################################
+"""Tests for workerpool module."""
+
+import unittest
+import multiprocessing
+
+from diffpy.srfit.util.workerpool import WorkerPool
+from diffpy.srfit.util.workerpool import getWorkerPool, closeWorkerPool
+
+
+def _square(x):
+    return x * x
+
+
+class TestWorkerPool(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = WorkerPool(2)
+        return
+
+    def tearDown(self):
+        self.pool.close()
+        closeWorkerPool()
+        return
+
+    def testMap(self):
+        """Test mapping in the workers."""
+        pool = self.pool
+        ncpu = multiprocessing.cpu_count()
+        self.assertEqual(min(2, ncpu), pool.size)
+        self.assertEqual([0, 1, 4], pool.map(_square, range(3)))
+        self.assertEqual(9, pool.apply(_square, (3,)))
+        self.assertEqual([0, 1, 4],
+                sorted(pool.imap_unordered(_square, range(3))))
+        # The pool is reused.
+        self.assertTrue(pool.getPool() is pool.getPool())
+        self.assertEqual(ncpu, WorkerPool(ncpu + 10).size)
+        return
+
+    def testRebuild(self):
+        """Test that the pool is rebuilt after a worker dies."""
+        pool = self.pool
+        mppool = pool.getPool()
+        worker = mppool._pool[0]
+        worker.terminate()
+        worker.join()
+        self.assertFalse(pool.getPool() is mppool)
+        self.assertEqual([0, 1, 4], pool.map(_square, range(3)))
+        pool.close()
+        self.assertTrue(pool._pool is None)
+        with WorkerPool(1) as pool2:
+            self.assertEqual([4], pool2.map(_square, [2]))
+        self.assertTrue(pool2._pool is None)
+        return
+
+    def testCloseBroken(self):
+        """Test closing the pool after a worker died."""
+        pool = self.pool
+        self.assertEqual([0, 1, 4], pool.map(_square, range(3)))
+        # The idle workers wait for tasks holding the lock of the queue.
+        worker = pool.getPool()._pool[0]
+        worker.terminate()
+        worker.join()
+        pool.close()
+        self.assertTrue(pool._pool is None)
+        return
+
+    def testThreads(self):
+        """Test using the pool from several threads."""
+        from multiprocessing.pool import ThreadPool
+        pool = self.pool
+        threads = ThreadPool(4)
+        try:
+            results = threads.map(lambda x: pool.apply(_square, (x,)),
+                    range(8))
+        finally:
+            threads.close()
+            threads.join()
+        self.assertEqual([x * x for x in range(8)], results)
+        return
+
+    def testShared(self):
+        """Test the shared pool."""
+        pool = getWorkerPool(1)
+        self.assertTrue(pool is getWorkerPool())
+        self.assertTrue(pool is getWorkerPool(2))
+        self.assertEqual(min(2, multiprocessing.cpu_count()), pool.size)
+        self.assertEqual([9], pool.map(_square, [3]))
+        return
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -11,7 +11,10 @@
 # Derived from pyre-1.0/packages/pyre/patterns/Observable.py
 # See pyre-1.0 for full copyright and license information
 
-__all__ = ["Observable"]
+__all__ = ["Observable", "batchNotifications"]
+
+import threading
+from contextlib import contextmanager
 
 class Observable(object):
     """
@@ -39,6 +42,25 @@ class Observable(object):
     def notify(self):
         """
         Notify all observers
+
+        Within batchNotifications, the observers are notified once when the batch ends.
+        """
+        batch = getattr(_local, "batch", None)
+        if batch is not None:
+            if id(self) in batch.seen:
+                return
+            batch.seen[id(self)] = self
+            if batch.deferred:
+                batch.pending.append(self)
+                return
+
+        self._notifyObservers()
+        return
+
+
+    def _notifyObservers(self):
+        """
+        Invoke the observers
         """
         # build a list before notification, just in case the observer's callback behavior
         # involves removing itself from our callback set
@@ -76,4 +98,54 @@ class Observable(object):
     _observers = None
 
 
+# The notifications of a thread are merged while it runs batchNotifications.
+_local = threading.local()
+
+
+class _Batch(object):
+    """
+    State of batchNotifications
+
+    deferred    --  Flag indicating that the changes are still being made
+    pending     --  The objects that notified while the changes were made, in order
+    seen        --  The objects that notified in this batch, indexed by id
+    """
+
+    def __init__(self):
+        self.deferred = True
+        self.pending = []
+        self.seen = {}
+        return
+
+
+@contextmanager
+def batchNotifications():
+    """
+    Merge the notifications of a block of changes
+
+    Within the block, notify only records the objects that changed. When the block ends, each
+    of them notifies its observers once, and every observer that passes the notification on
+    notifies its own observers only once as well. Observers thus see the final state, and a
+    container of several changed objects is invalidated once instead of once per object.
+    Nested blocks are merged into the outermost one.
+    """
+    if getattr(_local, "batch", None) is not None:
+        yield
+        return
+
+    batch = _local.batch = _Batch()
+    try:
+        yield
+    finally:
+        # the changes that were made are announced even if the block failed
+        try:
+            batch.deferred = False
+            for observable in batch.pending:
+                observable._notifyObservers()
+        finally:
+            _local.batch = None
+
+    return
+
+
 # end of file
@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+########################################################################
+#
+# diffpy.srfit      by DANSE Diffraction group
+#                   Simon J. L. Billinge
+#                   (c) 2010 The Trustees of Columbia University
+#                   in the City of New York.  All rights reserved.
+#
+# See AUTHORS.txt for a list of people who contributed.
+# See LICENSE_DANSE.txt for license information.
+#
+########################################################################
+"""ResultCache and MemoizedFunction classes.
+
+The ResultCache class is a least-recently-used cache of calculated arrays with
+a bound on the memory they use. It can be shared by several generators that
+compute the same quantity, for example PDF generators that share a phase.
+A ResultCache can be used from several threads.
+
+The MemoizedFunction class wraps a pure function, such as the characteristic
+functions of diffpy.srfit.pdf.characteristicfunctions, so that its results
+are kept in a ResultCache. See RecipeOrganizer.registerFunction.
+
+"""
+__all__ = ["ResultCache", "MemoizedFunction"]
+
+from itertools import count
+from threading import Lock
+from weakref import ref
+
+import numpy
+
+from diffpy.srfit.util.ordereddict import OrderedDict
+
+class ResultCache(object):
+    """Least-recently-used cache of calculation results.
+
+    The cached values are numpy arrays or tuples of numpy arrays. The cached
+    arrays are made read-only, since they are handed out without copying.
+
+    Attributes
+    maxbytes    --  The maximum number of bytes held by the cached arrays.
+                    The least recently used values are discarded to stay
+                    within this bound.
+    nbytes      --  The number of bytes held by the cached arrays.
+    hits        --  The number of successful lookups.
+    misses      --  The number of failed lookups.
+    _items      --  OrderedDict of (value, nbytes) pairs indexed by key, from
+                    the least to the most recently used.
+    _lock       --  Lock that serializes the changes of _items.
+
+    """
+
+    def __init__(self, maxbytes = 64 * 2**20):
+        """Initialize the attributes.
+
+        maxbytes    --  The maximum number of bytes held by the cached arrays
+                        (default 64 MiB).
+
+        """
+        self.maxbytes = maxbytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = Lock()
+        return
+
+    def __len__(self):
+        """Get the number of cached values."""
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key):
+        """Get a cached value.
+
+        key --  A hashable key.
+
+        Returns the value, or None if there is no value for key.
+
+        """
+        with self._lock:
+            item = self._items.pop(key, None)
+            if item is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            # Reinsert so that the item becomes the most recently used one.
+            self._items[key] = item
+        return item[0]
+
+    def put(self, key, value):
+        """Cache a value.
+
+        key     --  A hashable key.
+        value   --  A numpy array or a tuple of numpy arrays. Values larger
+                    than maxbytes are not cached.
+
+        """
+        arrays = value if isinstance(value, tuple) else (value,)
+        nbytes = sum(a.nbytes for a in arrays)
+        with self._lock:
+            self._discard(key)
+            if nbytes > self.maxbytes:
+                return
+            for a in arrays:
+                a.setflags(write = False)
+            while self._items and self.nbytes + nbytes > self.maxbytes:
+                self._discard(iter(self._items).next())
+            self._items[key] = (value, nbytes)
+            self.nbytes += nbytes
+        return
+
+    def clear(self):
+        """Discard all cached values and reset the statistics."""
+        with self._lock:
+            self._items.clear()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        return
+
+    def getStats(self):
+        """Get the cache statistics.
+
+        Returns a dictionary with the hits, misses, the number of cached
+        values (size) and the number of bytes they hold (nbytes).
+
+        """
+        return {"hits" : self.hits, "misses" : self.misses,
+                "size" : len(self), "nbytes" : self.nbytes}
+
+    def _discard(self, key):
+        """Discard the value for key, if any."""
+        item = self._items.pop(key, None)
+        if item is not None:
+            self.nbytes -= item[1]
+        return
+
+# End class ResultCache
+
+# The cache of the MemoizedFunctions that are not given their own.
+_functioncache = ResultCache()
+# Tokens that identify functions and arrays in the cache keys.
+_newtoken = count().next
+
+class MemoizedFunction(object):
+    """Function wrapper that caches the results of a pure function.
+
+    The results are cached by the values of scalar arguments and by the
+    identity of array arguments. Hashing the contents of the arrays can take
+    as long as the calculation, so arrays passed to a MemoizedFunction must
+    not be changed in place. Only array results are cached. Calls with other
+    unhashable arguments are passed through.
+
+    Attributes
+    func    --  The wrapped function.
+    cache   --  The ResultCache of the results.
+    _token  --  Number that identifies the function in the cache keys.
+    _arrays --  Dictionary of (weakref, token) pairs of the array arguments,
+                indexed by the id of the array.
+
+    """
+
+    def __init__(self, func, cache = None):
+        """Wrap a function.
+
+        func    --  The function to wrap. Its result must only depend on its
+                    arguments.
+        cache   --  A ResultCache for the results, or None (default) to use a
+                    cache shared by all MemoizedFunctions.
+
+        """
+        self.func = func
+        self.cache = _functioncache if cache is None else cache
+        self._token = _newtoken()
+        self._arrays = {}
+        return
+
+    def __call__(self, *args):
+        """Get the result of the function for args."""
+        try:
+            key = (self._token,) + tuple([self._argKey(a) for a in args])
+            hash(key)
+        except TypeError:
+            return self.func(*args)
+        result = self.cache.get(key)
+        if result is None:
+            result = self.func(*args)
+            if isinstance(result, numpy.ndarray):
+                self.cache.put(key, result)
+        return result
+
+    def _argKey(self, arg):
+        """Get the key of an argument."""
+        if not isinstance(arg, numpy.ndarray):
+            return arg
+        if arg.ndim == 0:
+            return arg.item()
+        aid = id(arg)
+        item = self._arrays.get(aid)
+        if item is None or item[0]() is not arg:
+            # The id of a dead array can be reused, so tokens are only
+            # valid while their array lives.
+            arrays = self._arrays
+            def forget(r):
+                if arrays.get(aid, (None,))[0] is r:
+                    del arrays[aid]
+                return
+            item = (ref(arg, forget), _newtoken())
+            arrays[aid] = item
+        return ("array", item[1])
+
+# End class MemoizedFunction
+
+# End of file
@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+########################################################################
+#
+# diffpy.srfit      by DANSE Diffraction group
+#                   Simon J. L. Billinge
+#                   (c) 2010 The Trustees of Columbia University
+#                   in the City of New York.  All rights reserved.
+#
+# See AUTHORS.txt for a list of people who contributed.
+# See LICENSE_DANSE.txt for license information.
+#
+########################################################################
+"""WorkerPool class and the process-wide shared worker pool.
+
+A WorkerPool wraps a multiprocessing.Pool that is created when first needed,
+is never larger than the number of CPUs and is rebuilt when one of its worker
+processes dies. The pool returned by getWorkerPool is shared by all callers in
+the process, for example by all PDF generators that run in parallel mode, so
+that a recipe with several parallel generators does not fork a set of
+processes for each of them.
+
+> pool = getWorkerPool(4)
+> for result in pool.imap_unordered(func, tasks):
+>     ...
+> closeWorkerPool()
+
+"""
+__all__ = ["WorkerPool", "getWorkerPool", "closeWorkerPool"]
+
+import atexit
+import multiprocessing
+import threading
+from multiprocessing.pool import TERMINATE
+
+
+class WorkerPool(object):
+    """Lazily created, self-repairing pool of worker processes.
+
+    Attributes
+    size    --  The number of worker processes. This is capped at the number
+                of CPUs.
+    _pool   --  The multiprocessing.Pool, or None if it is not running.
+    _pids   --  The process ids of the workers of _pool when it was checked
+                last.
+    _lock   --  Lock that guards starting and stopping _pool, since the pool
+                can be used from several threads.
+
+    """
+
+    def __init__(self, size = None):
+        """Initialize the attributes.
+
+        size    --  The number of worker processes. If this is None (default),
+                    or larger than the number of CPUs, then the number of CPUs
+                    is used.
+
+        """
+        self.size = _capSize(size)
+        self._pool = None
+        self._pids = None
+        self._lock = threading.Lock()
+        return
+
+    def getPool(self):
+        """Get the running multiprocessing.Pool.
+
+        The pool is started if it is not running. It is rebuilt if any of its
+        workers died, since tasks handed to a dead worker are never finished.
+
+        """
+        with self._lock:
+            if self._pool is not None:
+                workers = self._pool._pool
+                pids = set(w.pid for w in workers)
+                alive = all(w.is_alive() for w in workers)
+                if not alive or pids != self._pids:
+                    _terminate(self._pool)
+                    self._pool = None
+            if self._pool is None:
+                self._pool = multiprocessing.Pool(self.size)
+                self._pids = set(w.pid for w in self._pool._pool)
+            return self._pool
+
+    def resize(self, size):
+        """Change the number of worker processes.
+
+        size    --  The new number of workers, capped at the number of CPUs.
+                    The running pool is closed after its pending tasks are
+                    done and a new one is started when next needed.
+
+        """
+        size = _capSize(size)
+        with self._lock:
+            if size == self.size:
+                return
+            self.size = size
+            if self._pool is not None:
+                self._pool.close()
+                self._pool.join()
+                self._pool = None
+        return
+
+    def apply(self, func, args = ()):
+        """Call func with args in a worker and return the result."""
+        return self.getPool().apply(func, args)
+
+    def map(self, func, iterable):
+        """Apply func to every item of iterable in the workers."""
+        return self.getPool().map(func, iterable)
+
+    def imap_unordered(self, func, iterable):
+        """Apply func to every item of iterable, yielding unordered results.
+        """
+        return self.getPool().imap_unordered(func, iterable)
+
+    def close(self):
+        """Stop the worker processes.
+
+        The pool is restarted if it is used again.
+
+        """
+        with self._lock:
+            if self._pool is not None:
+                _terminate(self._pool)
+                self._pool = None
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+# End class WorkerPool
+
+# The process-wide pool
+_sharedpool = None
+
+def getWorkerPool(size = None):
+    """Get the WorkerPool shared by the whole process.
+
+    size    --  The number of workers needed. The shared pool grows to this
+                size, but never beyond the number of CPUs, and it does not
+                shrink. If this is None (default), then the pool keeps its
+                size, or uses all CPUs when it is created.
+
+    Returns the shared WorkerPool.
+
+    """
+    global _sharedpool
+    if _sharedpool is None:
+        _sharedpool = WorkerPool(size)
+    elif size is not None and size > _sharedpool.size:
+        _sharedpool.resize(size)
+    return _sharedpool
+
+def closeWorkerPool():
+    """Stop the workers of the shared WorkerPool."""
+    if _sharedpool is not None:
+        _sharedpool.close()
+    return
+
+atexit.register(closeWorkerPool)
+
+def _terminate(pool):
+    """Terminate a multiprocessing.Pool, which may have a dead worker.
+
+    Idle workers wait for tasks while holding the lock of the task queue,
+    and the workers hold the lock of the result queue while they send a
+    result. A worker that was killed there leaves the lock acquired, and
+    Pool.terminate would wait for it forever. The workers are stopped first,
+    so that the locks are not held by a live process when they are released.
+    The thread of the pool that replaces exited workers is stopped before
+    that, since its new workers would take the locks again. This is safe for
+    a pool whose workers are all alive.
+
+    """
+    handler = pool._worker_handler
+    handler._state = TERMINATE
+    handler.join()
+    for w in pool._pool:
+        if w.exitcode is None:
+            w.terminate()
+        w.join()
+    # The threads of the pool hold the lock of the result queue only briefly.
+    for lock in (pool._inqueue._rlock, pool._outqueue._wlock):
+        lock.acquire(True, 1)
+        lock.release()
+    pool.terminate()
+    pool.join()
+    return
+
+def _capSize(size):
+    """Limit a pool size to the number of CPUs."""
+    ncpu = multiprocessing.cpu_count()
+    if size is None:
+        return ncpu
+    return max(1, min(int(size), ncpu))
+
+# End of file
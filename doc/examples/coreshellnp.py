@@ -75,6 +75,8 @@ def makeRecipe(stru1, stru2, datname):
     from diffpy.srfit.pdf.characteristicfunctions import sphericalCF, shellCF
     contribution.registerFunction(sphericalCF, name = "f_CdS")
     contribution.registerFunction(shellCF, name = "f_ZnS")
+    # A distribution of particle sizes can be modeled by wrapping these
+    # functions in a PolydisperseCF from the same module.
 
     # Write the fitting equation. We want to sum the PDFs from each phase and
     # multiply it by a scaling factor.